@@ -0,0 +1,91 @@
+"""背景除去ティアのベンチマークスクリプト
+
+画像ディレクトリ内の各画像について、背景除去の各ティアの処理時間と
+quality ティア（u2net・元解像度）のマスクに対するIoUを計測する。
+
+使い方:
+    python bench_background_removal.py [画像ディレクトリ] [繰り返し回数]
+    （ディレクトリ省略時は assets/base_monsters）
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from services.background_removal import REMBG_TIERS, get_session, remove_background_sync
+
+# マスクを二値化するアルファ値のしきい値
+ALPHA_THRESHOLD = 128
+
+REFERENCE_TIER = "quality"
+
+
+def binary_mask(image: Image.Image) -> np.ndarray:
+    """透過画像のアルファチャンネルを二値マスクにする"""
+    return np.asarray(image.getchannel("A")) >= ALPHA_THRESHOLD
+
+
+def iou(mask: np.ndarray, reference: np.ndarray) -> float:
+    """2つの二値マスクのIoUを返す"""
+    union = np.logical_or(mask, reference).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(mask, reference).sum() / union)
+
+
+def bench(image: Image.Image, tier: str, repeat: int) -> tuple[float, Image.Image]:
+    """平均処理時間(ms)と最後の出力画像を返す"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = remove_background_sync(image, tier)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, result
+
+
+def main():
+    image_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "assets" / "base_monsters"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    images = sorted(p for p in image_dir.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg", ".webp"))
+    if not images:
+        print(f"ERROR: No images in {image_dir}")
+        return
+
+    # モデルの読み込み時間を計測から除外する
+    for model_name, _ in REMBG_TIERS.values():
+        get_session(model_name)
+
+    tiers = list(REMBG_TIERS)
+    totals = {tier: 0.0 for tier in tiers}
+    ious = {tier: [] for tier in tiers}
+
+    header = " ".join(f"{tier + '(ms)':>14} {'IoU':>6}" for tier in tiers)
+    print(f"{'file':30} {header}")
+    for path in images:
+        image = Image.open(path).convert("RGB")
+        reference = None
+        row = []
+        for tier in tiers:
+            elapsed, result = bench(image, tier, repeat)
+            mask = binary_mask(result)
+            if tier == REFERENCE_TIER:
+                reference = mask
+            score = iou(mask, reference) if reference is not None else float("nan")
+            totals[tier] += elapsed
+            ious[tier].append(score)
+            row.append(f"{elapsed:14.1f} {score:6.3f}")
+        print(f"{path.name[:30]:30} {' '.join(row)}")
+
+    print()
+    base = totals[REFERENCE_TIER]
+    for tier in tiers:
+        model_name, mask_edge = REMBG_TIERS[tier]
+        print(f"{tier:10} model={model_name:8} mask_edge={str(mask_edge):5} "
+              f"avg {totals[tier] / len(images):8.1f}ms (x{base / max(totals[tier], 1e-9):.2f}) "
+              f"mean IoU {np.mean(ious[tier]):.3f}")
+
+
+if __name__ == "__main__":
+    main()
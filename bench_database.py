@@ -0,0 +1,103 @@
+"""SQLite 同時アクセスのベンチマークスクリプト
+
+一時ファイルのSQLiteに対して、書き込みスレッド（通知・ログの追加を想定）と
+読み込みスレッド（API の一覧取得を想定）を同時に走らせ、
+従来設定（ジャーナルモード既定値）と database.py の設定（WAL・pragma調整）で
+処理件数と "database is locked" エラーの件数を比較する。
+
+使い方:
+    python bench_database.py [秒数] [書き込みスレッド数] [読み込みスレッド数]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from database import create_db_engine
+
+
+def setup(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS logs ("
+            "id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, created_at REAL)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_logs_user ON logs (user_id, created_at)"))
+
+
+def writer(engine, stop: threading.Event, stats: dict, lock: threading.Lock) -> None:
+    done = errors = 0
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("INSERT INTO logs (user_id, message, created_at) VALUES (:u, :m, :t)"),
+                    {"u": done % 10, "m": "x" * 200, "t": time.time()},
+                )
+            done += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        stats["writes"] += done
+        stats["write_errors"] += errors
+
+
+def reader(engine, stop: threading.Event, stats: dict, lock: threading.Lock) -> None:
+    done = errors = 0
+    while not stop.is_set():
+        try:
+            with engine.connect() as conn:
+                conn.execute(
+                    text("SELECT * FROM logs WHERE user_id = :u ORDER BY created_at DESC LIMIT 50"),
+                    {"u": done % 10},
+                ).fetchall()
+            done += 1
+        except OperationalError:
+            errors += 1
+    with lock:
+        stats["reads"] += done
+        stats["read_errors"] += errors
+
+
+def run(label: str, engine, seconds: float, writers: int, readers: int) -> None:
+    setup(engine)
+    stats = {"writes": 0, "write_errors": 0, "reads": 0, "read_errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(engine, stop, stats, lock)) for _ in range(writers)]
+    threads += [threading.Thread(target=reader, args=(engine, stop, stats, lock)) for _ in range(readers)]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    print(f"{label:10} writes {stats['writes'] / seconds:9.1f}/s (locked: {stats['write_errors']:5})  "
+          f"reads {stats['reads'] / seconds:9.1f}/s (locked: {stats['read_errors']:5})")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    print(f"{seconds}s, {writers} writers, {readers} readers")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 従来設定（database.py の変更前と同じ）
+        legacy_url = f"sqlite:///{os.path.join(tmp_dir, 'legacy.db')}"
+        legacy = create_engine(legacy_url, connect_args={"check_same_thread": False})
+        run("legacy", legacy, seconds, writers, readers)
+
+        tuned_url = f"sqlite:///{os.path.join(tmp_dir, 'tuned.db')}"
+        run("tuned", create_db_engine(tuned_url), seconds, writers, readers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Web Reader 本文抽出のベンチマークスクリプト
+
+保存済みHTMLのディレクトリを読み込み、lxml単一パス抽出と
+従来のBeautifulSoup(html.parser)による抽出の処理時間を比較する。
+
+使い方:
+    python bench_web_reader.py <HTMLディレクトリ> [繰り返し回数]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from services.web_reader import MAX_CONTENT_LENGTH, extract_content
+
+
+def legacy_extract(content: bytes) -> str:
+    """従来の抽出処理（比較用）"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header',
+                                   'aside', 'noscript', 'iframe', 'form', 'button',
+                                   'input', 'select', 'textarea', 'svg', 'img']):
+        element.decompose()
+
+    ad_patterns = ['ad', 'advertisement', 'banner', 'sidebar', 'menu', 'navigation',
+                   'social', 'share', 'comment', 'related', 'recommend']
+    for pattern in ad_patterns:
+        for element in soup.find_all(class_=re.compile(pattern, re.IGNORECASE)):
+            element.decompose()
+        for element in soup.find_all(id=re.compile(pattern, re.IGNORECASE)):
+            element.decompose()
+
+    content_texts = []
+    main_content = (
+        soup.find('article') or
+        soup.find('main') or
+        soup.find(class_=re.compile('(article|content|post|entry|main)', re.IGNORECASE)) or
+        soup.find(id=re.compile('(article|content|post|entry|main)', re.IGNORECASE)) or
+        soup.body
+    )
+    if main_content:
+        for tag in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'blockquote']):
+            text = tag.get_text(strip=True)
+            if text and len(text) > 10:
+                content_texts.append(text)
+
+    return '\n\n'.join(content_texts)[:MAX_CONTENT_LENGTH]
+
+
+def bench(func, content: bytes, repeat: int) -> tuple[float, int]:
+    """平均処理時間(ms)と抽出文字数を返す"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = func(content)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, len(text)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return
+
+    corpus_dir = Path(sys.argv[1])
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    pages = sorted(corpus_dir.glob("*.htm*"))
+    if not pages:
+        print(f"ERROR: No HTML files in {corpus_dir}")
+        return
+
+    total_new = 0.0
+    total_legacy = 0.0
+    print(f"{'file':40} {'size(KB)':>9} {'lxml(ms)':>9} {'bs4(ms)':>9} {'chars':>7}")
+    for page in pages:
+        content = page.read_bytes()
+        new_ms, new_chars = bench(extract_content, content, repeat)
+        legacy_ms, _ = bench(legacy_extract, content, repeat)
+        total_new += new_ms
+        total_legacy += legacy_ms
+        print(f"{page.name[:40]:40} {len(content) / 1024:9.1f} {new_ms:9.2f} {legacy_ms:9.2f} {new_chars:7}")
+
+    print(f"\nTotal: lxml {total_new:.1f}ms / bs4 {total_legacy:.1f}ms "
+          f"(x{total_legacy / max(total_new, 1e-9):.1f})")
+
+
+if __name__ == "__main__":
+    main()
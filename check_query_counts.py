@@ -0,0 +1,128 @@
+"""エンドポイントごとのSQL発行回数チェックスクリプト
+
+一時ファイルのSQLiteに初期データと多数のクルー（スキル・ガジェット付き）を投入し、
+主要なエンドポイントを呼び出して発行されたSQL文の数を数える。
+クルー数に比例してクエリが増える（N+1クエリ）と上限を超えるため、終了コード1で終了する。
+
+使い方:
+    python check_query_counts.py [追加するクルー数]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+# database.py が読み込まれる前に接続先を一時ファイルに切り替える
+_tmp_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir.name, 'counts.db')}"
+
+import main  # noqa: E402
+from database import Base, SessionLocal, count_statements, engine  # noqa: E402
+from models import Crew, CrewGadget, DailyLog, Gadget, SavedProject, User, UserGadget  # noqa: E402
+from routers import saved_projects, shop  # noqa: E402
+from seed import seed_all  # noqa: E402
+
+# エンドポイント → SQL発行回数の上限（データ件数によらず一定であること）
+QUERY_BUDGETS = {
+    "GET /api/crews": 1,
+    "GET /api/crews/{id}/skills": 2,
+    "GET /api/crews/{id}/gadgets": 2,
+    "POST /api/crews/assign-skills-all": 2,
+    "GET /api/shop/items": 5,
+    "GET /api/shop/my-gadgets": 2,
+    "GET /api/saved-projects": 2,
+    "GET /api/daily-report": 9,
+}
+
+
+async def _labor_words(**kwargs) -> str:
+    """日報の労いの言葉（Bedrockを呼ばずに固定文を返す）"""
+    return "お疲れ様でした！"
+
+
+def populate(db, extra_crews: int) -> int:
+    """初期データとスキル・ガジェット付きのクルー・日報の履歴を投入し、確認に使うクルーIDを返す"""
+    seed_all(db)
+    user = db.query(User).first()
+    gadgets = db.query(Gadget).all()
+
+    # 1年分の日報（履歴の長さによらずクエリ数が一定であることを確認する）
+    for i in range(1, 366):
+        db.add(DailyLog(user_id=user.id, date=date.today() - timedelta(days=i), login_stamp=True, streak_days=366 - i))
+
+    for i in range(extra_crews):
+        db.add(Crew(name=f"クルー{i}", role="Engineer", level=1, exp=0, image_url="/images/crews/default.png"))
+    db.commit()
+
+    asyncio.run(main.assign_skills_to_all_crews(db))
+
+    crews = db.query(Crew).all()
+    for gadget in gadgets:
+        db.add(UserGadget(user_id=user.id, gadget_id=gadget.id))
+    for i, crew in enumerate(crews):
+        for slot_index in range(min(3, len(gadgets))):
+            gadget = gadgets[(i + slot_index) % len(gadgets)]
+            db.add(CrewGadget(crew_id=crew.id, gadget_id=gadget.id, slot_index=slot_index))
+        db.add(SavedProject(user_id=user.id, title=f"プロジェクト{i}", prompt_template="...", crew_id=crew.id))
+    db.commit()
+    return crews[0].id
+
+
+def endpoints(crew_id: int) -> dict:
+    """確認するエンドポイント（名前 → (セッション, 現在のユーザー) を受け取って呼び出す関数）"""
+    return {
+        "GET /api/crews": lambda db, user: main.get_crews(db),
+        "GET /api/crews/{id}/skills": lambda db, user: main.get_crew_skills(crew_id, db),
+        "GET /api/crews/{id}/gadgets": lambda db, user: main.get_crew_gadgets(crew_id, db),
+        "POST /api/crews/assign-skills-all": lambda db, user: main.assign_skills_to_all_crews(db),
+        "GET /api/shop/items": lambda db, user: shop.get_shop_items(db, user),
+        "GET /api/shop/my-gadgets": lambda db, user: shop.get_my_gadgets(db, user),
+        "GET /api/saved-projects": lambda db, user: saved_projects.list_saved_projects(db),
+        "GET /api/daily-report": lambda db, user: main.get_daily_report(db),
+    }
+
+
+def main_check():
+    extra_crews = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    main.generate_labor_words = _labor_words
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        crew_id = populate(db, extra_crews)
+        print(f"{db.query(Crew).count()} crews")
+    finally:
+        db.close()
+
+    failures = 0
+    for name, call in endpoints(crew_id).items():
+        db = SessionLocal()
+        try:
+            # 依存関係（現在のユーザー取得）のクエリは数えない
+            user = db.query(User).first()
+            with count_statements() as statements:
+                asyncio.run(call(db, user))
+        finally:
+            db.close()
+
+        count = len(statements)
+        budget = QUERY_BUDGETS[name]
+        ok = count <= budget
+        failures += not ok
+        print(f"[{'OK' if ok else 'NG'}] {name:40} {count:3} queries (budget {budget})")
+        if not ok:
+            for statement in statements:
+                print(f"       {' '.join(statement.split())[:120]}")
+
+    engine.dispose()
+    _tmp_dir.cleanup()
+
+    if failures:
+        print(f"\n{failures} endpoints exceed their query budget")
+        sys.exit(1)
+    print("\nAll endpoints are within their query budget")
+
+
+if __name__ == "__main__":
+    main_check()
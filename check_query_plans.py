@@ -0,0 +1,177 @@
+"""主要クエリの実行計画チェックスクリプト
+
+一時ファイルのSQLiteに models.py のテーブルを作成して各テーブルに大量の行を投入し、
+API で頻繁に実行されるクエリが全件スキャンせずインデックスを使っているかを
+EXPLAIN QUERY PLAN で確認する。インデックスを使っていない・並べ替えに一時B-treeを使う
+クエリがあれば終了コード1で終了する。
+
+使い方:
+    python check_query_plans.py [1テーブルあたりの行数]
+"""
+import os
+import random
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from database import Base, create_db_engine
+from services.pagination import encode_cursor, keyset_condition
+from models import (
+    ActivityLog,
+    BackgroundExecution,
+    CrewGadget,
+    CrewSkill,
+    DailyLog,
+    ExecutionStatus,
+    Notification,
+    TaskLog,
+)
+
+STATUSES = [
+    ExecutionStatus.PENDING, ExecutionStatus.RUNNING, ExecutionStatus.COMPLETED,
+    ExecutionStatus.FAILED, ExecutionStatus.CANCELLED,
+]
+
+
+def populate(engine, rows: int) -> None:
+    """各テーブルにテスト用の行を投入する（外部キーの参照先は作らない）"""
+    start = datetime(2024, 1, 1)
+    timestamps = [start + timedelta(minutes=i) for i in range(rows)]
+
+    with engine.begin() as conn:
+        conn.execute(TaskLog.__table__.insert(), [
+            {"crew_id": random.randint(1, 200), "user_input": "task", "ai_response": "response", "created_at": ts}
+            for ts in timestamps
+        ])
+        conn.execute(Notification.__table__.insert(), [
+            {"user_id": random.randint(1, 50), "title": "title", "message": "message",
+             "is_read": random.random() < 0.9, "created_at": ts}
+            for ts in timestamps
+        ])
+        conn.execute(ActivityLog.__table__.insert(), [
+            {"user_id": random.randint(1, 50), "level": random.choice(["INFO", "ERROR", "WARNING"]),
+             "action": random.choice(["task_started", "task_completed", "project_started"]),
+             "message": "message", "created_at": ts}
+            for ts in timestamps
+        ])
+        conn.execute(BackgroundExecution.__table__.insert(), [
+            {"user_id": random.randint(1, 50), "execution_type": "task",
+             "status": random.choice(STATUSES), "created_at": ts}
+            for ts in timestamps
+        ])
+        conn.execute(CrewSkill.__table__.insert(), [
+            {"crew_id": i // 5, "skill_id": i % 5 + 1, "slot_type": "primary"} for i in range(rows)
+        ])
+        conn.execute(CrewGadget.__table__.insert(), [
+            {"crew_id": i // 3, "gadget_id": i % 3 + 1, "slot_index": i % 3} for i in range(rows)
+        ])
+        conn.execute(DailyLog.__table__.insert(), [
+            {"user_id": i % 50 + 1, "date": date(2000, 1, 1) + timedelta(days=i // 50)} for i in range(rows)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+def hot_queries(db: Session) -> dict:
+    """チェック対象のクエリ（名前 → (対象テーブル, クエリ)）"""
+    today_start = datetime(2024, 2, 1)
+    today_end = today_start + timedelta(days=1)
+    running = [ExecutionStatus.PENDING, ExecutionStatus.RUNNING, ExecutionStatus.CANCELLING]
+    # キーセットページネーションの次ページ（データの中ほどの行を前ページの最後とする）
+    cursor = encode_cursor(datetime(2024, 2, 1), 50_000)
+
+    return {
+        "日報の当日タスク数": ("task_logs", db.query(func.count(TaskLog.id)).filter(
+            TaskLog.created_at >= today_start, TaskLog.created_at <= today_end)),
+        "クルーのタスク履歴": ("task_logs", db.query(TaskLog).filter(
+            TaskLog.crew_id == 1).order_by(TaskLog.created_at.desc()).limit(50)),
+        "未読通知数": ("notifications", db.query(func.count(Notification.id)).filter(
+            Notification.user_id == 1, Notification.is_read == False)),
+        "通知一覧": ("notifications", db.query(Notification).filter(
+            Notification.user_id == 1).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(20)),
+        "通知一覧（次ページ）": ("notifications", db.query(Notification).filter(
+            Notification.user_id == 1, keyset_condition(Notification.created_at, Notification.id, cursor),
+        ).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(20)),
+        "未読通知一覧": ("notifications", db.query(Notification).filter(
+            Notification.user_id == 1, Notification.is_read == False,
+        ).order_by(Notification.created_at.desc(), Notification.id.desc()).limit(20)),
+        "ログ一覧": ("activity_logs", db.query(ActivityLog).filter(
+            ActivityLog.user_id == 1).order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).limit(50)),
+        "ログ一覧（次ページ）": ("activity_logs", db.query(ActivityLog).filter(
+            ActivityLog.user_id == 1, keyset_condition(ActivityLog.created_at, ActivityLog.id, cursor),
+        ).order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).limit(50)),
+        "ログ絞り込み": ("activity_logs", db.query(ActivityLog).filter(
+            ActivityLog.user_id == 1, ActivityLog.level == "ERROR", ActivityLog.action == "task_started")),
+        "バックグラウンド実行一覧": ("background_executions", db.query(BackgroundExecution).filter(
+            BackgroundExecution.user_id == 1,
+        ).order_by(BackgroundExecution.created_at.desc(), BackgroundExecution.id.desc()).limit(20)),
+        "バックグラウンド実行一覧（次ページ）": ("background_executions", db.query(BackgroundExecution).filter(
+            BackgroundExecution.user_id == 1,
+            keyset_condition(BackgroundExecution.created_at, BackgroundExecution.id, cursor),
+        ).order_by(BackgroundExecution.created_at.desc(), BackgroundExecution.id.desc()).limit(20)),
+        "バックグラウンド実行一覧（状態で絞り込み）": ("background_executions", db.query(BackgroundExecution).filter(
+            BackgroundExecution.user_id == 1, BackgroundExecution.status == ExecutionStatus.COMPLETED,
+        ).order_by(BackgroundExecution.created_at.desc(), BackgroundExecution.id.desc()).limit(20)),
+        "実行中の件数": ("background_executions", db.query(func.count(BackgroundExecution.id)).filter(
+            BackgroundExecution.user_id == 1, BackgroundExecution.status.in_(running))),
+        "クルーのスキル": ("crew_skills", db.query(CrewSkill).filter(CrewSkill.crew_id == 1)),
+        "クルーのガジェット": ("crew_gadgets", db.query(CrewGadget).filter(CrewGadget.crew_id == 1)),
+        "日報": ("daily_logs", db.query(DailyLog).filter(
+            DailyLog.user_id == 1, DailyLog.date == date(2000, 3, 1))),
+    }
+
+
+def explain(engine, db: Session, query) -> list[str]:
+    """クエリを実行して送信されたSQLを捕捉し、その実行計画を返す"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        query.all()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    statement, parameters = captured[-1]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp_dir, 'plans.db')}")
+        Base.metadata.create_all(bind=engine)
+        print(f"Populating {rows} rows per table...")
+        populate(engine, rows)
+
+        failures = 0
+        with Session(engine) as db:
+            for name, (table, query) in hot_queries(db).items():
+                plan = explain(engine, db, query)
+                table_steps = [step for step in plan if f" {table}" in step]
+                uses_index = bool(table_steps) and all("USING" in step for step in table_steps)
+                # 一覧は並べ替えにもインデックスを使う（LIMIT件数だけ読めば済む）
+                sorted_by_index = not any("TEMP B-TREE FOR ORDER BY" in step for step in plan)
+                ok = uses_index and sorted_by_index
+                failures += not ok
+                print(f"[{'OK' if ok else 'NG'}] {name}")
+                for step in plan:
+                    print(f"       {step}")
+
+        engine.dispose()
+
+    if failures:
+        print(f"\n{failures} queries do not use an index for filtering or ordering")
+        sys.exit(1)
+    print("\nAll hot queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,138 @@
-from sqlalchemy import create_engine
+import os
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-DATABASE_URL = "sqlite:///./kurukuru.db"
+load_dotenv()
+
+# 接続先（SQLite / PostgreSQL。PostgreSQLに切り替える場合は環境変数で指定）
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./kurukuru.db")
+
+# SQLite: ロック待ちの最大時間（ミリ秒）
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# SQLite: メモリマップドI/Oのサイズ（バイト）
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# SQLite: ページキャッシュのサイズ（KiB）
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# SQLite以外: コネクションプールの設定
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 秒
+
+# 非同期ドライバ（同期用のURLから非同期用のURLを作るときに使う。requirements.txtに含まれるもののみ）
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    SQLiteの接続ごとにパフォーマンス設定を行う
+
+    - WAL: 書き込み中も読み込みをブロックしない
+    - synchronous=NORMAL: WALではコミットごとのfsyncを省略しても破損しない
+    - busy_timeout: ロック中は即エラーにせず待つ
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    """
+    接続先に応じた設定でエンジンを生成する
+
+    Args:
+        url: データベースURL
+
+    Returns:
+        Engine: SQLAlchemyのエンジン
+    """
+    if url.startswith("sqlite"):
+        db_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+        return db_engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def to_async_url(url: str) -> str:
+    """
+    同期ドライバのURLを非同期ドライバのURLに変換する
+
+    Args:
+        url: データベースURL（例: sqlite:///./kurukuru.db）
+
+    Returns:
+        str: 非同期ドライバのURL（例: sqlite+aiosqlite:///./kurukuru.db）
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS or parsed.drivername in ASYNC_DRIVERS.values():
+        # 対応表にない・既に非同期ドライバが指定されている場合はそのまま使う
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def create_async_db_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    """
+    接続先に応じた設定で非同期エンジンを生成する
+
+    Args:
+        url: データベースURL（同期ドライバのURLでも可）
+
+    Returns:
+        AsyncEngine: SQLAlchemyの非同期エンジン
+    """
+    async_url = to_async_url(url)
+    if async_url.startswith("sqlite"):
+        db_engine = create_async_engine(
+            async_url,
+            connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        )
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        return db_engine
+
+    return create_async_engine(
+        async_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+# 同期エンジン（seed.py などのスクリプト・同期処理用）
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期エンジン（async def のエンドポイント・バックグラウンド実行用）
+# expire_on_commit=False: コミット後に属性へアクセスしても暗黙のクエリ（非同期では不可）を発行しない
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -17,3 +144,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@contextmanager
+def count_statements(db_engine: Engine = engine):
+    """
+    ブロック内で実行されたSQL文を記録する（N+1クエリの検出用）
+
+    Args:
+        db_engine: 監視するエンジン
+
+    Yields:
+        list[str]: 実行されたSQL文のリスト（ブロック内で追記される）
+    """
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(db_engine, "before_cursor_execute", _record)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -11,17 +12,26 @@ from dotenv import load_dotenv
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, File, Form, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from database import Base, SessionLocal, engine, get_db
+from database import Base, SessionLocal, async_engine, engine, get_db
 from models import Crew as CrewModel, TaskLog, User as UserModel, UnlockedPersonality, DailyLog, Gadget, CrewGadget, Skill, CrewSkill, Project, ProjectTask, ProjectInput, UserGadget, Notification, ActivityLog, BackgroundExecution, ApprovalRequest
 from seed import seed_crews, seed_gadgets, seed_skills, seed_users, ROLES, PERSONALITIES
 from services.bedrock_service import execute_task_with_crew, execute_task_with_crew_and_images, generate_greeting, route_task_with_partner, generate_whimsical_talk, generate_labor_words
 from graphs import run_director_workflow
-from services.image_generation_service import generate_crew_image_with_fallback, evolve_crew_image
+from services.image_generation_service import evolve_crew_image, image_file_to_data_uri, preload_base_images, shutdown_image_workers, SCOUT_REMBG_TIER
+from services.crew_image_pool import get_crew_image, start_refill_worker as start_crew_image_pool, stop_refill_worker as stop_crew_image_pool
 from services.youtube import get_transcript_from_url
 from services.web_reader import fetch_web_content
-from services.pdf_reader import extract_text_from_pdf
+from services.pdf_reader import extract_pdf_text
+from services.worker_pool import shutdown_process_pool
+from services.background_removal import REMBG_TIER, preload_session as preload_rembg_session, shutdown_background_removal
+from services.attachment_store import process_upload
+from services.image_serving import avatar_url, backfill_image_hashes, crew_image_url
+from services.daily_report import STAMP_DAYS, backfill_login_streaks, build_stamps, get_recent_daily_logs, next_login_streak
+from services.image_derivatives import THUMBNAIL_SIZES, schedule_derivatives
+from services.summarizer import summarize_long_text
 from services.google_slides_service import create_presentation
 from services.google_sheets_service import create_spreadsheet, parse_table_from_text, extract_sheet_title
 from routers import slides as slides_router
@@ -34,6 +44,7 @@ from routers import research as research_router
 from routers import notifications as notifications_router
 from routers import background as background_router
 from routers import approval as approval_router
+from routers import images as images_router
 import re
 
 load_dotenv()
@@ -211,6 +222,9 @@ async def lifespan(app: FastAPI):
         ("users", "username", "ALTER TABLE users ADD COLUMN username VARCHAR(50)"),
         ("users", "hashed_password", "ALTER TABLE users ADD COLUMN hashed_password VARCHAR(255)"),
         ("users", "is_demo", "ALTER TABLE users ADD COLUMN is_demo BOOLEAN DEFAULT 0"),
+        ("crews", "image_hash", "ALTER TABLE crews ADD COLUMN image_hash VARCHAR(16)"),
+        ("users", "avatar_hash", "ALTER TABLE users ADD COLUMN avatar_hash VARCHAR(16)"),
+        ("daily_logs", "streak_days", "ALTER TABLE daily_logs ADD COLUMN streak_days INTEGER"),
     ]
     with engine.connect() as conn:
         for table, column, sql in migrations:
@@ -222,6 +236,14 @@ async def lifespan(app: FastAPI):
                 # カラムが既に存在する場合はエラーを無視（duplicate columnまたはalready existsを含む）
                 pass
 
+    # インデックスを追加（create_allは既存のテーブルにインデックスを追加しないため）
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                logger.warning(f"Failed to create index {index.name}: {e}")
+
     logger.info("Seeding initial data...")
     db = SessionLocal()
     try:
@@ -229,6 +251,10 @@ async def lifespan(app: FastAPI):
         seed_skills(db)
         seed_crews(db)
         seed_gadgets(db)
+        # 画像配信URL用のハッシュを既存データに設定
+        backfill_image_hashes(db)
+        # 連続ログイン日数を既存の日報に設定
+        backfill_login_streaks(db)
     finally:
         db.close()
 
@@ -259,9 +285,29 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
 
+    # 背景除去モデルをバックグラウンドで読み込む（初回のスカウトを待たせないため）
+    preload_rembg_session(REMBG_TIER, SCOUT_REMBG_TIER)
+
+    # ベース画像のエンコード結果をバックグラウンドで用意する
+    asyncio.get_running_loop().run_in_executor(None, preload_base_images)
+
+    # スカウト用のクルー画像プールの補充を開始（CREW_IMAGE_POOL_DEPTH > 0 の場合のみ）
+    start_crew_image_pool(
+        (role, personality, rarity)
+        for rarity in range(1, 6)
+        for role in ROLES
+        for personality in PERSONALITIES
+    )
+
     logger.info("Kurukuru Backend server started successfully!")
     yield
 
+    await stop_crew_image_pool()
+    shutdown_process_pool()
+    shutdown_image_workers()
+    shutdown_background_removal()
+    await async_engine.dispose()
+
 
 app = FastAPI(title="Kurukuru Backend", lifespan=lifespan)
 
@@ -284,6 +330,7 @@ app.include_router(research_router.router)
 app.include_router(notifications_router.router)
 app.include_router(background_router.router)
 app.include_router(approval_router.router)
+app.include_router(images_router.router)
 
 
 # --- Response Models ---
@@ -294,7 +341,7 @@ class UserResponse(BaseModel):
     company_name: str
     user_name: str | None = None
     job_title: str | None = None
-    avatar_data: str | None = None
+    avatar_data: str | None = None  # アバター画像のURL（/api/images/avatars/...）
     coin: int
     ruby: int
     rank: str
@@ -508,7 +555,13 @@ async def health_check():
 
 
 @app.get("/api/crews")
-async def get_crews(db: Session = Depends(get_db)) -> list[CrewResponse]:
+async def get_crews(db: Session = Depends(get_db), image_size: str | None = None) -> list[CrewResponse]:
+    # image_size（sm / md / lg）を指定すると一覧表示用のサムネイルURLを返す
+    if image_size is not None and image_size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"image_size は {', '.join(THUMBNAIL_SIZES)} のいずれかを指定してください",
+        )
     crews = db.query(CrewModel).order_by(CrewModel.id.desc()).all()
     return [
         CrewResponse(
@@ -517,8 +570,8 @@ async def get_crews(db: Session = Depends(get_db)) -> list[CrewResponse]:
             role=crew.role,
             level=crew.level,
             exp=crew.exp,
-            # Base64がある場合はそれを優先、なければimage_urlを使用
-            image=crew.image_base64 if crew.image_base64 else crew.image_url,
+            # Base64画像がある場合は画像配信APIのURL、なければimage_urlを使用
+            image=crew_image_url(crew, image_size),
             personality=crew.personality,
             is_partner=crew.is_partner,
             rarity=crew.rarity,
@@ -539,7 +592,12 @@ async def get_crew_skills(
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
 
-    crew_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew_id).all()
+    crew_skills = (
+        db.query(CrewSkill)
+        .options(joinedload(CrewSkill.skill))
+        .filter(CrewSkill.crew_id == crew_id)
+        .all()
+    )
 
     return [
         SkillInfo(
@@ -586,7 +644,12 @@ async def assign_skills_to_existing_crew(
     existing_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew_id).count()
     if existing_skills > 0:
         # 既存スキルを返す
-        crew_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew_id).all()
+        crew_skills = (
+            db.query(CrewSkill)
+            .options(joinedload(CrewSkill.skill))
+            .filter(CrewSkill.crew_id == crew_id)
+            .all()
+        )
         return [
             SkillInfo(
                 name=cs.skill.name,
@@ -617,9 +680,11 @@ async def assign_skills_to_all_crews(
     crews = db.query(CrewModel).all()
     assigned_count = 0
 
+    # スキルを持つクルーのIDをまとめて取得（クルーごとのcount()を避ける）
+    crew_ids_with_skills = {crew_id for (crew_id,) in db.query(CrewSkill.crew_id).distinct()}
+
     for crew in crews:
-        existing_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew.id).count()
-        if existing_skills == 0:
+        if crew.id not in crew_ids_with_skills:
             assign_skills_to_crew(db, crew.id, crew.role)
             assigned_count += 1
             logger.info(f"Assigned skills to: {crew.name} (ID: {crew.id})")
@@ -695,9 +760,9 @@ async def create_crew(
         image_url = request.image
         logger.info(f"Using specified image: {image_url}")
     else:
-        # Nova Canvas で画像を生成（失敗時はデフォルト画像）
+        # 事前生成プールから取得、なければ Nova Canvas で画像を生成（失敗時はデフォルト画像）
         logger.info(f"Generating image for crew: {request.name} (Role: {request.role}, Personality: {personality_key})")
-        image_url, image_base64 = await generate_crew_image_with_fallback(
+        image_url, image_base64 = await get_crew_image(
             crew_name=request.name,
             role=request.role,
             personality=personality_key,
@@ -719,6 +784,9 @@ async def create_crew(
     db.commit()
     db.refresh(new_crew)
 
+    # サムネイルをバックグラウンドで生成
+    schedule_derivatives(image_base64, new_crew.image_hash)
+
     logger.info(f"Created new crew: {new_crew.name} (ID: {new_crew.id})")
 
     # 入社挨拶を生成
@@ -734,8 +802,8 @@ async def create_crew(
         role=new_crew.role,
         level=new_crew.level,
         exp=new_crew.exp,
-        # Base64がある場合はそれを優先
-        image=new_crew.image_base64 if new_crew.image_base64 else new_crew.image_url,
+        # Base64画像がある場合は画像配信APIのURL
+        image=crew_image_url(new_crew),
         personality=new_crew.personality,
         greeting=greeting,
         rarity=new_crew.rarity,
@@ -831,7 +899,7 @@ async def get_user(db: Session = Depends(get_db)) -> UserResponse:
         company_name=user.company_name,
         user_name=user.user_name,
         job_title=user.job_title,
-        avatar_data=user.avatar_data,
+        avatar_data=avatar_url(user),
         coin=user.coin,
         ruby=user.ruby,
         rank=user.rank,
@@ -917,8 +985,8 @@ async def get_partner(db: Session = Depends(get_db)) -> PartnerResponse | None:
         name=partner.name,
         role=partner.role,
         level=partner.level,
-        # Base64がある場合はそれを優先
-        image=partner.image_base64 if partner.image_base64 else partner.image_url,
+        # Base64画像がある場合は画像配信APIのURL
+        image=crew_image_url(partner),
         personality=partner.personality,
         greeting=greeting,
     )
@@ -1147,7 +1215,12 @@ async def execute_task(
 
                 # スキルレベルアップ（ランダムで1つ選んでレベルアップ）
                 import random
-                crew_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew.id).all()
+                crew_skills = (
+                    db.query(CrewSkill)
+                    .options(joinedload(CrewSkill.skill))
+                    .filter(CrewSkill.crew_id == crew.id)
+                    .all()
+                )
                 if crew_skills:
                     # レベル10未満のスキルからランダムで1つ選ぶ
                     upgradable_skills = [s for s in crew_skills if s.level < 10]
@@ -1319,7 +1392,7 @@ async def execute_task_with_files(
     - task: 実行するタスクの内容
     - files: 添付ファイル（画像、Excel、CSV）
     """
-    from services.file_utils import process_file, get_file_type
+    from services.file_utils import process_file_async, get_file_type
 
     # クルーをDBから取得
     crew = db.query(CrewModel).filter(CrewModel.id == crew_id).first()
@@ -1330,50 +1403,60 @@ async def execute_task_with_files(
     personality = crew.personality or "真面目で丁寧な対応を心がける。"
 
     # 添付ファイルを処理
-    file_contexts = []
-    image_data_list = []  # 画像データ用（Vision API用）
-
-    for uploaded_file in files:
+    async def ingest_file(uploaded_file: UploadFile) -> tuple[str, dict | None]:
+        """添付ファイル1件を処理し、(プロンプト用コンテキスト, 画像データ) を返す"""
         try:
-            file_content = await uploaded_file.read()
             file_type = get_file_type(uploaded_file.filename or "unknown")
 
             if file_type in ('excel', 'csv', 'text', 'json', 'xml', 'word', 'powerpoint'):
                 # テキストベースのファイルはテキスト変換
-                processed = process_file(file_content, uploaded_file.filename or "file")
-                file_contexts.append(f"\n\n【添付ファイル: {uploaded_file.filename}】\n{processed['text']}")
+                filename = uploaded_file.filename or "file"
+                processed = await process_upload(
+                    uploaded_file,
+                    f"process_file:{filename}",
+                    lambda stored_path: process_file_async(stored_path, filename),
+                )
                 logger.info(f"Processed {file_type} file: {uploaded_file.filename}")
+                return f"\n\n【添付ファイル: {uploaded_file.filename}】\n{processed['text']}", None
 
             elif file_type == 'image':
-                # 画像はBase64エンコード
-                processed = process_file(file_content, uploaded_file.filename or "image.png")
-                image_data_list.append({
+                # 画像はBase64エンコード（結果はファイル名に依存しないため内容のハッシュのみで再利用）
+                filename = uploaded_file.filename or "image.png"
+                processed = await process_upload(
+                    uploaded_file,
+                    "image",
+                    lambda stored_path: process_file_async(stored_path, filename),
+                )
+                logger.info(f"Processed image file: {uploaded_file.filename}")
+                image_data = {
                     'filename': uploaded_file.filename,
                     'base64': processed['base64'],
                     'media_type': processed['media_type'],
-                })
-                file_contexts.append(f"\n\n【添付画像: {uploaded_file.filename}】(画像を分析してください)")
-                logger.info(f"Processed image file: {uploaded_file.filename}")
+                }
+                return f"\n\n【添付画像: {uploaded_file.filename}】(画像を分析してください)", image_data
 
             elif file_type == 'pdf':
-                # PDFは既存の処理
-                from pypdf import PdfReader
-                import io as io_module
-                reader = PdfReader(io_module.BytesIO(file_content))
-                pdf_text = ""
-                for page in reader.pages[:10]:  # 最大10ページ
-                    pdf_text += page.extract_text() or ""
-                if pdf_text:
-                    file_contexts.append(f"\n\n【添付PDF: {uploaded_file.filename}】\n{pdf_text[:5000]}")
+                # PDFは最大10ページ・5000文字まで
+                pdf_text, _ = await process_upload(
+                    uploaded_file,
+                    "pdf:5000:10",
+                    lambda stored_path: extract_pdf_text(stored_path, max_chars=5000, max_pages=10),
+                )
                 logger.info(f"Processed PDF file: {uploaded_file.filename}")
+                return f"\n\n【添付PDF: {uploaded_file.filename}】\n{pdf_text}", None
 
             else:
-                file_contexts.append(f"\n\n【添付ファイル: {uploaded_file.filename}】サポートされていないファイル形式です")
                 logger.warning(f"Unsupported file type: {uploaded_file.filename}")
+                return f"\n\n【添付ファイル: {uploaded_file.filename}】サポートされていないファイル形式です", None
 
         except Exception as e:
             logger.error(f"File processing error: {e}")
-            file_contexts.append(f"\n\n【添付ファイル: {uploaded_file.filename}】読み込みエラー: {str(e)}")
+            return f"\n\n【添付ファイル: {uploaded_file.filename}】読み込みエラー: {str(e)}", None
+
+    # 全ファイルを並列に処理し、添付順にコンテキストを組み立てる
+    ingested = await asyncio.gather(*[ingest_file(uploaded_file) for uploaded_file in files])
+    file_contexts = [file_context for file_context, _ in ingested]
+    image_data_list = [image_data for _, image_data in ingested if image_data]  # 画像データ用（Vision API用）
 
     # タスク内容にファイルコンテキストを追加
     task_with_files = task
@@ -1760,7 +1843,7 @@ async def scout_crew(
 
     # AI画像生成（役割・性格・レアリティを渡す）
     logger.info(f"Scouting new crew: {name} (Role: {role}, Personality: {personality_key}, ★{rarity})")
-    image_url, image_base64 = await generate_crew_image_with_fallback(
+    image_url, image_base64 = await get_crew_image(
         crew_name=name,
         role=role,
         personality=personality_key,
@@ -1782,6 +1865,9 @@ async def scout_crew(
     db.commit()
     db.refresh(new_crew)
 
+    # サムネイルをバックグラウンドで生成
+    schedule_derivatives(image_base64, new_crew.image_hash)
+
     # スキルを付与
     assigned_skills = assign_skills_to_crew(db, new_crew.id, role)
     db.commit()
@@ -1818,8 +1904,8 @@ async def scout_crew(
             role_label=role_label,
             level=new_crew.level,
             exp=new_crew.exp,
-            # Base64がある場合はそれを優先
-            image=new_crew.image_base64 if new_crew.image_base64 else new_crew.image_url,
+            # Base64画像がある場合は画像配信APIのURL
+            image=crew_image_url(new_crew),
             personality=personality_key,
             personality_label=personality_label,
             rarity=new_crew.rarity,
@@ -1999,7 +2085,7 @@ async def get_daily_report(
     日報（デイリーレポート）を取得
 
     - 本日のタスク数・獲得コインを集計
-    - 過去7日分のスタンプ情報を返す
+    - 過去7日分のスタンプ情報を返す（DailyLogは直近7日分を1クエリで取得）
     - 初回アクセス時はログインボーナス（100コイン）を付与
     - 相棒の労いの言葉を生成
     """
@@ -2017,19 +2103,17 @@ async def get_daily_report(
     today = date.today()
     today_str = today.isoformat()
 
-    # 今日のDailyLogを取得（なければ作成）
-    daily_log = db.query(DailyLog).filter(
-        DailyLog.user_id == user.id,
-        DailyLog.date == today,
-    ).first()
+    # 直近7日分のDailyLogをまとめて取得（今日の分がなければ作成）
+    recent_logs = get_recent_daily_logs(db, user.id, today, STAMP_DAYS)
+    daily_log = recent_logs.get(today)
 
     # 今日のタスク数を集計（TaskLogから）
     today_start = datetime.combine(today, datetime.min.time())
     today_end = datetime.combine(today, datetime.max.time())
-    task_count = db.query(TaskLog).filter(
+    task_count = db.query(func.count(TaskLog.id)).filter(
         TaskLog.created_at >= today_start,
         TaskLog.created_at <= today_end,
-    ).count()
+    ).scalar()
 
     # 今日の獲得コイン（タスク1件につき50コイン）
     earned_coins = task_count * 50
@@ -2044,8 +2128,11 @@ async def get_daily_report(
             task_count=task_count,
             earned_coins=earned_coins,
             login_stamp=True,
+            # 前日までの連続ログイン日数に積み上げる
+            streak_days=next_login_streak(recent_logs.get(today - timedelta(days=1))),
         )
         db.add(daily_log)
+        recent_logs[today] = daily_log
 
         # ログインボーナスを付与
         user.coin += LOGIN_BONUS
@@ -2056,35 +2143,16 @@ async def get_daily_report(
         daily_log.task_count = task_count
         daily_log.earned_coins = earned_coins
 
-    db.commit()
-    db.refresh(daily_log)
-
-    # 過去7日分のスタンプ情報を取得
-    stamps: list[StampInfo] = []
-    for i in range(6, -1, -1):  # 7日前から今日まで
-        target_date = today - timedelta(days=i)
-        log = db.query(DailyLog).filter(
-            DailyLog.user_id == user.id,
-            DailyLog.date == target_date,
-        ).first()
-        stamps.append(StampInfo(
-            date=target_date.isoformat(),
-            has_stamp=log is not None and log.login_stamp,
-        ))
+    # 過去7日分のスタンプ情報（コミット前に取得済みのDailyLogから作る）
+    stamps = [
+        StampInfo(date=target_date.isoformat(), has_stamp=has_stamp)
+        for target_date, has_stamp in build_stamps(recent_logs, today, STAMP_DAYS)
+    ]
 
-    # 連続ログイン日数を計算
-    consecutive_days = 0
-    for i in range(7):  # 最大7日まで
-        target_date = today - timedelta(days=i)
-        log = db.query(DailyLog).filter(
-            DailyLog.user_id == user.id,
-            DailyLog.date == target_date,
-            DailyLog.login_stamp == True,
-        ).first()
-        if log:
-            consecutive_days += 1
-        else:
-            break
+    # 連続ログイン日数（DailyLogに積み上げた値）
+    consecutive_days = (daily_log.streak_days or 0) if daily_log.login_stamp else 0
+
+    db.commit()
 
     # 相棒の労いの言葉を生成
     labor_words = "お疲れ様でした！"
@@ -2196,14 +2264,19 @@ async def evolve_crew(
         # レアリティを1上げる（最大5）
         new_rarity = min(crew.rarity + 1, 5)
 
-        # DBを更新
+        # DBを更新（画像配信API・サムネイル用にBase64でも保存する）
+        evolved_image_base64 = await asyncio.to_thread(image_file_to_data_uri, new_image)
         crew.image_url = new_image
+        crew.image_base64 = evolved_image_base64
         crew.role = new_role
         crew.rarity = new_rarity
 
         db.commit()
         db.refresh(crew)
 
+        # サムネイルをバックグラウンドで生成
+        schedule_derivatives(evolved_image_base64, crew.image_hash)
+
         logger.info(f"Crew evolved: {crew.name} -> {new_role} (rarity: {new_rarity})")
 
         return EvolveCrewResponse(
@@ -2214,7 +2287,7 @@ async def evolve_crew(
                 role=crew.role,
                 level=crew.level,
                 exp=crew.exp,
-                image=crew.image_url,
+                image=crew_image_url(crew),
                 personality=crew.personality,
                 is_partner=crew.is_partner,
                 rarity=crew.rarity,
@@ -2264,6 +2337,10 @@ class CollaborationResponse(BaseModel):
     error: str | None = None
 
 
+# 分析プロンプトに入れる字幕テキストの最大文字数（超える場合は分割要約する）
+TRANSCRIPT_PROMPT_CHARS = 5000
+
+
 @app.post("/api/demo/collaboration")
 async def demo_collaboration(
     request: CollaborationRequest,
@@ -2284,11 +2361,19 @@ async def demo_collaboration(
     logger.info(f"Collaboration demo started with URL: {request.youtube_url}")
 
     # ========== Step 0: YouTube字幕を取得 ==========
-    transcript, status_message = get_transcript_from_url(request.youtube_url)
+    # 全文を取得し、長い場合は分割要約して動画全体の内容をカバーする
+    transcript, status_message = await asyncio.to_thread(get_transcript_from_url, request.youtube_url, None)
 
     if transcript:
         print(f"[Collaboration] ✅ 字幕取得成功: {len(transcript)} chars")
         logger.info(f"Transcript fetched successfully: {len(transcript)} chars")
+        try:
+            transcript = await summarize_long_text(
+                transcript, TRANSCRIPT_PROMPT_CHARS, source_label="YouTube動画の字幕"
+            )
+        except Exception as e:
+            logger.warning(f"Transcript summarization failed, truncating instead: {e}")
+            transcript = transcript[:TRANSCRIPT_PROMPT_CHARS] + "\n...(以下省略)"
         use_real_transcript = True
     else:
         print(f"[Collaboration] ⚠️ 字幕取得失敗: {status_message} - ダミーモードで続行")
@@ -2552,7 +2637,12 @@ async def get_crew_gadgets(
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
 
-    crew_gadgets = db.query(CrewGadget).filter(CrewGadget.crew_id == crew_id).all()
+    crew_gadgets = (
+        db.query(CrewGadget)
+        .options(joinedload(CrewGadget.gadget))
+        .filter(CrewGadget.crew_id == crew_id)
+        .all()
+    )
 
     return [
         CrewGadgetResponse(
@@ -2875,7 +2965,12 @@ async def upgrade_crew_skills(
         )
 
     # クルーのスキルを取得
-    crew_skills = db.query(CrewSkill).filter(CrewSkill.crew_id == crew_id).all()
+    crew_skills = (
+        db.query(CrewSkill)
+        .options(joinedload(CrewSkill.skill))
+        .filter(CrewSkill.crew_id == crew_id)
+        .all()
+    )
 
     if not crew_skills:
         return UpgradeSkillsResponse(
@@ -3079,8 +3174,8 @@ async def summarize_web_article(
             page_title=page_title,
             crew_id=assigned_crew.id,
             crew_name=assigned_crew.name,
-            # Base64がある場合はそれを優先、なければimage_urlを使用
-            crew_image=assigned_crew.image_base64 if assigned_crew.image_base64 else assigned_crew.image_url,
+            # Base64画像がある場合は画像配信APIのURL、なければimage_urlを使用
+            crew_image=crew_image_url(assigned_crew),
             exp_gained=exp_gained,
             old_level=old_level,
             new_level=new_level,
@@ -3129,6 +3224,12 @@ class FileSummaryResponse(BaseModel):
 # 最大ファイルサイズ（10MB）
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# 要約対象として抽出するPDFテキストの最大文字数（超える部分は分割要約する）
+PDF_SUMMARY_MAX_CHARS = 300000
+
+# 要約プロンプトに入れる資料テキストの最大文字数
+PDF_PROMPT_CHARS = 10000
+
 
 @app.post("/api/tools/file-summary")
 async def summarize_pdf_file(
@@ -3159,21 +3260,17 @@ async def summarize_pdf_file(
                 error="PDFファイルのみ対応しています。",
             )
 
-        # 2. ファイルサイズチェック
-        file_content = await file.read()
-        if len(file_content) > MAX_FILE_SIZE:
-            return FileSummaryResponse(
-                success=False,
-                error=f"ファイルサイズが大きすぎます（最大10MB）。現在のサイズ: {len(file_content) / (1024 * 1024):.1f}MB",
-            )
-
-        # 3. PDFからテキスト抽出
+        # 2. ファイルサイズチェック + 3. PDFからテキスト抽出
+        # （一時領域に保存しながらサイズを確認し、同じファイルの抽出結果は再利用する）
         logger.info(f"Extracting text from PDF: {file.filename}")
-        from io import BytesIO
-        file_stream = BytesIO(file_content)
 
         try:
-            content = extract_text_from_pdf(file_stream)
+            content, page_count = await process_upload(
+                file,
+                f"pdf:{PDF_SUMMARY_MAX_CHARS}",
+                lambda stored_path: extract_pdf_text(stored_path, max_chars=PDF_SUMMARY_MAX_CHARS),
+                max_bytes=MAX_FILE_SIZE,
+            )
         except ValueError as e:
             return FileSummaryResponse(
                 success=False,
@@ -3186,14 +3283,12 @@ async def summarize_pdf_file(
                 error="PDFからテキストを抽出できませんでした。画像のみのPDFの可能性があります。",
             )
 
-        # ページ数を取得
-        file_stream.seek(0)
-        from pypdf import PdfReader
+        # 長い資料は分割要約して全体をプロンプトに収める
         try:
-            reader = PdfReader(file_stream)
-            page_count = len(reader.pages)
-        except Exception:
-            page_count = None
+            content = await summarize_long_text(content, PDF_PROMPT_CHARS, source_label="PDF資料")
+        except Exception as e:
+            logger.warning(f"PDF summarization failed, truncating instead: {e}")
+            content = content[:PDF_PROMPT_CHARS] + "\n...(以下省略)"
 
         # 4. 担当クルーを選定（「データ分析」または「情報収集」スキル持ちを優先）
         assigned_crew = None
@@ -3301,8 +3396,8 @@ async def summarize_pdf_file(
             page_count=page_count,
             crew_id=assigned_crew.id,
             crew_name=assigned_crew.name,
-            # Base64がある場合はそれを優先、なければimage_urlを使用
-            crew_image=assigned_crew.image_base64 if assigned_crew.image_base64 else assigned_crew.image_url,
+            # Base64画像がある場合は画像配信APIのURL、なければimage_urlを使用
+            crew_image=crew_image_url(assigned_crew),
             exp_gained=exp_gained,
             old_level=old_level,
             new_level=new_level,
@@ -3386,8 +3481,12 @@ async def create_project_plan(
                 error="相棒が設定されていません。先に相棒を任命してください。",
             )
 
-        # 2. 全クルーの情報を取得
-        all_crews = db.query(CrewModel).all()
+        # 2. 全クルーの情報を取得（スキルはまとめて読み込む）
+        all_crews = (
+            db.query(CrewModel)
+            .options(selectinload(CrewModel.skills).joinedload(CrewSkill.skill))
+            .all()
+        )
         if len(all_crews) < 2:
             return DirectorPlanResponse(
                 success=False,
@@ -3688,9 +3787,7 @@ async def execute_project(
     - タスクを順番にBedrock AIで実行
     - 前のタスクの結果を次のタスクに引き継ぎ
     """
-    from services.pdf_reader import extract_text_from_pdf
     from services.web_reader import fetch_web_content
-    import io
 
     try:
         # JSONをパース
@@ -3728,9 +3825,7 @@ async def execute_project(
                     logger.info(f"Looking for file with key '{key}' in file_map")
                     if key in file_map:
                         file = file_map[key]
-                        content = await file.read()
-                        logger.info(f"Read {len(content)} bytes from file")
-                        text = extract_text_from_pdf(io.BytesIO(content))
+                        text, _ = await process_upload(file, "pdf", extract_pdf_text)
                         context[key] = text
                         logger.info(f"Extracted text from PDF '{label}': {len(text)} chars")
                     else:
@@ -3745,7 +3840,7 @@ async def execute_project(
                         from services.sheet_service import is_google_sheets_url, read_public_sheet, format_csv_for_prompt
                         if is_google_sheets_url(url):
                             try:
-                                csv_text = read_public_sheet(url)
+                                csv_text = read_public_sheet(url, max_rows=100)
                                 text = format_csv_for_prompt(csv_text)
                                 logger.info(f"Fetched Google Sheet from '{url}': {len(text)} chars")
                             except ValueError as e:
@@ -3927,9 +4022,7 @@ async def execute_project_stream(
     スライド作成タスクの場合はGoogle Slides APIでスライドを生成
     """
     from starlette.responses import StreamingResponse
-    from services.pdf_reader import extract_text_from_pdf
     from services.web_reader import fetch_web_content
-    import io
     import asyncio
 
     async def generate():
@@ -3959,8 +4052,7 @@ async def execute_project_stream(
                     if input_type == "file":
                         if key in file_map:
                             file = file_map[key]
-                            content = await file.read()
-                            text = extract_text_from_pdf(io.BytesIO(content))
+                            text, _ = await process_upload(file, "pdf", extract_pdf_text)
                             context[key] = text
                         else:
                             context[key] = f"（{label}のファイルが見つかりませんでした）"
@@ -3971,7 +4063,7 @@ async def execute_project_stream(
                             from services.sheet_service import is_google_sheets_url, read_public_sheet, format_csv_for_prompt
                             if is_google_sheets_url(url):
                                 try:
-                                    csv_text = read_public_sheet(url)
+                                    csv_text = read_public_sheet(url, max_rows=100)
                                     text = format_csv_for_prompt(csv_text)
                                 except ValueError as e:
                                     text = f"（スプレッドシートの読み込みに失敗しました: {str(e)}）"
@@ -4566,13 +4658,11 @@ async def execute_project_stream_v2(
     - complete: プロジェクト全体完了
     - error: エラー発生
     """
-    from services.pdf_reader import extract_text_from_pdf
     from services.web_reader import fetch_web_content
     from graphs import run_generator_only_stream
     from starlette.responses import StreamingResponse
     from services import notification_service
     from services.notification_service import LogAction, LogLevel, NotificationType
-    import io
 
     # user_id（シングルユーザーモード）
     user_id = 1
@@ -4611,8 +4701,7 @@ async def execute_project_stream_v2(
                     if input_type == "file":
                         if key in file_map:
                             file = file_map[key]
-                            content = await file.read()
-                            text = extract_text_from_pdf(io.BytesIO(content))
+                            text, _ = await process_upload(file, "pdf", extract_pdf_text)
                             context[key] = text
                         else:
                             context[key] = f"（{label}のファイルが提供されていません）"
@@ -4996,7 +5085,6 @@ async def _run_project_background(
     """
     バックグラウンドでプロジェクトを実行する内部関数
     """
-    from services.pdf_reader import extract_text_from_pdf
     from services.web_reader import fetch_web_content
     from graphs import run_generator_only_stream
     from services import notification_service
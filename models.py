@@ -1,6 +1,7 @@
+import hashlib
 from datetime import datetime, date, timezone, timedelta
 
-from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Date, DateTime, ForeignKey, Index, Integer, String, Text, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database import Base
@@ -14,6 +15,13 @@ def now_jst() -> datetime:
     return datetime.now(JST)
 
 
+def content_hash(data: str | None) -> str | None:
+    """画像データのハッシュ（画像URLのバージョン・ETag用）を返す"""
+    if not data:
+        return None
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
 class User(Base):
     """ユーザー（プレイヤー）情報"""
     __tablename__ = "users"
@@ -27,7 +35,9 @@ class User(Base):
     company_name: Mapped[str] = mapped_column(String(100), default="新規開拓株式会社")
     user_name: Mapped[str | None] = mapped_column(String(100), nullable=True)  # 担当者名
     job_title: Mapped[str | None] = mapped_column(String(100), nullable=True)  # 役職
-    avatar_data: Mapped[str | None] = mapped_column(Text, nullable=True)  # アバター画像(Base64)
+    # アバター画像(Base64)。一覧取得時に読み込まないよう遅延ロードにする
+    avatar_data: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
+    avatar_hash: Mapped[str | None] = mapped_column(String(16), nullable=True)  # avatar_dataのハッシュ
     coin: Mapped[int] = mapped_column(Integer, default=1000)
     ruby: Mapped[int] = mapped_column(Integer, default=10)
     rank: Mapped[str] = mapped_column(String(50), default="ブロンズ")
@@ -67,7 +77,9 @@ class Crew(Base):
     level: Mapped[int] = mapped_column(Integer, default=1)
     exp: Mapped[int] = mapped_column(Integer, default=0)
     image_url: Mapped[str] = mapped_column(String(255), nullable=False)
-    image_base64: Mapped[str | None] = mapped_column(Text, nullable=True)  # Base64画像データ（本番環境用）
+    # Base64画像データ（本番環境用）。一覧取得時に読み込まないよう遅延ロードにする
+    image_base64: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
+    image_hash: Mapped[str | None] = mapped_column(String(16), nullable=True)  # image_base64のハッシュ
     personality: Mapped[str] = mapped_column(Text, nullable=True)
     is_partner: Mapped[bool] = mapped_column(Boolean, default=False)  # 相棒フラグ
     rarity: Mapped[int] = mapped_column(Integer, default=1)  # レアリティ（★1〜★5）
@@ -81,6 +93,10 @@ class Crew(Base):
 class TaskLog(Base):
     """タスク実行履歴を保存するテーブル"""
     __tablename__ = "task_logs"
+    __table_args__ = (
+        Index("ix_task_logs_crew_id_created_at", "crew_id", "created_at"),  # クルーのタスク履歴
+        Index("ix_task_logs_created_at", "created_at"),  # 日報の当日タスク数
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     crew_id: Mapped[int] = mapped_column(Integer, ForeignKey("crews.id"), nullable=False)
@@ -98,6 +114,9 @@ class TaskLog(Base):
 class DailyLog(Base):
     """日報（デイリーレポート）を管理"""
     __tablename__ = "daily_logs"
+    __table_args__ = (
+        Index("ix_daily_logs_user_id_date", "user_id", "date"),  # 日報・スタンプ
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -106,6 +125,7 @@ class DailyLog(Base):
     earned_coins: Mapped[int] = mapped_column(Integer, default=0)  # 獲得コイン
     partner_comment: Mapped[str | None] = mapped_column(Text, nullable=True)  # 相棒からの労いメッセージ
     login_stamp: Mapped[bool] = mapped_column(Boolean, default=False)  # ログインスタンプ取得済み
+    streak_days: Mapped[int | None] = mapped_column(Integer, nullable=True)  # この日までの連続ログイン日数
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=now_jst, nullable=False
     )
@@ -130,6 +150,9 @@ class Gadget(Base):
 class CrewGadget(Base):
     """クルーのガジェット装備（中間テーブル）"""
     __tablename__ = "crew_gadgets"
+    __table_args__ = (
+        Index("ix_crew_gadgets_crew_id", "crew_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     crew_id: Mapped[int] = mapped_column(Integer, ForeignKey("crews.id"), nullable=False)
@@ -162,6 +185,9 @@ class Skill(Base):
 class CrewSkill(Base):
     """クルーのスキル（中間テーブル）"""
     __tablename__ = "crew_skills"
+    __table_args__ = (
+        Index("ix_crew_skills_crew_id", "crew_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     crew_id: Mapped[int] = mapped_column(Integer, ForeignKey("crews.id"), nullable=False)
@@ -284,6 +310,10 @@ class SavedProject(Base):
 class Notification(Base):
     """ユーザーへの通知"""
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_is_read_created_at", "user_id", "is_read", "created_at"),  # 未読数・未読一覧
+        Index("ix_notifications_user_id_created_at", "user_id", "created_at"),  # 通知一覧（キーセットページネーション）
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -300,6 +330,10 @@ class Notification(Base):
 class ActivityLog(Base):
     """システムアクティビティログ（バックグラウンドタスクの履歴等）"""
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        Index("ix_activity_logs_user_id_created_at", "user_id", "created_at"),  # ログ一覧
+        Index("ix_activity_logs_user_id_level_action", "user_id", "level", "action"),  # ログの絞り込み
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -338,6 +372,10 @@ class ExecutionStatus:
 class BackgroundExecution(Base):
     """バックグラウンド実行の状態管理"""
     __tablename__ = "background_executions"
+    __table_args__ = (
+        Index("ix_background_executions_user_id_status_created_at", "user_id", "status", "created_at"),  # 実行一覧・実行中の件数
+        Index("ix_background_executions_user_id_created_at", "user_id", "created_at"),  # 実行一覧（絞り込みなし）
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -405,3 +443,14 @@ class ApprovalRequest(Base):
     )
     reviewed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)  # 承認期限（オプション）
+
+
+# 画像データが更新されたらハッシュも更新する（画像URLのバージョンが変わりキャッシュが切り替わる）
+@event.listens_for(User.avatar_data, "set")
+def _update_avatar_hash(target, value, oldvalue, initiator):
+    target.avatar_hash = content_hash(value)
+
+
+@event.listens_for(Crew.image_base64, "set")
+def _update_image_hash(target, value, oldvalue, initiator):
+    target.image_hash = content_hash(value)
@@ -12,9 +12,10 @@ from typing import Optional, Set
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from models import (
     User as UserModel,
     Crew as CrewModel,
@@ -24,6 +25,7 @@ from models import (
 )
 from services import notification_service
 from services.notification_service import LogAction, LogLevel
+from services.pagination import get_cached_count, invalidate_counts, keyset_condition, set_cached_count, split_page
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +51,13 @@ def clear_cancelled(execution_id: int):
     _cancelled_executions.discard(execution_id)
 
 
+async def commit_status_change(db: AsyncSession, execution) -> None:
+    """実行状態の変更をコミットし、状態で絞り込んだ一覧の件数キャッシュを破棄する"""
+    user_id = execution.user_id
+    await db.commit()
+    invalidate_counts("background_executions", user_id)
+
+
 # --- Pydantic Schemas ---
 
 class StartTaskBackgroundRequest(BaseModel):
@@ -110,14 +119,15 @@ class BackgroundListResponse(BaseModel):
     """バックグラウンド実行一覧レスポンス"""
     executions: list[BackgroundExecutionResponse]
     running_count: int
-    total: int
+    total: int  # 件数はキャッシュされるため直近の追加・削除が反映されていない場合がある
+    next_cursor: Optional[str] = None  # 次ページのカーソル（最後のページならNone）
 
 
 # --- Helper Functions ---
 
-def get_current_user(db: Session = Depends(get_db)) -> UserModel:
+async def get_current_user(db: AsyncSession = Depends(get_async_db)) -> UserModel:
     """現在のユーザーを取得（シングルユーザーモード）"""
-    user = db.query(UserModel).filter(UserModel.id == 1).first()
+    user = await db.get(UserModel, 1)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -132,16 +142,14 @@ async def execute_task_background(
     google_access_token: Optional[str],
 ):
     """タスクをバックグラウンドで実行"""
-    from database import SessionLocal
+    from database import AsyncSessionLocal
     from models import Crew as CrewModel, BackgroundExecution, TaskLog, now_jst
     from services.bedrock_service import execute_task_with_crew
 
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         # 実行レコードを取得
-        execution = db.query(BackgroundExecution).filter(
-            BackgroundExecution.id == execution_id
-        ).first()
+        execution = await db.get(BackgroundExecution, execution_id)
         if not execution:
             return
 
@@ -150,7 +158,7 @@ async def execute_task_background(
             execution.status = ExecutionStatus.CANCELLED
             execution.progress_message = "キャンセルされました"
             execution.completed_at = now_jst()
-            db.commit()
+            await commit_status_change(db, execution)
             clear_cancelled(execution_id)
             return
 
@@ -158,15 +166,15 @@ async def execute_task_background(
         execution.status = ExecutionStatus.RUNNING
         execution.started_at = now_jst()
         execution.progress_message = "タスクを実行中..."
-        db.commit()
+        await commit_status_change(db, execution)
 
         # クルーを取得
-        crew = db.query(CrewModel).filter(CrewModel.id == crew_id).first()
+        crew = await db.get(CrewModel, crew_id)
         if not crew:
             execution.status = ExecutionStatus.FAILED
             execution.error_message = "Crew not found"
             execution.completed_at = now_jst()
-            db.commit()
+            await commit_status_change(db, execution)
             return
 
         # タスク実行
@@ -207,16 +215,16 @@ async def execute_task_background(
             execution.completed_at = now_jst()
 
             # 通知作成
-            notification_service.create_notification(
-                db=db,
+            await db.run_sync(
+                notification_service.create_notification,
                 user_id=execution.user_id,
                 title="タスク完了",
                 message=f"{crew.name}がタスクを完了しました（+{exp_gained}EXP）",
                 notification_type="success",
                 link="/log",
             )
-            notification_service.write_log(
-                db=db,
+            await db.run_sync(
+                notification_service.write_log,
                 user_id=execution.user_id,
                 action=LogAction.TASK_COMPLETED,
                 message=f"バックグラウンドタスク完了: {crew.name}",
@@ -228,8 +236,8 @@ async def execute_task_background(
             execution.completed_at = now_jst()
 
             # エラー通知
-            notification_service.create_notification(
-                db=db,
+            await db.run_sync(
+                notification_service.create_notification,
                 user_id=execution.user_id,
                 title="タスク失敗",
                 message=f"{crew.name}のタスク実行に失敗しました",
@@ -237,20 +245,19 @@ async def execute_task_background(
                 link="/log",
             )
 
-        db.commit()
+        await commit_status_change(db, execution)
 
     except Exception as e:
-        # エラー処理
-        execution = db.query(BackgroundExecution).filter(
-            BackgroundExecution.id == execution_id
-        ).first()
+        # エラー処理（失敗したトランザクションを破棄してから状態を記録）
+        await db.rollback()
+        execution = await db.get(BackgroundExecution, execution_id)
         if execution:
             execution.status = ExecutionStatus.FAILED
             execution.error_message = str(e)
             execution.completed_at = now_jst()
-            db.commit()
+            await commit_status_change(db, execution)
     finally:
-        db.close()
+        await db.close()
 
 
 async def execute_project_background(
@@ -262,17 +269,15 @@ async def execute_project_background(
     google_access_token: Optional[str],
 ):
     """プロジェクトをバックグラウンドで実行"""
-    from database import SessionLocal
+    from database import AsyncSessionLocal
     from models import Crew as CrewModel, BackgroundExecution, now_jst
     from services.bedrock_service import execute_task_with_crew
     from graphs.workflow import run_generator_only
 
-    db = SessionLocal()
+    db = AsyncSessionLocal()
     try:
         # 実行レコードを取得
-        execution = db.query(BackgroundExecution).filter(
-            BackgroundExecution.id == execution_id
-        ).first()
+        execution = await db.get(BackgroundExecution, execution_id)
         if not execution:
             return
 
@@ -281,7 +286,7 @@ async def execute_project_background(
             execution.status = ExecutionStatus.CANCELLED
             execution.progress_message = "キャンセルされました"
             execution.completed_at = now_jst()
-            db.commit()
+            await commit_status_change(db, execution)
             clear_cancelled(execution_id)
             return
 
@@ -289,25 +294,25 @@ async def execute_project_background(
         execution.status = ExecutionStatus.RUNNING
         execution.started_at = now_jst()
         execution.total_steps = len(tasks)
-        db.commit()
+        await commit_status_change(db, execution)
 
         # 通知: 開始
-        notification_service.create_notification(
-            db=db,
+        await db.run_sync(
+            notification_service.create_notification,
             user_id=execution.user_id,
             title="プロジェクト開始",
             message=f"「{project_title}」の実行を開始しました",
             notification_type="info",
             link="/log",
         )
-        notification_service.write_log(
-            db=db,
+        await db.run_sync(
+            notification_service.write_log,
             user_id=execution.user_id,
             action=LogAction.PROJECT_STARTED,
             message=f"バックグラウンドプロジェクト開始: {project_title}",
             level=LogLevel.INFO,
         )
-        db.commit()
+        await db.commit()
 
         results = []
         previous_output = ""
@@ -325,18 +330,18 @@ async def execute_project_background(
                     "results": results,
                     "cancelled_at_task": idx,
                 }, ensure_ascii=False)
-                db.commit()
+                await commit_status_change(db, execution)
                 clear_cancelled(execution_id)
                 return
 
             # 進捗更新
             execution.current_step = idx + 1
             execution.progress_message = f"タスク {idx + 1}/{len(tasks)} 実行中: {task_info.get('role', 'タスク')}"
-            db.commit()
+            await db.commit()
 
             # クルーを取得
             crew_id = task_info.get("assigned_crew_id")
-            crew = db.query(CrewModel).filter(CrewModel.id == crew_id).first()
+            crew = await db.get(CrewModel, crew_id)
             if not crew:
                 continue
 
@@ -405,14 +410,14 @@ async def execute_project_background(
                 previous_output = task_result
 
                 # タスク完了通知
-                notification_service.write_log(
-                    db=db,
+                await db.run_sync(
+                    notification_service.write_log,
                     user_id=execution.user_id,
                     action=LogAction.TASK_COMPLETED,
                     message=f"タスク完了: {task_info.get('role', '')} ({crew.name}) - スコア: {score}",
                     level=LogLevel.INFO,
                 )
-                db.commit()
+                await db.commit()
 
             except Exception as e:
                 results.append({
@@ -434,43 +439,42 @@ async def execute_project_background(
         execution.completed_at = now_jst()
 
         # 完了通知
-        notification_service.create_notification(
-            db=db,
+        await db.run_sync(
+            notification_service.create_notification,
             user_id=execution.user_id,
             title="プロジェクト完了",
             message=f"「{project_title}」が完了しました",
             notification_type="success",
             link="/log",
         )
-        notification_service.write_log(
-            db=db,
+        await db.run_sync(
+            notification_service.write_log,
             user_id=execution.user_id,
             action=LogAction.PROJECT_COMPLETED,
             message=f"バックグラウンドプロジェクト完了: {project_title}",
             level=LogLevel.INFO,
         )
-        db.commit()
+        await commit_status_change(db, execution)
 
     except Exception as e:
-        execution = db.query(BackgroundExecution).filter(
-            BackgroundExecution.id == execution_id
-        ).first()
+        await db.rollback()
+        execution = await db.get(BackgroundExecution, execution_id)
         if execution:
             execution.status = ExecutionStatus.FAILED
             execution.error_message = str(e)
             execution.completed_at = now_jst()
 
-            notification_service.create_notification(
-                db=db,
+            await db.run_sync(
+                notification_service.create_notification,
                 user_id=execution.user_id,
                 title="プロジェクト失敗",
                 message=f"「{project_title}」の実行中にエラーが発生しました",
                 notification_type="error",
                 link="/log",
             )
-            db.commit()
+            await commit_status_change(db, execution)
     finally:
-        db.close()
+        await db.close()
 
 
 # --- API Endpoints ---
@@ -479,12 +483,12 @@ async def execute_project_background(
 async def start_task_background(
     request: StartTaskBackgroundRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
     """タスクをバックグラウンドで実行開始"""
     # クルー確認
-    crew = db.query(CrewModel).filter(CrewModel.id == request.crew_id).first()
+    crew = await db.get(CrewModel, request.crew_id)
     if not crew:
         raise HTTPException(status_code=404, detail="Crew not found")
 
@@ -499,8 +503,9 @@ async def start_task_background(
         progress_message="準備中...",
     )
     db.add(execution)
-    db.commit()
-    db.refresh(execution)
+    await db.commit()
+    await db.refresh(execution)
+    invalidate_counts("background_executions", current_user.id)
 
     # バックグラウンドタスク登録
     background_tasks.add_task(
@@ -528,7 +533,7 @@ async def start_task_background(
 async def start_project_background(
     request: StartProjectBackgroundRequest,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
     """プロジェクトをバックグラウンドで実行開始"""
@@ -549,8 +554,9 @@ async def start_project_background(
         progress_message="準備中...",
     )
     db.add(execution)
-    db.commit()
-    db.refresh(execution)
+    await db.commit()
+    await db.refresh(execution)
+    invalidate_counts("background_executions", current_user.id)
 
     # バックグラウンドタスク登録
     background_tasks.add_task(
@@ -581,29 +587,49 @@ async def list_background_executions(
     status: Optional[str] = None,
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
-    """バックグラウンド実行の一覧を取得"""
-    query = db.query(BackgroundExecution).filter(
-        BackgroundExecution.user_id == current_user.id
-    )
+    """バックグラウンド実行の一覧を取得（cursor指定時はoffsetを無視）"""
+    filters = [BackgroundExecution.user_id == current_user.id]
 
     if status:
-        query = query.filter(BackgroundExecution.status == status)
-
-    total = query.count()
+        filters.append(BackgroundExecution.status == status)
+
+    # 総件数（キャッシュがあれば使う）
+    count_key = ("background_executions", current_user.id, status)
+    total = get_cached_count(count_key)
+    if total is None:
+        total = await db.scalar(select(func.count(BackgroundExecution.id)).where(*filters))
+        set_cached_count(count_key, total)
     # pending, running, cancelling を実行中としてカウント
-    running_count = db.query(BackgroundExecution).filter(
-        BackgroundExecution.user_id == current_user.id,
-        BackgroundExecution.status.in_([
-            ExecutionStatus.PENDING,
-            ExecutionStatus.RUNNING,
-            ExecutionStatus.CANCELLING
-        ])
-    ).count()
+    running_count = await db.scalar(
+        select(func.count(BackgroundExecution.id)).where(
+            BackgroundExecution.user_id == current_user.id,
+            BackgroundExecution.status.in_([
+                ExecutionStatus.PENDING,
+                ExecutionStatus.RUNNING,
+                ExecutionStatus.CANCELLING
+            ])
+        )
+    )
 
-    executions = query.order_by(BackgroundExecution.created_at.desc()).offset(offset).limit(limit).all()
+    query = select(BackgroundExecution).where(*filters)
+    if cursor:
+        try:
+            query = query.where(keyset_condition(BackgroundExecution.created_at, BackgroundExecution.id, cursor))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        offset = 0
+
+    executions = (await db.scalars(
+        query
+        .order_by(BackgroundExecution.created_at.desc(), BackgroundExecution.id.desc())
+        .offset(offset)
+        .limit(limit + 1)  # 次ページの有無を判定するため1件多く取得
+    )).all()
+    executions, next_cursor = split_page(executions, limit)
 
     return BackgroundListResponse(
         executions=[
@@ -622,20 +648,23 @@ async def list_background_executions(
         ],
         running_count=running_count,
         total=total,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{execution_id}", response_model=BackgroundExecutionDetailResponse)
 async def get_background_execution(
     execution_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
     """バックグラウンド実行の詳細を取得"""
-    execution = db.query(BackgroundExecution).filter(
-        BackgroundExecution.id == execution_id,
-        BackgroundExecution.user_id == current_user.id,
-    ).first()
+    execution = await db.scalar(
+        select(BackgroundExecution).where(
+            BackgroundExecution.id == execution_id,
+            BackgroundExecution.user_id == current_user.id,
+        )
+    )
 
     if not execution:
         raise HTTPException(status_code=404, detail="Execution not found")
@@ -661,14 +690,16 @@ async def get_background_execution(
 @router.post("/{execution_id}/cancel")
 async def cancel_background_execution(
     execution_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ):
     """バックグラウンド実行をキャンセル"""
-    execution = db.query(BackgroundExecution).filter(
-        BackgroundExecution.id == execution_id,
-        BackgroundExecution.user_id == current_user.id,
-    ).first()
+    execution = await db.scalar(
+        select(BackgroundExecution).where(
+            BackgroundExecution.id == execution_id,
+            BackgroundExecution.user_id == current_user.id,
+        )
+    )
 
     if not execution:
         raise HTTPException(status_code=404, detail="Execution not found")
@@ -690,11 +721,11 @@ async def cancel_background_execution(
     # 2. DBステータスを「cancelling」に更新（UI表示および再起動時の復元用）
     execution.status = ExecutionStatus.CANCELLING
     execution.progress_message = "キャンセル処理中..."
-    db.commit()
+    await commit_status_change(db, execution)
 
     # 通知作成
-    notification_service.create_notification(
-        db=db,
+    await db.run_sync(
+        notification_service.create_notification,
         user_id=execution.user_id,
         title="キャンセル要求",
         message=f"「{execution.project_title or execution.task_content or 'タスク'}」のキャンセルを要求しました",
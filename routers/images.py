@@ -0,0 +1,130 @@
+"""
+画像配信ルーター
+
+/api/images/{crew_id} - クルー画像
+/api/images/avatars/{user_id} - ユーザーのアバター画像
+
+DBのBase64画像をバイナリとして返す。URLにはハッシュ（?v=...）が付くため、
+ETag と長期間の Cache-Control を付けてブラウザにキャッシュさせる。
+size パラメータ（sm / md / lg）を指定するとWebP/AVIFのサムネイルを返す。
+"""
+
+import asyncio
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from models import Crew, User as UserModel
+from services.image_derivatives import (
+    MEDIA_TYPES,
+    THUMBNAIL_SIZES,
+    choose_format,
+    derivative_path,
+    ensure_derivatives,
+)
+from services.image_serving import IMAGE_CACHE_MAX_AGE, decode_image_data, etag_matches
+
+router = APIRouter(prefix="/api/images", tags=["images"])
+
+
+async def _image_response(
+    request: Request,
+    image_hash: str | None,
+    load_data: Callable[[], Awaitable[str | None]],
+    size: str | None,
+) -> Response:
+    """
+    画像をETag・Cache-Control付きのレスポンスに変換する
+
+    Args:
+        request: リクエスト（If-None-Match / Accept を参照）
+        image_hash: 画像のハッシュ
+        load_data: Base64画像データを読み込む関数（必要な場合のみ呼び出す）
+        size: サムネイルのサイズ（Noneの場合は元画像）
+    """
+    if not image_hash:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if size is not None and size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"size は {', '.join(THUMBNAIL_SIZES)} のいずれかを指定してください",
+        )
+
+    fmt = choose_format(request.headers.get("accept")) if size else None
+    etag = f'"{image_hash}-{size}.{fmt}"' if size else f'"{image_hash}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={IMAGE_CACHE_MAX_AGE}, immutable",
+    }
+    if size:
+        headers["Vary"] = "Accept"
+
+    # 変更がなければ本文を返さない
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if size:
+        path = derivative_path(image_hash, size, fmt)
+        if not path.exists():
+            # 派生ファイルの生成前に作られた画像はここで生成する
+            await ensure_derivatives(await load_data(), image_hash)
+        if path.exists():
+            content = await asyncio.to_thread(path.read_bytes)
+            return Response(content=content, media_type=MEDIA_TYPES[fmt], headers=headers)
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    data = await load_data()
+    if not data:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    try:
+        image_bytes, media_type = decode_image_data(data)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    return Response(content=image_bytes, media_type=media_type, headers=headers)
+
+
+# --- API Endpoints ---
+
+@router.get("/avatars/{user_id}")
+async def get_avatar_image(
+    user_id: int,
+    request: Request,
+    size: str | None = Query(None, description="サムネイルのサイズ（sm / md / lg）"),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """
+    ユーザーのアバター画像を取得
+    """
+    user = await db.get(UserModel, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    async def load_avatar() -> str | None:
+        return await db.scalar(select(UserModel.avatar_data).where(UserModel.id == user_id))
+
+    return await _image_response(request, user.avatar_hash, load_avatar, size)
+
+
+@router.get("/{crew_id}")
+async def get_crew_image(
+    crew_id: int,
+    request: Request,
+    size: str | None = Query(None, description="サムネイルのサイズ（sm / md / lg）"),
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """
+    クルー画像を取得
+    """
+    crew = await db.get(Crew, crew_id)
+    if not crew:
+        raise HTTPException(status_code=404, detail="Crew not found")
+
+    async def load_image() -> str | None:
+        return await db.scalar(select(Crew.image_base64).where(Crew.id == crew_id))
+
+    return await _image_response(request, crew.image_hash, load_image, size)
@@ -10,12 +10,14 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from models import User as UserModel, Notification, ActivityLog
 from services import notification_service
 from services.notification_service import LogLevel
+from services.pagination import get_cached_count, invalidate_counts, set_cached_count, split_page
 
 router = APIRouter(prefix="/api", tags=["notifications"])
 
@@ -40,7 +42,8 @@ class NotificationsListResponse(BaseModel):
     """通知一覧レスポンス"""
     notifications: list[NotificationResponse]
     unread_count: int
-    total: int
+    total: int  # 件数はキャッシュされるため直近の追加・削除が反映されていない場合がある
+    next_cursor: Optional[str] = None  # 次ページのカーソル（最後のページならNone）
 
 
 class ActivityLogResponse(BaseModel):
@@ -60,7 +63,8 @@ class ActivityLogResponse(BaseModel):
 class ActivityLogsListResponse(BaseModel):
     """ログ一覧レスポンス"""
     logs: list[ActivityLogResponse]
-    total: int
+    total: int  # 件数はキャッシュされるため直近の追加・削除が反映されていない場合がある
+    next_cursor: Optional[str] = None  # 次ページのカーソル（最後のページならNone）
 
 
 class MarkReadResponse(BaseModel):
@@ -82,11 +86,11 @@ class UnreadCountResponse(BaseModel):
 
 # --- Helper Functions ---
 
-def get_current_user(db: Session = Depends(get_db)) -> UserModel:
+async def get_current_user(db: AsyncSession = Depends(get_async_db)) -> UserModel:
     """
     現在のユーザーを取得（シングルユーザーモードなのでID=1固定）
     """
-    user = db.query(UserModel).filter(UserModel.id == 1).first()
+    user = await db.get(UserModel, 1)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -98,28 +102,38 @@ def get_current_user(db: Session = Depends(get_db)) -> UserModel:
 async def get_notifications(
     unread_only: bool = Query(False, description="未読のみ取得"),
     limit: int = Query(50, ge=1, le=100, description="取得件数"),
-    offset: int = Query(0, ge=0, description="オフセット"),
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0, description="オフセット（cursor指定時は無視）"),
+    cursor: Optional[str] = Query(None, description="次ページのカーソル（前回のnext_cursor）"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> NotificationsListResponse:
     """
     通知一覧を取得
     """
-    notifications = notification_service.get_notifications(
-        db=db,
-        user_id=current_user.id,
-        unread_only=unread_only,
-        limit=limit,
-        offset=offset,
-    )
-
-    unread_count = notification_service.get_unread_count(db, current_user.id)
-
-    # 総件数を取得
-    total_query = db.query(Notification).filter(Notification.user_id == current_user.id)
-    if unread_only:
-        total_query = total_query.filter(Notification.is_read == False)
-    total = total_query.count()
+    try:
+        notifications = await db.run_sync(
+            notification_service.get_notifications,
+            user_id=current_user.id,
+            unread_only=unread_only,
+            limit=limit + 1,  # 次ページの有無を判定するため1件多く取得
+            offset=offset,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    notifications, next_cursor = split_page(notifications, limit)
+
+    unread_count = await db.run_sync(notification_service.get_unread_count, current_user.id)
+
+    # 総件数を取得（キャッシュがあれば使う）
+    count_key = ("notifications", current_user.id, unread_only)
+    total = get_cached_count(count_key)
+    if total is None:
+        total_query = select(func.count(Notification.id)).where(Notification.user_id == current_user.id)
+        if unread_only:
+            total_query = total_query.where(Notification.is_read == False)
+        total = await db.scalar(total_query)
+        set_cached_count(count_key, total)
 
     return NotificationsListResponse(
         notifications=[
@@ -136,32 +150,33 @@ async def get_notifications(
         ],
         unread_count=unread_count,
         total=total,
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/notifications/unread-count", response_model=UnreadCountResponse)
 async def get_unread_count(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> UnreadCountResponse:
     """
     未読通知の件数を取得
     """
-    count = notification_service.get_unread_count(db, current_user.id)
+    count = await db.run_sync(notification_service.get_unread_count, current_user.id)
     return UnreadCountResponse(unread_count=count)
 
 
 @router.put("/notifications/{notification_id}/read", response_model=MarkReadResponse)
 async def mark_notification_as_read(
     notification_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> MarkReadResponse:
     """
     指定した通知を既読にする
     """
-    notification = notification_service.mark_as_read(
-        db=db,
+    notification = await db.run_sync(
+        notification_service.mark_as_read,
         notification_id=notification_id,
         user_id=current_user.id,
     )
@@ -174,14 +189,14 @@ async def mark_notification_as_read(
 
 @router.put("/notifications/read-all", response_model=MarkReadResponse)
 async def mark_all_notifications_as_read(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> MarkReadResponse:
     """
     全ての通知を既読にする
     """
-    count = notification_service.mark_all_as_read(
-        db=db,
+    count = await db.run_sync(
+        notification_service.mark_all_as_read,
         user_id=current_user.id,
     )
 
@@ -199,8 +214,9 @@ async def get_activity_logs(
     level: Optional[str] = Query(None, description="ログレベルでフィルタ (INFO/ERROR/WARNING/DEBUG)"),
     action: Optional[str] = Query(None, description="アクション種別でフィルタ"),
     limit: int = Query(100, ge=1, le=500, description="取得件数"),
-    offset: int = Query(0, ge=0, description="オフセット"),
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0, description="オフセット（cursor指定時は無視）"),
+    cursor: Optional[str] = Query(None, description="次ページのカーソル（前回のnext_cursor）"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> ActivityLogsListResponse:
     """
@@ -217,25 +233,34 @@ async def get_activity_logs(
                 detail=f"Invalid log level: {level}. Must be one of: INFO, ERROR, WARNING, DEBUG"
             )
 
-    logs = notification_service.get_logs(
-        db=db,
-        user_id=current_user.id,
-        project_id=project_id,
-        level=log_level,
-        action=action,
-        limit=limit,
-        offset=offset,
-    )
-
-    # 総件数を取得
-    total_query = db.query(ActivityLog).filter(ActivityLog.user_id == current_user.id)
-    if project_id is not None:
-        total_query = total_query.filter(ActivityLog.project_id == project_id)
-    if log_level is not None:
-        total_query = total_query.filter(ActivityLog.level == log_level.value)
-    if action is not None:
-        total_query = total_query.filter(ActivityLog.action == action)
-    total = total_query.count()
+    try:
+        logs = await db.run_sync(
+            notification_service.get_logs,
+            user_id=current_user.id,
+            project_id=project_id,
+            level=log_level,
+            action=action,
+            limit=limit + 1,  # 次ページの有無を判定するため1件多く取得
+            offset=offset,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    logs, next_cursor = split_page(logs, limit)
+
+    # 総件数を取得（キャッシュがあれば使う）
+    count_key = ("activity_logs", current_user.id, project_id, log_level, action)
+    total = get_cached_count(count_key)
+    if total is None:
+        total_query = select(func.count(ActivityLog.id)).where(ActivityLog.user_id == current_user.id)
+        if project_id is not None:
+            total_query = total_query.where(ActivityLog.project_id == project_id)
+        if log_level is not None:
+            total_query = total_query.where(ActivityLog.level == log_level.value)
+        if action is not None:
+            total_query = total_query.where(ActivityLog.action == action)
+        total = await db.scalar(total_query)
+        set_cached_count(count_key, total)
 
     return ActivityLogsListResponse(
         logs=[
@@ -251,27 +276,31 @@ async def get_activity_logs(
             for log in logs
         ],
         total=total,
+        next_cursor=next_cursor,
     )
 
 
 @router.delete("/logs/{log_id}", response_model=DeleteLogResponse)
 async def delete_activity_log(
     log_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user),
 ) -> DeleteLogResponse:
     """
     指定したアクティビティログを削除する
     """
-    log = db.query(ActivityLog).filter(
-        ActivityLog.id == log_id,
-        ActivityLog.user_id == current_user.id
-    ).first()
+    log = await db.scalar(
+        select(ActivityLog).where(
+            ActivityLog.id == log_id,
+            ActivityLog.user_id == current_user.id
+        )
+    )
 
     if log is None:
         raise HTTPException(status_code=404, detail="Log not found")
 
-    db.delete(log)
-    db.commit()
+    await db.delete(log)
+    await db.commit()
+    invalidate_counts("activity_logs", current_user.id)
 
     return DeleteLogResponse(success=True, message="ログを削除しました")
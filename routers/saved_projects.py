@@ -120,21 +120,19 @@ async def list_saved_projects(
         SavedProject.created_at.desc()
     ).all()
 
+    # 担当クルー名をまとめて取得（プロジェクトごとのクエリを避ける）
+    crew_ids = {p.crew_id for p in projects if p.crew_id}
+    crew_names = dict(db.query(Crew.id, Crew.name).filter(Crew.id.in_(crew_ids)).all()) if crew_ids else {}
+
     result = []
     for p in projects:
-        crew_name = None
-        if p.crew_id:
-            crew = db.query(Crew).filter(Crew.id == p.crew_id).first()
-            if crew:
-                crew_name = crew.name
-
         result.append(SavedProjectResponse(
             id=p.id,
             title=p.title,
             description=p.description,
             prompt_template=p.prompt_template,
             crew_id=p.crew_id,
-            crew_name=crew_name,
+            crew_name=crew_names.get(p.crew_id),
             is_favorite=p.is_favorite,
             run_count=p.run_count,
             last_run_at=p.last_run_at,
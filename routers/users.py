@@ -10,6 +10,8 @@ from sqlalchemy.orm import Session
 
 from database import get_db
 from models import User as UserModel
+from services.image_derivatives import THUMBNAIL_SIZES, schedule_derivatives
+from services.image_serving import avatar_url, is_image_data
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -22,7 +24,7 @@ class UserResponse(BaseModel):
     company_name: str
     user_name: str | None
     job_title: str | None
-    avatar_data: str | None
+    avatar_data: str | None  # アバター画像のURL（/api/images/avatars/...）
     coin: int
     ruby: int
     rank: str
@@ -37,7 +39,7 @@ class UserUpdate(BaseModel):
     company_name: str | None = None
     user_name: str | None = None
     job_title: str | None = None
-    avatar_data: str | None = None  # Base64エンコードされた画像データ
+    avatar_data: str | None = None  # Base64エンコードされた画像データ（data URI可。URLは変更なしとして無視）
 
 
 # --- Helper Functions ---
@@ -56,17 +58,26 @@ def get_current_user(db: Session = Depends(get_db)) -> UserModel:
 
 @router.get("/me", response_model=UserResponse)
 async def get_my_profile(
+    image_size: str | None = None,
     current_user: UserModel = Depends(get_current_user),
 ) -> UserResponse:
     """
     現在ログインしているユーザーの情報を取得
+
+    image_size（sm / md / lg）を指定するとアバターはサムネイルのURLを返す
     """
+    if image_size is not None and image_size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"image_size は {', '.join(THUMBNAIL_SIZES)} のいずれかを指定してください",
+        )
+
     return UserResponse(
         id=current_user.id,
         company_name=current_user.company_name,
         user_name=current_user.user_name,
         job_title=current_user.job_title,
-        avatar_data=current_user.avatar_data,
+        avatar_data=avatar_url(current_user, image_size),
         coin=current_user.coin,
         ruby=current_user.ruby,
         rank=current_user.rank,
@@ -90,19 +101,28 @@ async def update_my_profile(
         current_user.user_name = update_data.user_name
     if update_data.job_title is not None:
         current_user.job_title = update_data.job_title
-    if update_data.avatar_data is not None:
+    avatar_changed = False
+    if update_data.avatar_data == "":
         # 空文字の場合はNoneに設定（アバター削除）
-        current_user.avatar_data = update_data.avatar_data if update_data.avatar_data else None
+        current_user.avatar_data = None
+    elif update_data.avatar_data and is_image_data(update_data.avatar_data):
+        current_user.avatar_data = update_data.avatar_data
+        avatar_changed = True
+    # それ以外（GET /me で返したアバターURLをそのまま送り返した場合など）は変更しない
 
     db.commit()
     db.refresh(current_user)
 
+    if avatar_changed:
+        # サムネイルをバックグラウンドで生成
+        schedule_derivatives(update_data.avatar_data, current_user.avatar_hash)
+
     return UserResponse(
         id=current_user.id,
         company_name=current_user.company_name,
         user_name=current_user.user_name,
         job_title=current_user.job_title,
-        avatar_data=current_user.avatar_data,
+        avatar_data=avatar_url(current_user),
         coin=current_user.coin,
         ruby=current_user.ruby,
         rank=current_user.rank,
@@ -0,0 +1,204 @@
+"""
+添付ファイルストア
+
+アップロードされたファイルをチャンク単位で一時領域に書き出し、SHA-256をキーに保存する。
+解析結果（抽出テキストやBase64）もBlobの隣にJSONで保存し、
+同じファイルが再アップロードされた場合は解析をスキップする。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+# 保存先ディレクトリ
+ATTACHMENT_STORE_DIR = Path(
+    os.getenv("ATTACHMENT_STORE_DIR", os.path.join(tempfile.gettempdir(), "kurukuru_attachments"))
+)
+
+# ストア全体の最大サイズ（超えたら古いものから削除）
+MAX_STORE_BYTES = int(os.getenv("ATTACHMENT_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# アップロードを読み込むチャンクサイズ
+CHUNK_SIZE = 1024 * 1024
+
+
+def _blob_path(digest: str) -> Path:
+    return ATTACHMENT_STORE_DIR / f"{digest}.bin"
+
+
+def _result_path(digest: str, kind: str) -> Path:
+    # kindにはファイル名などが含まれるためハッシュ化してファイル名にする
+    kind_hash = hashlib.sha256(kind.encode("utf-8")).hexdigest()[:16]
+    return ATTACHMENT_STORE_DIR / f"{digest}.{kind_hash}.json"
+
+
+async def save_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> Tuple[str, Path, int]:
+    """
+    アップロードファイルをチャンク単位で読み込み、SHA-256をキーにストアへ保存する
+
+    ファイル全体をメモリに載せないため、1リクエストあたりのメモリ使用量はCHUNK_SIZE程度に収まる
+
+    Args:
+        upload: アップロードされたファイル
+        max_bytes: 許容する最大サイズ（超えた場合はValueError）
+
+    Returns:
+        Tuple[str, Path, int]: (SHA-256, 保存先パス, サイズ)
+
+    Raises:
+        ValueError: max_bytesを超えた場合
+    """
+    ATTACHMENT_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+    sha256 = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=ATTACHMENT_STORE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"ファイルサイズが大きすぎます（最大{max_bytes // (1024 * 1024)}MB）")
+                sha256.update(chunk)
+                tmp.write(chunk)
+
+        digest = sha256.hexdigest()
+        path = _blob_path(digest)
+        try:
+            # 同じ内容が保存済みなら最終利用日時だけ更新する
+            os.utime(path)
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            # 未保存（または確認中に削除された）場合は保存する
+            os.replace(tmp_name, path)
+            await asyncio.to_thread(_prune_store)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    logger.info(f"Stored upload {upload.filename}: {digest[:12]} ({size} bytes)")
+    return digest, path, size
+
+
+def load_result(digest: str, kind: str) -> Optional[Any]:
+    """
+    保存済みの解析結果を読み込む
+
+    Args:
+        digest: ファイルのSHA-256
+        kind: 解析の種類（処理内容・パラメータを含む文字列）
+
+    Returns:
+        解析結果。未保存の場合はNone
+    """
+    path = _result_path(digest, kind)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        os.utime(_blob_path(digest))
+        return result
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_result(digest: str, kind: str, result: Any) -> None:
+    """
+    解析結果をBlobの隣に保存する
+
+    Args:
+        digest: ファイルのSHA-256
+        kind: 解析の種類（処理内容・パラメータを含む文字列）
+        result: JSONに変換可能な解析結果
+    """
+    path = _result_path(digest, kind)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError) as e:
+        logger.warning(f"Failed to save attachment result {digest[:12]}: {e}")
+
+
+async def process_upload(
+    upload: UploadFile,
+    kind: str,
+    processor: Callable[[Path], Awaitable[Any]],
+    max_bytes: Optional[int] = None,
+) -> Any:
+    """
+    アップロードファイルを保存し、解析結果を返す（保存済みの結果があれば再解析しない）
+
+    processorには保存先のパスを渡すため、ファイル全体をメモリに読み込むかどうかは解析側に任せる
+
+    Args:
+        upload: アップロードされたファイル
+        kind: 解析の種類（処理内容・パラメータを含む文字列）
+        processor: 保存先のパスを受け取って解析結果を返す非同期関数
+        max_bytes: 許容する最大サイズ
+
+    Returns:
+        processorの戻り値（キャッシュから読んだ場合はJSONから復元した値）
+    """
+    digest, path, _ = await save_upload(upload, max_bytes)
+
+    cached = await asyncio.to_thread(load_result, digest, kind)
+    if cached is not None:
+        logger.info(f"Attachment result cache hit: {upload.filename} ({kind.split(':')[0]})")
+        return cached
+
+    result = await processor(path)
+    await asyncio.to_thread(save_result, digest, kind, result)
+    return result
+
+
+def _prune_store() -> None:
+    """
+    ストアの合計サイズ（Blobと解析結果のJSON）がMAX_STORE_BYTESを超えた場合、
+    最終利用が古いBlobから解析結果ごと削除する
+    """
+    # SHA-256 → 関連ファイルの (パス, サイズ, mtime)
+    groups: Dict[str, List[Tuple[Path, int, float]]] = {}
+    total = 0
+    for path in ATTACHMENT_STORE_DIR.iterdir():
+        # 書き込み中の一時ファイル（.part / .tmp）は対象外
+        if path.suffix not in (".bin", ".json"):
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        digest = path.name.split(".", 1)[0]
+        groups.setdefault(digest, []).append((path, stat.st_size, stat.st_mtime))
+        total += stat.st_size
+
+    if total <= MAX_STORE_BYTES:
+        return
+
+    def last_used(files: List[Tuple[Path, int, float]]) -> float:
+        # Blobのmtime（load_resultで更新される）。Blobが残っていなければ解析結果の最新のmtime
+        blob_mtimes = [mtime for path, _, mtime in files if path.suffix == ".bin"]
+        return blob_mtimes[0] if blob_mtimes else max(mtime for _, _, mtime in files)
+
+    for files in sorted(groups.values(), key=last_used):
+        for path, size, _ in files:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        if total <= MAX_STORE_BYTES:
+            break
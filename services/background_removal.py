@@ -0,0 +1,198 @@
+"""
+背景除去サービス
+
+rembg の推論セッション（ONNX Runtime）をモデルごとにプロセス内で1つだけ生成して使い回す。
+速度と品質のバランスはティア（REMBG_TIER）で切り替える。
+セッションはサーバー起動時にバックグラウンドで読み込み、
+推論は専用のスレッドプールで実行してイベントループを塞がないようにする。
+（ONNX Runtime は推論中にGILを解放し、セッションはスレッド間で共有できる）
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# 背景除去の品質ティア: ティア名 → (rembgのモデル名, マスク推定時の長辺ピクセル数)
+# マスク推定時の長辺がNoneの場合は元の解像度のまま rembg.remove で処理する。
+# 指定がある場合は縮小した画像でマスクを推定し、元の解像度に拡大して適用する。
+# いずれのティアもアルファマッティングは行わない。
+REMBG_TIERS = {
+    "quality": ("u2net", None),    # 従来どおり（最も高品質・低速）
+    "balanced": ("silueta", 320),  # u2netの軽量版（モデル約43MB）
+    "fast": ("u2netp", 320),       # 最軽量（モデル約4.7MB）
+}
+
+# 使用するティア
+REMBG_TIER = os.getenv("REMBG_TIER", "quality")
+
+# ONNX Runtime のスレッド数（0はONNX Runtimeの既定値 = CPUコア数）
+REMBG_INTRA_OP_THREADS = int(os.getenv("REMBG_INTRA_OP_THREADS", "0"))
+REMBG_INTER_OP_THREADS = int(os.getenv("REMBG_INTER_OP_THREADS", "0"))
+
+# 同時に実行する背景除去の数
+REMBG_WORKERS = int(os.getenv("REMBG_WORKERS", "1"))
+
+_sessions: dict = {}
+_session_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _resolve_tier(tier: Optional[str]) -> Tuple[str, Optional[int]]:
+    """ティア名から (モデル名, マスク推定時の長辺) を取得する"""
+    tier = tier or REMBG_TIER
+    if tier not in REMBG_TIERS:
+        raise ValueError(f"Unknown rembg tier: {tier}（{', '.join(REMBG_TIERS)} のいずれかを指定してください）")
+    return REMBG_TIERS[tier]
+
+
+def _create_session(model_name: str):
+    """スレッド数を指定してrembgのセッションを生成する"""
+    import onnxruntime as ort
+    from rembg.sessions import sessions_class
+
+    session_class = next((sc for sc in sessions_class if sc.name() == model_name), None)
+    if session_class is None:
+        raise ValueError(f"Unknown rembg model: {model_name}")
+
+    sess_opts = ort.SessionOptions()
+    if REMBG_INTRA_OP_THREADS > 0:
+        sess_opts.intra_op_num_threads = REMBG_INTRA_OP_THREADS
+    if REMBG_INTER_OP_THREADS > 0:
+        sess_opts.inter_op_num_threads = REMBG_INTER_OP_THREADS
+
+    return session_class(model_name, sess_opts, ort.get_available_providers())
+
+
+def get_session(model_name: Optional[str] = None):
+    """
+    共有のrembgセッションを取得する（未読み込みの場合はここで読み込む）
+
+    Args:
+        model_name: rembgのモデル名（省略時はREMBG_TIERのモデル）
+    """
+    model_name = model_name or _resolve_tier(None)[0]
+    with _session_lock:
+        session = _sessions.get(model_name)
+        if session is None:
+            logger.info(
+                f"Loading rembg session: model={model_name}, "
+                f"intra_op={REMBG_INTRA_OP_THREADS or 'default'}, inter_op={REMBG_INTER_OP_THREADS or 'default'}"
+            )
+            session = _create_session(model_name)
+            _sessions[model_name] = session
+            logger.info(f"rembg session loaded: {model_name}")
+        return session
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=REMBG_WORKERS, thread_name_prefix="rembg")
+        return _executor
+
+
+def preload_session(*tiers: str) -> Future:
+    """
+    rembgセッションの読み込みをバックグラウンドで開始する（サーバー起動時）
+
+    Args:
+        *tiers: 読み込むティア（省略時はREMBG_TIER）
+
+    Returns:
+        Future: 読み込み完了を表すFuture
+    """
+    model_names = list(dict.fromkeys(_resolve_tier(tier)[0] for tier in (tiers or (REMBG_TIER,))))
+
+    def load_all() -> None:
+        for model_name in model_names:
+            get_session(model_name)
+
+    future = _get_executor().submit(load_all)
+
+    def log_failure(f: Future) -> None:
+        if f.exception() is not None:
+            logger.warning(f"Failed to preload rembg session: {f.exception()}")
+
+    future.add_done_callback(log_failure)
+    return future
+
+
+def _remove_with_downscaled_mask(image: Image.Image, session, mask_edge: int) -> Image.Image:
+    """縮小した画像でマスクを推定し、元の解像度に拡大して適用する"""
+    small = image.convert("RGB")
+    small.thumbnail((mask_edge, mask_edge), Image.Resampling.BILINEAR)
+
+    mask = session.predict(small)[0].resize(image.size, Image.Resampling.BILINEAR)
+
+    result = image.convert("RGBA")
+    result.putalpha(mask)
+    return result
+
+
+def remove_background_sync(image: Image.Image, tier: Optional[str] = None) -> Image.Image:
+    """
+    共有セッションで背景を透過する（同期版）
+
+    Args:
+        image: 入力画像
+        tier: 品質ティア（REMBG_TIERSのキー、省略時はREMBG_TIER）
+
+    Returns:
+        Image.Image: 背景を透過したRGBA画像
+    """
+    model_name, mask_edge = _resolve_tier(tier)
+    session = get_session(model_name)
+
+    if mask_edge is None:
+        from rembg import remove
+
+        return remove(image, session=session, alpha_matting=False)
+
+    return _remove_with_downscaled_mask(image, session, mask_edge)
+
+
+async def remove_background_async(image: Image.Image, tier: Optional[str] = None) -> Image.Image:
+    """
+    共有セッションで背景を透過する（専用スレッドプールで実行）
+
+    Args:
+        image: 入力画像
+        tier: 品質ティア（REMBG_TIERSのキー、省略時はREMBG_TIER）
+
+    Returns:
+        Image.Image: 背景を透過したRGBA画像
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), remove_background_sync, image, tier)
+
+
+def remove_background_in_pool(image: Image.Image, tier: Optional[str] = None) -> Image.Image:
+    """
+    背景除去用のスレッドプールで背景を透過し、完了まで待つ（ワーカースレッドから呼び出す同期版）
+
+    Args:
+        image: 入力画像
+        tier: 品質ティア（REMBG_TIERSのキー、省略時はREMBG_TIER）
+
+    Returns:
+        Image.Image: 背景を透過したRGBA画像
+    """
+    return _get_executor().submit(remove_background_sync, image, tier).result()
+
+
+def shutdown_background_removal() -> None:
+    """背景除去用のスレッドプールを停止する（サーバー終了時）"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
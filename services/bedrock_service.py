@@ -15,10 +15,17 @@ logger = logging.getLogger(__name__)
 AWS_REGION = "us-east-1"  # クロスリージョン推論はus-east-1から呼び出し
 MODEL_ID = "us.anthropic.claude-3-5-sonnet-20240620-v1:0"  # USクロスリージョン推論ID
 
+# 長文の分割要約（map処理）などに使う軽量モデル
+SUMMARY_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
+
 # リトライ設定
 MAX_RETRIES = 5  # リトライ回数を増加
 INITIAL_BACKOFF = 5  # 初回待機時間（秒）を増加
 
+# Bedrockへの同時リクエスト数の上限（並列呼び出し時のレート制限対策）
+BEDROCK_MAX_CONCURRENCY = int(os.getenv("BEDROCK_MAX_CONCURRENCY", "4"))
+_bedrock_semaphore: asyncio.Semaphore | None = None
+
 # クルー別のシステムプロンプト定義
 # 各クルーの性格・口調・役割を厳密に定義
 CREW_PROMPTS: dict[str, str] = {
@@ -156,6 +163,72 @@ def get_bedrock_client():
     )
 
 
+def _get_bedrock_semaphore() -> asyncio.Semaphore:
+    global _bedrock_semaphore
+    if _bedrock_semaphore is None:
+        _bedrock_semaphore = asyncio.Semaphore(BEDROCK_MAX_CONCURRENCY)
+    return _bedrock_semaphore
+
+
+async def invoke_claude(
+    prompt: str,
+    model_id: str = MODEL_ID,
+    max_tokens: int = 2000,
+    temperature: float = 0.5,
+    system: str | None = None,
+) -> str:
+    """
+    Claudeを呼び出してテキストを生成する（同時実行数の制限とリトライ付き）
+
+    同時に実行されるリクエストはBEDROCK_MAX_CONCURRENCYまでに制限し、
+    ThrottlingException の場合は指数バックオフでリトライする。
+
+    Args:
+        prompt: ユーザーメッセージ
+        model_id: 使用するモデルID
+        max_tokens: 最大出力トークン数
+        temperature: 温度
+        system: システムプロンプト（オプション）
+
+    Returns:
+        str: 生成されたテキスト
+
+    Raises:
+        ClientError: リトライしても失敗した場合、またはスロットリング以外のエラー
+    """
+    client = get_bedrock_client()
+
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    if system:
+        request_body["system"] = system
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with _get_bedrock_semaphore():
+                response = await asyncio.to_thread(
+                    client.invoke_model,
+                    modelId=model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=json.dumps(request_body),
+                )
+            response_body = json.loads(response["body"].read())
+            return response_body.get("content", [{}])[0].get("text", "").strip()
+
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "")
+            if error_code != "ThrottlingException" or attempt == MAX_RETRIES - 1:
+                raise
+            wait_time = INITIAL_BACKOFF * (2 ** attempt)
+            logger.warning(f"Rate limited. Waiting {wait_time}s before retry... (attempt {attempt + 1}/{MAX_RETRIES})")
+            await asyncio.sleep(wait_time)
+
+
 def get_system_prompt(crew_name: str) -> str:
     """クルー名に応じたシステムプロンプトを取得"""
     return CREW_PROMPTS.get(crew_name, DEFAULT_PROMPT)
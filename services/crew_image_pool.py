@@ -0,0 +1,213 @@
+"""
+クルー画像プール
+
+(役割, 性格, レアリティ) ごとに背景透過済みのクルー画像を事前生成してディスクに貯めておく。
+スカウト時はプールから1枚取り出すだけで済み、プールが空の場合のみその場で生成する。
+プールの補充はバックグラウンドのワーカーが一定間隔で行う。
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import random
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from services.image_generation_service import (
+    NOVA_MAX_IMAGES_PER_REQUEST,
+    generate_crew_image_with_fallback,
+    generate_transparent_crew_images,
+)
+
+logger = logging.getLogger(__name__)
+
+# プールの保存先ディレクトリ
+CREW_IMAGE_POOL_DIR = Path(os.getenv("CREW_IMAGE_POOL_DIR", "./crew_image_pool"))
+
+# 1バケットあたりに貯めておく画像の枚数（0の場合はプールを使わない）
+CREW_IMAGE_POOL_DEPTH = int(os.getenv("CREW_IMAGE_POOL_DEPTH", "0"))
+
+# 補充リクエストの間隔（秒）。Bedrockの利用料・レート制限に合わせて調整する
+CREW_IMAGE_POOL_REFILL_INTERVAL = float(os.getenv("CREW_IMAGE_POOL_REFILL_INTERVAL", "30"))
+
+# 1回の補充リクエストで生成する最大枚数（Nova Canvas の numberOfImages）
+CREW_IMAGE_POOL_BATCH = int(os.getenv("CREW_IMAGE_POOL_BATCH", "3"))
+
+Bucket = Tuple[str, str, int]
+
+_refill_task: Optional[asyncio.Task] = None
+_refill_event: Optional[asyncio.Event] = None
+
+
+def _bucket_dir(bucket: Bucket) -> Path:
+    role, personality, rarity = bucket
+    return CREW_IMAGE_POOL_DIR / f"{role}_{personality}_{rarity}"
+
+
+def _pool_size(bucket: Bucket) -> int:
+    directory = _bucket_dir(bucket)
+    if not directory.exists():
+        return 0
+    return sum(1 for _ in directory.glob("*.png"))
+
+
+def _take_file(bucket: Bucket) -> Optional[bytes]:
+    """バケットから画像を1枚取り出す（他のリクエストと取り合わないようrenameで確保する）"""
+    directory = _bucket_dir(bucket)
+    if not directory.exists():
+        return None
+
+    for path in directory.glob("*.png"):
+        claimed = path.with_suffix(".taken")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            # 他のリクエストが先に取り出した
+            continue
+        try:
+            return claimed.read_bytes()
+        finally:
+            claimed.unlink(missing_ok=True)
+    return None
+
+
+def _store_file(bucket: Bucket, png_bytes: bytes) -> None:
+    directory = _bucket_dir(bucket)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = uuid.uuid4().hex
+    tmp_path = directory / f"{name}.part"
+    tmp_path.write_bytes(png_bytes)
+    os.replace(tmp_path, directory / f"{name}.png")
+
+
+async def take_pooled_image(role: str, personality: str, rarity: int) -> Optional[str]:
+    """
+    プールから背景透過済みの画像を1枚取り出す
+
+    Args:
+        role: クルーの役割
+        personality: クルーの性格
+        rarity: レアリティ（1-5）
+
+    Returns:
+        str: data URI形式の画像（プールが空の場合はNone）
+    """
+    if CREW_IMAGE_POOL_DEPTH <= 0:
+        return None
+
+    png_bytes = await asyncio.to_thread(_take_file, (role, personality, rarity))
+
+    # 取り出した分を補充させる
+    if _refill_event is not None:
+        _refill_event.set()
+
+    if png_bytes is None:
+        logger.info(f"Crew image pool empty: {role}/{personality}/★{rarity}")
+        return None
+
+    logger.info(f"Crew image taken from pool: {role}/{personality}/★{rarity}")
+    return f"data:image/png;base64,{base64.b64encode(png_bytes).decode('utf-8')}"
+
+
+async def get_crew_image(
+    crew_name: str,
+    role: str = "Engineer",
+    personality: str = "Serious",
+    rarity: int = 1,
+) -> tuple[str, str | None]:
+    """
+    クルー画像を取得する（プールにあれば即座に返し、なければその場で生成する）
+
+    Args:
+        crew_name: クルーの名前
+        role: クルーの役割
+        personality: クルーの性格
+        rarity: レアリティ（1-5）
+
+    Returns:
+        tuple: (image_url, image_base64) generate_crew_image_with_fallback と同じ形式
+    """
+    image_data_uri = await take_pooled_image(role, personality, rarity)
+    if image_data_uri:
+        return f"/images/crews/monster_{random.randint(1, 6)}.png", image_data_uri
+
+    return await generate_crew_image_with_fallback(crew_name, role, personality, rarity)
+
+
+def _most_depleted_bucket(buckets: list[Bucket]) -> Optional[Tuple[Bucket, int]]:
+    """最も枚数が少ないバケットと不足枚数を返す（すべて満杯ならNone）"""
+    sizes = [(_pool_size(bucket), i) for i, bucket in enumerate(buckets)]
+    size, index = min(sizes)
+    if size >= CREW_IMAGE_POOL_DEPTH:
+        return None
+    return buckets[index], CREW_IMAGE_POOL_DEPTH - size
+
+
+async def _refill_loop(buckets: list[Bucket]) -> None:
+    """不足しているバケットを1つずつ補充し続ける"""
+    while True:
+        target = await asyncio.to_thread(_most_depleted_bucket, buckets)
+
+        if target is None:
+            # すべて満杯: 取り出されるまで待つ
+            _refill_event.clear()
+            try:
+                await asyncio.wait_for(_refill_event.wait(), timeout=CREW_IMAGE_POOL_REFILL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        bucket, missing = target
+        role, personality, rarity = bucket
+        count = min(missing, CREW_IMAGE_POOL_BATCH, NOVA_MAX_IMAGES_PER_REQUEST)
+        try:
+            images = await generate_transparent_crew_images(role, personality, rarity, count, crew_name="pool")
+            for png_bytes in images:
+                await asyncio.to_thread(_store_file, bucket, png_bytes)
+            logger.info(f"Refilled crew image pool: {role}/{personality}/★{rarity} +{len(images)}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Crew image pool refill failed ({role}/{personality}/★{rarity}): {e}")
+
+        await asyncio.sleep(CREW_IMAGE_POOL_REFILL_INTERVAL)
+
+
+def start_refill_worker(buckets: Iterable[Bucket]) -> None:
+    """
+    プール補充ワーカーを起動する（サーバー起動時）
+
+    Args:
+        buckets: 補充対象の (役割, 性格, レアリティ) の組み合わせ
+    """
+    global _refill_task, _refill_event
+    if CREW_IMAGE_POOL_DEPTH <= 0 or _refill_task is not None:
+        return
+
+    buckets = list(buckets)
+    if not buckets:
+        return
+
+    logger.info(
+        f"Starting crew image pool worker: {len(buckets)} buckets x {CREW_IMAGE_POOL_DEPTH} images, "
+        f"interval={CREW_IMAGE_POOL_REFILL_INTERVAL}s"
+    )
+    _refill_event = asyncio.Event()
+    _refill_task = asyncio.create_task(_refill_loop(buckets))
+
+
+async def stop_refill_worker() -> None:
+    """プール補充ワーカーを停止する（サーバー終了時）"""
+    global _refill_task, _refill_event
+    if _refill_task is None:
+        return
+
+    _refill_task.cancel()
+    try:
+        await _refill_task
+    except asyncio.CancelledError:
+        pass
+    _refill_task = None
+    _refill_event = None
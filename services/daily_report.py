@@ -0,0 +1,116 @@
+"""
+日報サービス
+
+日報のスタンプ表示と連続ログイン日数の計算を行う。
+連続ログイン日数は DailyLog.streak_days に日ごとに積み上げるため、
+日報の取得は履歴の長さによらず直近N日分の1クエリで済む。
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models import DailyLog
+
+logger = logging.getLogger(__name__)
+
+# 日報に表示するスタンプの日数
+STAMP_DAYS = 7
+
+
+def get_recent_daily_logs(
+    db: Session,
+    user_id: int,
+    today: date,
+    days: int = STAMP_DAYS,
+) -> dict[date, DailyLog]:
+    """
+    直近N日分（今日を含む）のDailyLogを1クエリで取得する
+
+    Args:
+        db: データベースセッション
+        user_id: ユーザーID
+        today: 基準日
+        days: 取得する日数
+
+    Returns:
+        dict[date, DailyLog]: 日付 → DailyLog（記録のない日は含まない）
+    """
+    logs = db.query(DailyLog).filter(
+        DailyLog.user_id == user_id,
+        DailyLog.date > today - timedelta(days=days),
+        DailyLog.date <= today,
+    ).all()
+    return {log.date: log for log in logs}
+
+
+def build_stamps(logs_by_date: dict[date, DailyLog], today: date, days: int = STAMP_DAYS) -> list[tuple[date, bool]]:
+    """
+    スタンプ表示用に日付とスタンプ有無のリストを作る
+
+    Args:
+        logs_by_date: get_recent_daily_logs の戻り値
+        today: 基準日
+        days: 表示する日数
+
+    Returns:
+        list[tuple[date, bool]]: (日付, スタンプ有無) を古い順に並べたもの
+    """
+    stamps = []
+    for i in range(days - 1, -1, -1):  # N-1日前から今日まで
+        target_date = today - timedelta(days=i)
+        log = logs_by_date.get(target_date)
+        stamps.append((target_date, log is not None and bool(log.login_stamp)))
+    return stamps
+
+
+def next_login_streak(previous_log: Optional[DailyLog]) -> int:
+    """
+    前日のDailyLogから今日の連続ログイン日数を求める
+
+    Args:
+        previous_log: 前日のDailyLog（記録がなければNone）
+
+    Returns:
+        int: 今日を含めた連続ログイン日数
+    """
+    if previous_log is None or not previous_log.login_stamp:
+        return 1
+    return (previous_log.streak_days or 0) + 1
+
+
+def backfill_login_streaks(db: Session) -> int:
+    """
+    連続ログイン日数が未設定のDailyLogに値を設定する（streak_days列追加前のデータ用）
+
+    Returns:
+        int: 更新した件数
+    """
+    user_ids = [
+        user_id
+        for (user_id,) in db.query(DailyLog.user_id).filter(DailyLog.streak_days.is_(None)).distinct()
+    ]
+    if not user_ids:
+        return 0
+
+    updated = 0
+    for user_id in user_ids:
+        previous_log = None
+        for log in db.query(DailyLog).filter(DailyLog.user_id == user_id).order_by(DailyLog.date):
+            if not log.login_stamp:
+                streak = 0
+            elif previous_log is not None and previous_log.date == log.date - timedelta(days=1):
+                streak = next_login_streak(previous_log)
+            else:
+                streak = 1
+
+            if log.streak_days != streak:
+                log.streak_days = streak
+                updated += 1
+            previous_log = log
+
+    db.commit()
+    logger.info(f"Backfilled {updated} login streaks")
+    return updated
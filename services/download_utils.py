@@ -0,0 +1,121 @@
+"""
+ダウンロードユーティリティ
+
+HTTPレスポンスを上限付きでストリーミング読み込みするヘルパー関数
+"""
+
+import codecs
+import logging
+from typing import Iterator, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# 1回の読み込みサイズ（バイト）
+CHUNK_SIZE = 64 * 1024
+
+# 展開後サイズ / 転送サイズ の上限（gzip爆弾対策）
+MAX_DECOMPRESSION_RATIO = 100
+
+# 圧縮率チェックを始める展開後サイズ（小さいレスポンスは誤検知しやすいため）
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+def iter_response_bytes(
+    response: requests.Response,
+    max_bytes: int,
+    max_ratio: int = MAX_DECOMPRESSION_RATIO,
+) -> Iterator[bytes]:
+    """
+    レスポンス本文を展開しながらチャンク単位で返す
+
+    展開後の合計がmax_bytesに達した時点で読み込みを打ち切る。
+    レスポンスは stream=True で取得しておくこと。
+
+    Args:
+        response: stream=Trueで取得したレスポンス
+        max_bytes: 読み込む最大バイト数（展開後）
+        max_ratio: 許容する最大圧縮率
+
+    Yields:
+        bytes: 展開済みのチャンク
+
+    Raises:
+        ValueError: 圧縮率が上限を超えた場合
+    """
+    total = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if not chunk:
+            continue
+
+        remaining = max_bytes - total
+        if len(chunk) >= remaining:
+            yield chunk[:remaining]
+            logger.info(f"Download truncated at {max_bytes} bytes: {response.url}")
+            return
+
+        total += len(chunk)
+        raw_bytes = response.raw.tell()
+        if total >= RATIO_CHECK_MIN_BYTES and raw_bytes and total > raw_bytes * max_ratio:
+            raise ValueError(f"圧縮率が異常に高いレスポンスのため読み込みを中止しました（{total // raw_bytes}倍）")
+
+        yield chunk
+
+
+def read_response_bytes(
+    response: requests.Response,
+    max_bytes: int,
+    max_ratio: int = MAX_DECOMPRESSION_RATIO,
+) -> Tuple[bytes, bool]:
+    """
+    レスポンス本文を上限付きで読み込む
+
+    Args:
+        response: stream=Trueで取得したレスポンス
+        max_bytes: 読み込む最大バイト数（展開後）
+        max_ratio: 許容する最大圧縮率
+
+    Returns:
+        Tuple[bytes, bool]: (本文, 上限で打ち切ったかどうか)
+    """
+    chunks = []
+    total = 0
+    for chunk in iter_response_bytes(response, max_bytes, max_ratio):
+        chunks.append(chunk)
+        total += len(chunk)
+    return b"".join(chunks), total >= max_bytes
+
+
+def iter_response_lines(
+    response: requests.Response,
+    max_bytes: int,
+    encoding: str = "utf-8",
+    max_ratio: int = MAX_DECOMPRESSION_RATIO,
+) -> Iterator[str]:
+    """
+    レスポンス本文を行単位（改行文字を含む）で返す
+
+    csv.readerにそのまま渡せるよう、区切りは '\\n' のみで行う。
+
+    Args:
+        response: stream=Trueで取得したレスポンス
+        max_bytes: 読み込む最大バイト数（展開後）
+        encoding: 文字エンコーディング
+        max_ratio: 許容する最大圧縮率
+
+    Yields:
+        str: 1行分のテキスト
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    for chunk in iter_response_bytes(response, max_bytes, max_ratio):
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line + "\n"
+
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
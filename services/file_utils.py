@@ -8,18 +8,92 @@ import base64
 import io
 import json
 import logging
-from typing import Tuple
+from pathlib import Path
+from typing import Tuple, Union
 
+import numpy as np
 import pandas as pd
 from PIL import Image
 
+from services.office_reader import MAX_CONTENT_LENGTH as MAX_OFFICE_CHARS, extract_docx_lines, extract_pptx_slides
+from services.worker_pool import run_in_process
+
 logger = logging.getLogger(__name__)
 
 
+# 表データをプロンプトに含める最大行数
+MAX_TABLE_ROWS = 100
+
+# 表データのセル1つあたりの最大文字数
+MAX_CELL_CHARS = 200
+
+
+def _truncate_cell(value):
+    """長すぎるセルを切り詰める"""
+    if isinstance(value, str) and len(value) > MAX_CELL_CHARS:
+        return value[:MAX_CELL_CHARS] + "…"
+    return value
+
+
+def _dataframe_to_markdown(df: pd.DataFrame) -> str:
+    """DataFrameをMarkdown表に変換する（セル幅はMAX_CELL_CHARSで制限）"""
+    df = df.map(_truncate_cell)
+    try:
+        return df.to_markdown(index=False)
+    except Exception:
+        # to_markdownが使えない場合はテキスト形式で出力
+        return df.to_string(index=False)
+
+
+def _read_sheet_head(worksheet, max_rows: int) -> pd.DataFrame:
+    """
+    read-onlyモードのワークシートから先頭max_rows行だけを読み込む
+
+    超過判定のためデータ行はmax_rows + 1行まで読み、それ以降の行は読まない。
+    先頭の空行は読み飛ばし、最初の非空行をヘッダーとする（pandas.read_excelと同様）
+
+    Returns:
+        pd.DataFrame: 先頭行のDataFrame（max_rowsを超える場合はmax_rows + 1行）
+    """
+    # 保存されたサイズ情報（<dimension>）は古いことがあるため使わず、実際のセルを読む
+    worksheet.reset_dimensions()
+
+    # ヘッダー + max_rows行 + 超過判定用の1行だけを読む
+    rows = []
+    for row in worksheet.iter_rows(values_only=True):
+        if not rows and all(value is None for value in row):
+            continue
+        rows.append(row)
+        if len(rows) >= max_rows + 2:
+            break
+
+    # 末尾の空行を除去
+    while rows and all(value is None for value in rows[-1]):
+        rows.pop()
+    if not rows:
+        return pd.DataFrame()
+
+    width = max(
+        (max((i + 1 for i, value in enumerate(row) if value is not None), default=0) for row in rows),
+        default=0,
+    )
+    # ヘッダーがデータ行より短い場合もpandas.read_excelと同様に「Unnamed: 列番号」で埋める
+    header_row = list(rows[0][:width]) + [None] * (width - len(rows[0]))
+    header = [
+        str(value) if value is not None else f"Unnamed: {i}"
+        for i, value in enumerate(header_row)
+    ]
+    data = [list(row[:width]) + [None] * (width - len(row)) for row in rows[1:]]
+    # 空セルはpandas.read_excelと同様にNaNとして扱う
+    return pd.DataFrame(data, columns=header).fillna(np.nan)
+
+
 def process_excel_file(file_content: bytes, filename: str) -> Tuple[str, str]:
     """
     Excelファイル (.xlsx, .xls) を読み込み、Markdown形式のテキストに変換
 
+    openpyxlのread-onlyモードで各シートの先頭MAX_TABLE_ROWS行だけを読み込む
+
     Args:
         file_content: ファイルのバイトデータ
         filename: ファイル名
@@ -28,37 +102,36 @@ def process_excel_file(file_content: bytes, filename: str) -> Tuple[str, str]:
         Tuple[str, str]: (変換されたテキスト, ファイルタイプ)
     """
     try:
-        # ExcelファイルをDataFrameとして読み込み
-        excel_file = io.BytesIO(file_content)
+        from openpyxl import load_workbook
 
-        # 全シートを読み込み
-        all_sheets = pd.read_excel(excel_file, sheet_name=None, engine='openpyxl')
+        workbook = load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
 
         result_texts = []
-        for sheet_name, df in all_sheets.items():
-            # 空のシートはスキップ
-            if df.empty:
-                continue
-
-            # シート情報を追加
-            result_texts.append(f"## シート: {sheet_name}")
-            result_texts.append(f"行数: {len(df)}, 列数: {len(df.columns)}")
-            result_texts.append("")
-
-            # データが大きすぎる場合は先頭100行に制限
-            if len(df) > 100:
-                result_texts.append(f"(データが多いため、先頭100行を表示)")
-                df = df.head(100)
-
-            # Markdown形式で出力
-            try:
-                markdown_table = df.to_markdown(index=False)
-                result_texts.append(markdown_table)
-            except Exception:
-                # to_markdownが使えない場合はCSV形式で出力
-                result_texts.append(df.to_string(index=False))
-
-            result_texts.append("")
+        try:
+            for worksheet in workbook.worksheets:
+                df = _read_sheet_head(worksheet, MAX_TABLE_ROWS)
+
+                # 空のシートはスキップ
+                if df.empty:
+                    continue
+
+                # シート情報を追加
+                result_texts.append(f"## シート: {worksheet.title}")
+                # 先頭行しか読まないため、超過している場合は総行数ではなく「N行超」と表示する
+                row_count = f"{MAX_TABLE_ROWS}行超" if len(df) > MAX_TABLE_ROWS else len(df)
+                result_texts.append(f"行数: {row_count}, 列数: {len(df.columns)}")
+                result_texts.append("")
+
+                # データが大きすぎる場合は先頭100行に制限
+                if len(df) > MAX_TABLE_ROWS:
+                    result_texts.append(f"(データが多いため、先頭{MAX_TABLE_ROWS}行を表示)")
+                    df = df.head(MAX_TABLE_ROWS)
+
+                # Markdown形式で出力
+                result_texts.append(_dataframe_to_markdown(df))
+                result_texts.append("")
+        finally:
+            workbook.close()
 
         if not result_texts:
             return "Excelファイルにデータがありませんでした。", "excel"
@@ -74,6 +147,8 @@ def process_csv_file(file_content: bytes, filename: str) -> Tuple[str, str]:
     """
     CSVファイルを読み込み、Markdown形式のテキストに変換
 
+    パースするのは先頭MAX_TABLE_ROWS行のみ（総行数は改行数から概算）
+
     Args:
         file_content: ファイルのバイトデータ
         filename: ファイル名
@@ -89,7 +164,7 @@ def process_csv_file(file_content: bytes, filename: str) -> Tuple[str, str]:
         for encoding in ['utf-8', 'shift-jis', 'cp932', 'latin-1']:
             try:
                 csv_file.seek(0)
-                df = pd.read_csv(csv_file, encoding=encoding)
+                df = pd.read_csv(csv_file, encoding=encoding, nrows=MAX_TABLE_ROWS + 1)
                 break
             except (UnicodeDecodeError, pd.errors.ParserError):
                 continue
@@ -97,22 +172,26 @@ def process_csv_file(file_content: bytes, filename: str) -> Tuple[str, str]:
         if df is None:
             raise ValueError("CSVファイルのエンコーディングを判定できませんでした")
 
+        truncated = len(df) > MAX_TABLE_ROWS
+        if truncated:
+            # 全行はパースせず、改行数から総行数を概算する
+            line_count = file_content.count(b"\n") + (0 if file_content.endswith(b"\n") else 1)
+            row_label = f"約{line_count - 1}"
+        else:
+            row_label = str(len(df))
+
         result_texts = []
         result_texts.append(f"## CSVファイル: {filename}")
-        result_texts.append(f"行数: {len(df)}, 列数: {len(df.columns)}")
+        result_texts.append(f"行数: {row_label}, 列数: {len(df.columns)}")
         result_texts.append("")
 
         # データが大きすぎる場合は先頭100行に制限
-        if len(df) > 100:
-            result_texts.append(f"(データが多いため、先頭100行を表示)")
-            df = df.head(100)
+        if truncated:
+            result_texts.append(f"(データが多いため、先頭{MAX_TABLE_ROWS}行を表示)")
+            df = df.head(MAX_TABLE_ROWS)
 
         # Markdown形式で出力
-        try:
-            markdown_table = df.to_markdown(index=False)
-            result_texts.append(markdown_table)
-        except Exception:
-            result_texts.append(df.to_string(index=False))
+        result_texts.append(_dataframe_to_markdown(df))
 
         return "\n".join(result_texts), "csv"
 
@@ -121,10 +200,39 @@ def process_csv_file(file_content: bytes, filename: str) -> Tuple[str, str]:
         raise ValueError(f"CSVファイルの読み込みに失敗しました: {str(e)}")
 
 
+# Vision APIに渡す画像の上限（Claudeはこれを超える画像をサーバー側で縮小するため、超えた分は転送の無駄になる）
+VISION_MAX_EDGE = 1568  # 長辺の最大ピクセル数
+VISION_MAX_PIXELS = 1_150_000  # 総ピクセル数の上限（約1600トークン相当）
+VISION_MAX_BYTES = 5 * 1024 * 1024  # 1画像あたりの最大サイズ
+
+# そのまま送信できる画像形式とメディアタイプ
+VISION_MEDIA_TYPES = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+    'GIF': 'image/gif',
+}
+
+
+def _vision_target_size(width: int, height: int) -> Tuple[int, int]:
+    """Vision APIの上限に収まる画像サイズを返す（収まっていればそのまま）"""
+    ratio = min(
+        1.0,
+        VISION_MAX_EDGE / max(width, height),
+        (VISION_MAX_PIXELS / (width * height)) ** 0.5,
+    )
+    if ratio >= 1.0:
+        return width, height
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
 def process_image_file(file_content: bytes, filename: str) -> Tuple[str, str, str]:
     """
     画像ファイルをBase64エンコードし、メディアタイプを判定
 
+    Vision APIの上限に収まっている画像は再エンコードせずそのまま送る。
+    縮小が必要なJPEGはデコード時に縮小（Image.draft）してからリサイズする。
+
     Args:
         file_content: ファイルのバイトデータ
         filename: ファイル名
@@ -133,49 +241,46 @@ def process_image_file(file_content: bytes, filename: str) -> Tuple[str, str, st
         Tuple[str, str, str]: (Base64エンコードされた画像データ, メディアタイプ, ファイルタイプ)
     """
     try:
-        # 画像を開いて検証
+        # 画像を開いて検証（ヘッダーのみ読み込み、デコードはしない）
         image = Image.open(io.BytesIO(file_content))
 
         # 画像サイズを取得
         width, height = image.size
+        target_size = _vision_target_size(width, height)
+        img_format = image.format if image.format in VISION_MEDIA_TYPES else None
+
+        # 上限内で対応形式ならそのまま送信
+        if img_format and target_size == (width, height) and len(file_content) <= VISION_MAX_BYTES:
+            base64_data = base64.standard_b64encode(file_content).decode('utf-8')
+            return base64_data, VISION_MEDIA_TYPES[img_format], "image"
 
         # 画像が大きすぎる場合はリサイズ（Claude Vision APIの制限対策）
-        max_size = 1568  # Claude推奨の最大サイズ
-        if width > max_size or height > max_size:
-            ratio = min(max_size / width, max_size / height)
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            logger.info(f"Image resized from {width}x{height} to {new_width}x{new_height}")
+        if target_size != (width, height):
+            if image.format == 'JPEG':
+                # JPEGはデコード時に1/2, 1/4, 1/8へ縮小できるため、フルサイズで展開しない
+                image.draft('RGB', target_size)
+            image = image.resize(target_size, Image.Resampling.LANCZOS)
+            logger.info(f"Image resized from {width}x{height} to {target_size[0]}x{target_size[1]}")
+
+        # 対応外の形式はJPEGに変換
+        img_format = img_format or 'JPEG'
 
         # RGBAをRGBに変換（JPEGで保存する場合）
-        if image.mode == 'RGBA':
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[3])
-            image = background
-
-        # メディアタイプを判定
-        format_lower = filename.lower()
-        if format_lower.endswith('.png'):
-            media_type = 'image/png'
-            img_format = 'PNG'
-        elif format_lower.endswith('.webp'):
-            media_type = 'image/webp'
-            img_format = 'WEBP'
-        elif format_lower.endswith('.gif'):
-            media_type = 'image/gif'
-            img_format = 'GIF'
-        else:
-            media_type = 'image/jpeg'
-            img_format = 'JPEG'
+        if img_format == 'JPEG' and image.mode != 'RGB':
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.split()[3])
+                image = background
+            else:
+                image = image.convert('RGB')
 
         # Base64エンコード
         buffer = io.BytesIO()
         image.save(buffer, format=img_format, quality=85)
-        buffer.seek(0)
-        base64_data = base64.standard_b64encode(buffer.read()).decode('utf-8')
+        base64_data = base64.standard_b64encode(buffer.getvalue()).decode('utf-8')
 
-        return base64_data, media_type, "image"
+        return base64_data, VISION_MEDIA_TYPES[img_format], "image"
 
     except Exception as e:
         logger.error(f"Image processing error: {e}")
@@ -305,6 +410,8 @@ def process_word_file(file_content: bytes, filename: str) -> Tuple[str, str]:
     """
     Word文書 (.docx) を読み込み、テキストに変換
 
+    段落と表を文書順に抽出する（ZIP内のXMLを直接読み込む）
+
     Args:
         file_content: ファイルのバイトデータ
         filename: ファイル名
@@ -313,41 +420,16 @@ def process_word_file(file_content: bytes, filename: str) -> Tuple[str, str]:
         Tuple[str, str]: (抽出されたテキスト, ファイルタイプ)
     """
     try:
-        from docx import Document
-
-        doc = Document(io.BytesIO(file_content))
-
         result_texts = []
         result_texts.append(f"## Word文書: {filename}")
         result_texts.append("")
-
-        # 段落を抽出
-        for para in doc.paragraphs:
-            if para.text.strip():
-                # 見出しスタイルを検出
-                if para.style and para.style.name.startswith('Heading'):
-                    level = para.style.name.replace('Heading ', '')
-                    try:
-                        level_num = int(level)
-                        result_texts.append(f"{'#' * (level_num + 1)} {para.text}")
-                    except ValueError:
-                        result_texts.append(f"### {para.text}")
-                else:
-                    result_texts.append(para.text)
-
-        # テーブルを抽出
-        for table in doc.tables:
-            result_texts.append("")
-            for row in table.rows:
-                cells = [cell.text.strip() for cell in row.cells]
-                result_texts.append("| " + " | ".join(cells) + " |")
-            result_texts.append("")
+        result_texts.extend(extract_docx_lines(file_content, MAX_OFFICE_CHARS))
 
         text = "\n".join(result_texts)
 
         # 長すぎる場合は切り詰め
-        if len(text) > 50000:
-            text = text[:50000] + "\n\n... (以下省略)"
+        if len(text) > MAX_OFFICE_CHARS:
+            text = text[:MAX_OFFICE_CHARS] + "\n\n... (以下省略)"
 
         return text, "word"
 
@@ -360,6 +442,8 @@ def process_powerpoint_file(file_content: bytes, filename: str) -> Tuple[str, st
     """
     PowerPointファイル (.pptx) を読み込み、テキストに変換
 
+    スライドごとに図形のテキストと表を出現順に抽出する（ZIP内のXMLを直接読み込む）
+
     Args:
         file_content: ファイルのバイトデータ
         filename: ファイル名
@@ -368,29 +452,23 @@ def process_powerpoint_file(file_content: bytes, filename: str) -> Tuple[str, st
         Tuple[str, str]: (抽出されたテキスト, ファイルタイプ)
     """
     try:
-        from pptx import Presentation
-
-        prs = Presentation(io.BytesIO(file_content))
+        slide_count, slides = extract_pptx_slides(file_content, MAX_OFFICE_CHARS)
 
         result_texts = []
         result_texts.append(f"## PowerPointプレゼンテーション: {filename}")
-        result_texts.append(f"スライド数: {len(prs.slides)}")
+        result_texts.append(f"スライド数: {slide_count}")
         result_texts.append("")
 
-        for slide_num, slide in enumerate(prs.slides, 1):
+        for slide_num, shape_texts in enumerate(slides, 1):
             result_texts.append(f"### スライド {slide_num}")
-
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    result_texts.append(shape.text)
-
+            result_texts.extend(shape_texts)
             result_texts.append("")
 
         text = "\n".join(result_texts)
 
         # 長すぎる場合は切り詰め
-        if len(text) > 50000:
-            text = text[:50000] + "\n\n... (以下省略)"
+        if len(text) > MAX_OFFICE_CHARS:
+            text = text[:MAX_OFFICE_CHARS] + "\n\n... (以下省略)"
 
         return text, "powerpoint"
 
@@ -525,3 +603,29 @@ def process_file(file_content: bytes, filename: str) -> dict:
 
     else:
         raise ValueError(f"サポートされていないファイル形式です: {filename}")
+
+
+def _process_stored_file(path: str, filename: str) -> dict:
+    """保存済みファイルをワーカープロセス側で読み込んで処理する"""
+    with open(path, "rb") as f:
+        return process_file(f.read(), filename)
+
+
+async def process_file_async(file_content: Union[bytes, Path], filename: str) -> dict:
+    """
+    process_fileを共有プロセスプールで実行する
+
+    解析処理（pandas / PIL / python-docx など）をイベントループから切り離し、
+    複数ファイルをCPU_WORKERSの範囲で並列に処理できるようにする。
+    ファイルパスを渡した場合はワーカープロセスでファイルを読み込む（バイト列をプロセス間で受け渡さない）
+
+    Args:
+        file_content: ファイルのバイトデータ、またはファイルパス
+        filename: ファイル名
+
+    Returns:
+        dict: process_fileと同じ処理結果
+    """
+    if isinstance(file_content, Path):
+        return await run_in_process(_process_stored_file, str(file_content), filename)
+    return await run_in_process(process_file, file_content, filename)
@@ -0,0 +1,142 @@
+"""
+画像派生ファイル（サムネイル）サービス
+
+クルー画像・アバターから固定サイズのWebP/AVIFサムネイルを生成し、
+元画像のハッシュをキーにディスクへ保存する（同じ画像からは1度しか生成しない）。
+画像配信APIは size クエリパラメータでサムネイルを選んで返す。
+"""
+
+import asyncio
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from services.image_serving import decode_image_data
+from services.worker_pool import run_in_process
+
+logger = logging.getLogger(__name__)
+
+# 派生ファイルの保存先ディレクトリ
+IMAGE_DERIVATIVE_DIR = Path(os.getenv("IMAGE_DERIVATIVE_DIR", "./image_derivatives"))
+
+# サムネイルのサイズ（size パラメータ → 長辺のピクセル数）
+THUMBNAIL_SIZES = {
+    "sm": 64,
+    "md": 128,
+    "lg": 256,
+}
+
+# 保存時の画質
+WEBP_QUALITY = 80
+AVIF_QUALITY = 60
+
+MEDIA_TYPES = {
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+Image.init()
+
+# 生成するフォーマット（AVIFはPillowが対応している場合のみ）
+DERIVATIVE_FORMATS = ["webp"] + (["avif"] if ".avif" in Image.registered_extensions() else [])
+
+# 実行中の生成タスク（ガベージコレクションで消えないよう保持する）
+_pending_tasks: set[asyncio.Task] = set()
+
+
+def derivative_path(image_hash: str, size: str, fmt: str) -> Path:
+    """派生ファイルの保存先パスを返す"""
+    return IMAGE_DERIVATIVE_DIR / image_hash[:2] / f"{image_hash}_{size}.{fmt}"
+
+
+def choose_format(accept: Optional[str]) -> str:
+    """Acceptヘッダーから返すフォーマットを選ぶ（AVIF対応ブラウザにはAVIF）"""
+    if accept and "image/avif" in accept and "avif" in DERIVATIVE_FORMATS:
+        return "avif"
+    return "webp"
+
+
+def generate_derivatives(data: str, image_hash: str) -> int:
+    """
+    画像データから全サイズ・全フォーマットのサムネイルを生成して保存する
+
+    既に保存済みのものは生成しない。プロセスプールから呼び出せるようモジュールレベルに置く。
+
+    Args:
+        data: data URIまたはBase64文字列
+        image_hash: 元画像のハッシュ
+
+    Returns:
+        int: 新しく生成したファイル数
+    """
+    missing = [
+        (size, fmt)
+        for size in THUMBNAIL_SIZES
+        for fmt in DERIVATIVE_FORMATS
+        if not derivative_path(image_hash, size, fmt).exists()
+    ]
+    if not missing:
+        return 0
+
+    image_bytes, _ = decode_image_data(data)
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img.load()
+        source = img.convert("RGBA") if img.mode not in ("RGB", "RGBA") else img.copy()
+
+    thumbnails = {}
+    for size, fmt in missing:
+        if size not in thumbnails:
+            thumbnail = source.copy()
+            edge = THUMBNAIL_SIZES[size]
+            thumbnail.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            thumbnails[size] = thumbnail
+
+        path = derivative_path(image_hash, size, fmt)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        if fmt == "avif":
+            thumbnails[size].save(tmp_path, format="AVIF", quality=AVIF_QUALITY)
+        else:
+            thumbnails[size].save(tmp_path, format="WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp_path, path)
+
+    return len(missing)
+
+
+async def ensure_derivatives(data: Optional[str], image_hash: Optional[str]) -> None:
+    """
+    サムネイルを生成する（プロセスプールで実行、失敗してもエラーにしない）
+
+    Args:
+        data: data URIまたはBase64文字列
+        image_hash: 元画像のハッシュ
+    """
+    if not data or not image_hash:
+        return
+
+    try:
+        created = await run_in_process(generate_derivatives, data, image_hash)
+        if created:
+            logger.info(f"Generated {created} image derivatives for {image_hash}")
+    except Exception as e:
+        logger.warning(f"Failed to generate image derivatives for {image_hash}: {e}")
+
+
+def schedule_derivatives(data: Optional[str], image_hash: Optional[str]) -> None:
+    """
+    サムネイルの生成をバックグラウンドで開始する（画像の作成・更新時）
+
+    Args:
+        data: data URIまたはBase64文字列
+        image_hash: 元画像のハッシュ
+    """
+    if not data or not image_hash:
+        return
+
+    task = asyncio.create_task(ensure_derivatives(data, image_hash))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
@@ -7,21 +7,28 @@ Bedrock 画像生成サービス
 rembg で背景を透過して保存する。
 """
 
+import asyncio
 import base64
+import hashlib
 import json
 import logging
 import os
 import random
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
-from rembg import remove
 from PIL import Image
 import io
 
+from services.background_removal import REMBG_TIER, remove_background_in_pool
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -142,6 +149,62 @@ FIXED_KEYWORDS = [
 # ネガティブプロンプト（リアル動物と空洞を防止）
 NEGATIVE_PROMPT = "realistic animal, real cat, real dog, real fox, hollow body, empty torso, holes, transparent, watercolor, painting, 2D, flat, sketchy, anime, NFT style, scary, horror, realistic human, low quality, blurry"
 
+# スカウト（新規生成）時の背景除去ティア（速度優先にする場合は "balanced" / "fast"）
+SCOUT_REMBG_TIER = os.getenv("SCOUT_REMBG_TIER", REMBG_TIER)
+
+# 同時に実行する画像生成ジョブの数（Bedrock呼び出し・デコード・背景除去を含む）
+IMAGE_GEN_WORKERS = int(os.getenv("IMAGE_GEN_WORKERS", "4"))
+
+# 画像生成ジョブ1件あたりのタイムアウト（秒）
+IMAGE_GEN_TIMEOUT = float(os.getenv("IMAGE_GEN_TIMEOUT", "180"))
+
+_image_executor: ThreadPoolExecutor | None = None
+_image_executor_lock = threading.Lock()
+
+
+def _get_image_executor() -> ThreadPoolExecutor:
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            _image_executor = ThreadPoolExecutor(max_workers=IMAGE_GEN_WORKERS, thread_name_prefix="image-gen")
+        return _image_executor
+
+
+async def run_image_job(func, *args):
+    """
+    画像生成の同期処理を専用ワーカーで実行し、結果を待つ
+
+    イベントループを塞がないよう、Bedrock呼び出しからPNG保存までをまとめてワーカーで実行する。
+    同時実行数は IMAGE_GEN_WORKERS まで（超えた分は空きを待つ）。
+
+    Args:
+        func: 実行する同期関数
+        *args: 関数に渡す引数
+
+    Returns:
+        関数の戻り値
+
+    Raises:
+        TimeoutError: IMAGE_GEN_TIMEOUT 秒以内に終わらなかった場合
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_image_executor(), func, *args)
+    try:
+        return await asyncio.wait_for(future, timeout=IMAGE_GEN_TIMEOUT)
+    except asyncio.TimeoutError:
+        # 実行中のスレッドは止められないため、結果を待たずに呼び出し元へ返す
+        logger.error(f"Image generation job timed out after {IMAGE_GEN_TIMEOUT}s: {getattr(func, '__name__', func)}")
+        raise TimeoutError(f"画像生成がタイムアウトしました（{IMAGE_GEN_TIMEOUT:g}秒）")
+
+
+def shutdown_image_workers() -> None:
+    """画像生成ワーカーを停止する（サーバー終了時）"""
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is not None:
+            _image_executor.shutdown(wait=False, cancel_futures=True)
+            _image_executor = None
+
 
 def get_bedrock_client(region: str = AWS_REGION_NOVA):
     """Bedrock Runtime クライアントを取得（画像生成用）"""
@@ -230,10 +293,8 @@ def generate_variation_prompt(
     return positive_prompt, NEGATIVE_PROMPT
 
 
-def image_to_base64(image_path: Path) -> str:
-    """画像をBase64エンコード（透過画像は白背景に変換）"""
-    img = Image.open(image_path)
-
+def _encode_for_nova(img: Image.Image) -> str:
+    """画像をNova Canvas / Stability AI 入力用のJPEG Base64に変換（透過画像は白背景に変換）"""
     # 透過画像（RGBA）の場合、白背景を追加
     if img.mode == 'RGBA':
         # 白背景を作成
@@ -250,24 +311,175 @@ def image_to_base64(image_path: Path) -> str:
     return base64.b64encode(buffer.getvalue()).decode("utf-8")
 
 
+def image_to_base64(image_path: Path) -> str:
+    """画像をBase64エンコード（透過画像は白背景に変換）"""
+    with Image.open(image_path) as img:
+        return _encode_for_nova(img)
+
+
+@lru_cache(maxsize=64)
+def _base_image_to_base64(image_path: Path, mtime_ns: int) -> str:
+    """ベース画像のエンコード結果をメモ化する（ファイルが更新されるとmtimeが変わり再エンコードされる）"""
+    return image_to_base64(image_path)
+
+
+def get_base_image_base64(image_path: Path) -> str:
+    """
+    ベース画像をBase64エンコード（エンコード結果はファイルの更新日時ごとに再利用する）
+
+    Args:
+        image_path: ベース画像のパス
+
+    Returns:
+        str: JPEG形式のBase64データ
+    """
+    return _base_image_to_base64(image_path, image_path.stat().st_mtime_ns)
+
+
+def preload_base_images() -> int:
+    """
+    すべてのベース画像を事前にエンコードしておく（サーバー起動時）
+
+    Returns:
+        int: エンコードした画像数
+    """
+    if not ASSETS_DIR.exists():
+        return 0
+
+    images = list(ASSETS_DIR.glob("*.png"))
+    for image_path in images:
+        get_base_image_base64(image_path)
+    logger.info(f"Preloaded {len(images)} base images")
+    return len(images)
+
+
 def base64_to_image(base64_string: str) -> Image.Image:
     """Base64から PIL Image に変換"""
     image_data = base64.b64decode(base64_string)
     return Image.open(io.BytesIO(image_data))
 
 
-def remove_background(image: Image.Image) -> Image.Image:
-    """rembg を使って背景を透過"""
-    # PIL Image を bytes に変換
-    img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    img_bytes = img_byte_arr.getvalue()
+# Nova Canvas が1回のリクエストで生成できる最大枚数
+NOVA_MAX_IMAGES_PER_REQUEST = 5
 
-    # rembg で背景除去
-    output_bytes = remove(img_bytes)
 
-    # bytes を PIL Image に戻す
-    return Image.open(io.BytesIO(output_bytes))
+def _generate_transparent_crew_images_sync(
+    role: str = "Engineer",
+    personality: str = "Serious",
+    rarity: int = 1,
+    count: int = 1,
+    crew_name: str = "",
+) -> list[bytes]:
+    """
+    背景を透過したクルー画像をまとめて生成する（画像生成ワーカーで実行する同期処理）
+
+    1. ベース画像をランダムに選択
+    2. Nova Canvas で Image-to-Image 変換（numberOfImages=count）
+    3. rembg で背景透過
+
+    Args:
+        role: クルーの役割
+        personality: クルーの性格
+        rarity: レアリティ（1-5）
+        count: 生成枚数（1〜NOVA_MAX_IMAGES_PER_REQUEST）
+        crew_name: クルーの名前（ログ用）
+
+    Returns:
+        list[bytes]: 背景を透過したPNG画像のバイトデータ
+    """
+    count = max(1, min(count, NOVA_MAX_IMAGES_PER_REQUEST))
+
+    # ベース画像を選択
+    base_image_path = get_random_base_image()
+    logger.info(f"Selected base image: {base_image_path.name}")
+
+    # Base64エンコード（起動時にエンコード済みの結果を再利用）
+    base_image_b64 = get_base_image_base64(base_image_path)
+
+    # バリエーションプロンプトを生成（役割・性格・レアリティを反映）
+    positive_prompt, negative_prompt = generate_variation_prompt(role, personality, rarity)
+    logger.info(f"Generated prompt for {crew_name} (role={role}, personality={personality}, rarity={rarity})")
+    logger.info(f"Prompt: {positive_prompt[:200]}...")
+    logger.info(f"Negative prompt: {negative_prompt}")
+
+    # Bedrock クライアント
+    client = get_bedrock_client()
+
+    # Nova Canvas Image-to-Image リクエスト
+    request_body = {
+        "taskType": "IMAGE_VARIATION",
+        "imageVariationParams": {
+            "images": [base_image_b64],
+            "text": positive_prompt,
+            "negativeText": negative_prompt,
+            "similarityStrength": 0.45,  # さらに下げて形状の多様性を許容
+        },
+        "imageGenerationConfig": {
+            "numberOfImages": count,
+            "width": 512,
+            "height": 512,
+            "cfgScale": 8.5,  # 少し下げて自然な仕上がりに
+        }
+    }
+
+    logger.info(f"Calling Nova Canvas for crew: {crew_name} (images={count})")
+
+    response = client.invoke_model(
+        modelId=NOVA_MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(request_body),
+    )
+
+    response_body = json.loads(response["body"].read())
+
+    # 生成された画像を取得
+    if "images" not in response_body or len(response_body["images"]) == 0:
+        raise ValueError("No images generated by Nova Canvas")
+
+    logger.info(f"{len(response_body['images'])} image(s) generated, removing background...")
+
+    results = []
+    for generated_image_b64 in response_body["images"]:
+        generated_image = base64_to_image(generated_image_b64)
+
+        # 背景を透過
+        transparent_image = remove_background_in_pool(generated_image, SCOUT_REMBG_TIER)
+
+        # PNG形式で保存
+        img_byte_arr = io.BytesIO()
+        transparent_image.save(img_byte_arr, format='PNG')
+        results.append(img_byte_arr.getvalue())
+
+    return results
+
+
+async def generate_transparent_crew_images(
+    role: str = "Engineer",
+    personality: str = "Serious",
+    rarity: int = 1,
+    count: int = 1,
+    crew_name: str = "",
+) -> list[bytes]:
+    """
+    背景を透過したクルー画像をまとめて生成する（画像生成ワーカーで実行）
+
+    Args:
+        role: クルーの役割
+        personality: クルーの性格
+        rarity: レアリティ（1-5）
+        count: 生成枚数（1〜NOVA_MAX_IMAGES_PER_REQUEST）
+        crew_name: クルーの名前（ログ用）
+
+    Returns:
+        list[bytes]: 背景を透過したPNG画像のバイトデータ
+
+    Raises:
+        TimeoutError: IMAGE_GEN_TIMEOUT 秒以内に終わらなかった場合
+    """
+    return await run_image_job(
+        _generate_transparent_crew_images_sync, role, personality, rarity, count, crew_name
+    )
 
 
 async def generate_crew_image(
@@ -296,67 +508,10 @@ async def generate_crew_image(
             - image_base64: 生成された画像のBase64データ（data:image/png;base64,... 形式）
     """
     try:
-        # ベース画像を選択
-        base_image_path = get_random_base_image()
-        logger.info(f"Selected base image: {base_image_path.name}")
-
-        # Base64エンコード
-        base_image_b64 = image_to_base64(base_image_path)
-
-        # バリエーションプロンプトを生成（役割・性格・レアリティを反映）
-        positive_prompt, negative_prompt = generate_variation_prompt(role, personality, rarity)
-        logger.info(f"Generated prompt for {crew_name} (role={role}, personality={personality}, rarity={rarity})")
-        logger.info(f"Prompt: {positive_prompt[:200]}...")
-        logger.info(f"Negative prompt: {negative_prompt}")
-
-        # Bedrock クライアント
-        client = get_bedrock_client()
-
-        # Nova Canvas Image-to-Image リクエスト
-        request_body = {
-            "taskType": "IMAGE_VARIATION",
-            "imageVariationParams": {
-                "images": [base_image_b64],
-                "text": positive_prompt,
-                "negativeText": negative_prompt,
-                "similarityStrength": 0.45,  # さらに下げて形状の多様性を許容
-            },
-            "imageGenerationConfig": {
-                "numberOfImages": 1,
-                "width": 512,
-                "height": 512,
-                "cfgScale": 8.5,  # 少し下げて自然な仕上がりに
-            }
-        }
-
-        logger.info(f"Calling Nova Canvas for crew: {crew_name}")
-
-        response = client.invoke_model(
-            modelId=NOVA_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(request_body),
-        )
-
-        response_body = json.loads(response["body"].read())
-
-        # 生成された画像を取得
-        if "images" not in response_body or len(response_body["images"]) == 0:
-            raise ValueError("No images generated by Nova Canvas")
-
-        generated_image_b64 = response_body["images"][0]
-        generated_image = base64_to_image(generated_image_b64)
-
-        logger.info(f"Image generated, removing background...")
-
-        # 背景を透過
-        transparent_image = remove_background(generated_image)
+        png_bytes = (await generate_transparent_crew_images(role, personality, rarity, 1, crew_name))[0]
 
         # PNG形式でBase64エンコード
-        img_byte_arr = io.BytesIO()
-        transparent_image.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-        final_base64 = base64.b64encode(img_byte_arr.getvalue()).decode("utf-8")
+        final_base64 = base64.b64encode(png_bytes).decode("utf-8")
 
         # data URI形式で返す
         image_data_uri = f"data:image/png;base64,{final_base64}"
@@ -419,11 +574,19 @@ EVOLUTION_PROMPT = "A cute 3D rendered toy figure of an AI agent character weari
 # 進化時の変化度合い（0.0-1.0、高いほど変化が大きい）
 EVOLUTION_STRENGTH = 0.5
 
+# 進化元画像のエンコード結果をキャッシュする件数
+EVOLUTION_INPUT_CACHE_SIZE = 64
+
+_evolution_input_cache: "OrderedDict[str, str]" = OrderedDict()
+_evolution_input_lock = threading.Lock()
+
 
 def load_existing_image(image_path: str) -> str:
     """
     既存のクルー画像をBase64エンコードして読み込む
 
+    同じ内容の画像はエンコード結果を再利用する（内容のSHA-256をキーにキャッシュ）
+
     Args:
         image_path: 画像の相対パス（/images/crews/generated/xxx.png）
 
@@ -439,7 +602,96 @@ def load_existing_image(image_path: str) -> str:
     if not full_path.exists():
         raise FileNotFoundError(f"Image not found: {full_path}")
 
-    return image_to_base64(full_path)
+    content = full_path.read_bytes()
+    key = hashlib.sha256(content).hexdigest()
+
+    with _evolution_input_lock:
+        cached = _evolution_input_cache.get(key)
+        if cached is not None:
+            _evolution_input_cache.move_to_end(key)
+            return cached
+
+    with Image.open(io.BytesIO(content)) as img:
+        encoded = _encode_for_nova(img)
+
+    with _evolution_input_lock:
+        _evolution_input_cache[key] = encoded
+        while len(_evolution_input_cache) > EVOLUTION_INPUT_CACHE_SIZE:
+            _evolution_input_cache.popitem(last=False)
+    return encoded
+
+
+def image_file_to_data_uri(image_path: str) -> str:
+    """
+    保存済みのクルー画像をPNGのdata URIとして読み込む（透過を保持）
+
+    Args:
+        image_path: 画像の相対パス（/images/crews/generated/xxx.png）
+
+    Returns:
+        str: data:image/png;base64,... 形式の画像データ
+    """
+    full_path = BASE_DIR.parent / "frontend" / "public" / image_path.lstrip("/")
+    return f"data:image/png;base64,{base64.b64encode(full_path.read_bytes()).decode('utf-8')}"
+
+
+def _evolve_crew_image_sync(current_image_path: str, crew_name: str) -> str:
+    """進化後の画像を生成して保存する（画像生成ワーカーで実行する同期処理）"""
+    # 出力ディレクトリを作成
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    # 現在の画像を読み込み
+    logger.info(f"Loading current image: {current_image_path}")
+    base_image_b64 = load_existing_image(current_image_path)
+
+    logger.info(f"Evolution prompt: {EVOLUTION_PROMPT[:80]}...")
+    logger.info(f"Evolution strength: {EVOLUTION_STRENGTH}")
+
+    # Stability AI 用クライアント（us-west-2）
+    client = get_stability_client()
+
+    # SD3.5 Large Image-to-Image リクエスト
+    request_body = {
+        "prompt": EVOLUTION_PROMPT,
+        "mode": "image-to-image",
+        "image": base_image_b64,
+        "strength": EVOLUTION_STRENGTH,  # 0.5 で適度な変化
+        "output_format": "png",
+    }
+
+    logger.info(f"Calling Stability AI SD3.5 for evolution: {crew_name}")
+
+    response = client.invoke_model(
+        modelId=STABILITY_MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(request_body),
+    )
+
+    response_body = json.loads(response["body"].read())
+
+    # 生成された画像を取得
+    if "images" not in response_body or len(response_body["images"]) == 0:
+        raise ValueError("No images generated by Stability AI")
+
+    generated_image_b64 = response_body["images"][0]
+    generated_image = base64_to_image(generated_image_b64)
+
+    logger.info(f"Evolution image generated ({generated_image.size}), removing background...")
+
+    # 背景を透過
+    transparent_image = remove_background_in_pool(generated_image)
+
+    # ファイルを保存（進化版は "evolved_" プレフィックスを付ける）
+    file_name = f"evolved_{uuid.uuid4()}.png"
+    output_path = OUTPUT_DIR / file_name
+    transparent_image.save(output_path, "PNG")
+
+    logger.info(f"Saved evolved image: {output_path}")
+
+    # フロントエンドから参照できる相対パス
+    relative_path = f"/images/crews/generated/{file_name}"
+    return relative_path
 
 
 async def evolve_crew_image(current_image_path: str, crew_name: str) -> str:
@@ -459,61 +711,7 @@ async def evolve_crew_image(current_image_path: str, crew_name: str) -> str:
         str: 生成された画像の相対パス
     """
     try:
-        # 出力ディレクトリを作成
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-        # 現在の画像を読み込み
-        logger.info(f"Loading current image: {current_image_path}")
-        base_image_b64 = load_existing_image(current_image_path)
-
-        logger.info(f"Evolution prompt: {EVOLUTION_PROMPT[:80]}...")
-        logger.info(f"Evolution strength: {EVOLUTION_STRENGTH}")
-
-        # Stability AI 用クライアント（us-west-2）
-        client = get_stability_client()
-
-        # SD3.5 Large Image-to-Image リクエスト
-        request_body = {
-            "prompt": EVOLUTION_PROMPT,
-            "mode": "image-to-image",
-            "image": base_image_b64,
-            "strength": EVOLUTION_STRENGTH,  # 0.5 で適度な変化
-            "output_format": "png",
-        }
-
-        logger.info(f"Calling Stability AI SD3.5 for evolution: {crew_name}")
-
-        response = client.invoke_model(
-            modelId=STABILITY_MODEL_ID,
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(request_body),
-        )
-
-        response_body = json.loads(response["body"].read())
-
-        # 生成された画像を取得
-        if "images" not in response_body or len(response_body["images"]) == 0:
-            raise ValueError("No images generated by Stability AI")
-
-        generated_image_b64 = response_body["images"][0]
-        generated_image = base64_to_image(generated_image_b64)
-
-        logger.info(f"Evolution image generated ({generated_image.size}), removing background...")
-
-        # 背景を透過
-        transparent_image = remove_background(generated_image)
-
-        # ファイルを保存（進化版は "evolved_" プレフィックスを付ける）
-        file_name = f"evolved_{uuid.uuid4()}.png"
-        output_path = OUTPUT_DIR / file_name
-        transparent_image.save(output_path, "PNG")
-
-        logger.info(f"Saved evolved image: {output_path}")
-
-        # フロントエンドから参照できる相対パス
-        relative_path = f"/images/crews/generated/{file_name}"
-        return relative_path
+        return await run_image_job(_evolve_crew_image_sync, current_image_path, crew_name)
 
     except ClientError as e:
         error_code = e.response.get("Error", {}).get("Code", "")
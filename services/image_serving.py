@@ -0,0 +1,194 @@
+"""
+画像配信サービス
+
+DBに保存されたBase64画像（クルー画像・アバター）をJSONに埋め込まず、
+画像配信API（/api/images/...）のURLとして返すためのヘルパー関数。
+URLには画像のハッシュをバージョンとして付けるため、ブラウザは長期間キャッシュできる。
+"""
+
+import base64
+import binascii
+import logging
+import os
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import Crew, User, content_hash
+
+logger = logging.getLogger(__name__)
+
+# 画像URLの前に付けるAPIのベースURL（フロントエンドとAPIのオリジンが異なる場合に設定）
+PUBLIC_API_BASE_URL = os.getenv("PUBLIC_API_BASE_URL", "").rstrip("/")
+
+# 画像レスポンスのキャッシュ期間（URLがバージョン付きのため内容は変わらない）
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# 先頭バイト → メディアタイプ（data URIでないBase64の判定用）
+_MAGIC_NUMBERS = [
+    (b"\x89PNG", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+]
+
+# If-None-Match内の個々のETag（W/"..." または "..."）
+_ETAG_PATTERN = re.compile(r'(?:W/)?"[^"]*"')
+
+
+def crew_image_url(crew: Crew, size: Optional[str] = None) -> str:
+    """
+    クルー画像の表示用URLを返す
+
+    Base64画像がある場合は画像配信APIのバージョン付きURL、なければimage_url
+
+    Args:
+        crew: クルー（image_base64は読み込まない）
+        size: サムネイルのサイズ（sm / md / lg、Noneの場合は元画像）
+
+    Returns:
+        str: 画像URL
+    """
+    if crew.image_hash:
+        url = f"{PUBLIC_API_BASE_URL}/api/images/{crew.id}?v={crew.image_hash}"
+        return f"{url}&size={size}" if size else url
+    return crew.image_url
+
+
+def avatar_url(user: User, size: Optional[str] = None) -> Optional[str]:
+    """
+    アバター画像の表示用URLを返す
+
+    Args:
+        user: ユーザー（avatar_dataは読み込まない）
+        size: サムネイルのサイズ（sm / md / lg、Noneの場合は元画像）
+
+    Returns:
+        str: 画像URL（アバター未設定の場合はNone）
+    """
+    if user.avatar_hash:
+        url = f"{PUBLIC_API_BASE_URL}/api/images/avatars/{user.id}?v={user.avatar_hash}"
+        return f"{url}&size={size}" if size else url
+    return None
+
+
+def decode_image_data(data: str) -> Tuple[bytes, str]:
+    """
+    data URIまたはBase64文字列を画像のバイトデータに変換する
+
+    Args:
+        data: "data:image/png;base64,..." 形式、またはBase64文字列
+
+    Returns:
+        Tuple[bytes, str]: (画像データ, メディアタイプ)
+
+    Raises:
+        ValueError: Base64として不正な場合
+    """
+    media_type = None
+    if data.startswith("data:"):
+        header, _, data = data.partition(",")
+        media_type = header[len("data:"):].split(";")[0] or None
+
+    try:
+        image_bytes = base64.b64decode(data)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid image data: {e}")
+
+    if not media_type:
+        media_type = next(
+            (mime for magic, mime in _MAGIC_NUMBERS if image_bytes.startswith(magic)),
+            "application/octet-stream",
+        )
+    return image_bytes, media_type
+
+
+def is_image_data(data: str) -> bool:
+    """
+    文字列が画像データ（画像のdata URI、または画像ファイルのBase64）かどうかを判定する
+
+    GETで返した画像URLがそのまま送り返された場合などに、画像として保存しないために使う
+
+    Args:
+        data: 判定する文字列
+
+    Returns:
+        bool: "data:image/...;base64," 形式、またはデコード結果の先頭バイトが既知の画像形式の場合True
+    """
+    is_data_uri = data.startswith("data:")
+    if is_data_uri:
+        header, _, data = data.partition(",")
+        if not (header.startswith("data:image/") and header.endswith(";base64")):
+            return False
+    try:
+        image_bytes = base64.b64decode("".join(data.split()), validate=True)
+    except binascii.Error:
+        return False
+    if is_data_uri:
+        # メディアタイプが画像と明示されている（SVGなど先頭バイトで判定できない形式も含む）
+        return bool(image_bytes)
+    return any(image_bytes.startswith(magic) for magic, _ in _MAGIC_NUMBERS)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-MatchヘッダーがETagに一致するかを判定する（RFC 9110の弱い比較）
+
+    Args:
+        if_none_match: If-None-Matchヘッダーの値（"*"、またはカンマ区切りのETagの一覧）
+        etag: レスポンスのETag
+
+    Returns:
+        bool: 一致するETagがある場合True
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 弱いETag（W/"..."）も強いETagと同じ値なら一致とみなす
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        candidate.removeprefix("W/") == opaque_tag
+        for candidate in _ETAG_PATTERN.findall(if_none_match)
+    )
+
+
+def backfill_image_hashes(db: Session) -> int:
+    """
+    ハッシュ未設定の画像にハッシュを設定する（ハッシュ列追加前のデータ用）
+
+    Returns:
+        int: 更新した件数
+    """
+    updated = 0
+
+    for crew_id, image_base64 in (
+        db.query(Crew.id, Crew.image_base64)
+        .filter(Crew.image_base64.isnot(None), Crew.image_hash.is_(None))
+        .all()
+    ):
+        if not is_image_data(image_base64):
+            continue
+        db.query(Crew).filter(Crew.id == crew_id).update(
+            {Crew.image_hash: content_hash(image_base64)}, synchronize_session=False
+        )
+        updated += 1
+
+    for user_id, avatar_data in (
+        db.query(User.id, User.avatar_data)
+        .filter(User.avatar_data.isnot(None), User.avatar_hash.is_(None))
+        .all()
+    ):
+        # 画像以外の値（URLなど）にはハッシュを付けない（avatar_urlは未設定として扱う）
+        if not is_image_data(avatar_data):
+            continue
+        db.query(User).filter(User.id == user_id).update(
+            {User.avatar_hash: content_hash(avatar_data)}, synchronize_session=False
+        )
+        updated += 1
+
+    if updated:
+        db.commit()
+        logger.info(f"Backfilled {updated} image hashes")
+    return updated
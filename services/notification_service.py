@@ -14,6 +14,7 @@ from enum import Enum
 from sqlalchemy.orm import Session
 
 from models import Notification, ActivityLog, now_jst
+from services.pagination import invalidate_counts, keyset_condition
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +95,7 @@ def create_notification(
     db.add(notification)
     db.commit()
     db.refresh(notification)
+    invalidate_counts("notifications", user_id)
 
     logger.info(f"Notification created: user_id={user_id}, title={title}, type={notification_type}")
 
@@ -136,26 +138,35 @@ def get_notifications(
     unread_only: bool = False,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> list[Notification]:
     """
-    ユーザーの通知一覧を取得する
+    ユーザーの通知一覧を取得する（作成日時・IDの降順）
 
     Args:
         db: データベースセッション
         user_id: ユーザーID
         unread_only: 未読のみ取得するか
         limit: 取得件数上限
-        offset: 取得開始位置
+        offset: 取得開始位置（cursor指定時は無視）
+        cursor: 前ページの最後の行を表すカーソル（services.pagination）
 
     Returns:
         通知のリスト
+
+    Raises:
+        ValueError: カーソルが不正な場合
     """
     query = db.query(Notification).filter(Notification.user_id == user_id)
 
     if unread_only:
         query = query.filter(Notification.is_read == False)
 
-    return query.order_by(Notification.created_at.desc()).offset(offset).limit(limit).all()
+    if cursor:
+        query = query.filter(keyset_condition(Notification.created_at, Notification.id, cursor))
+        offset = 0
+
+    return query.order_by(Notification.created_at.desc(), Notification.id.desc()).offset(offset).limit(limit).all()
 
 
 def get_unread_count(db: Session, user_id: int) -> int:
@@ -196,6 +207,7 @@ def mark_as_read(db: Session, notification_id: int, user_id: int) -> Optional[No
         notification.is_read = True
         db.commit()
         db.refresh(notification)
+        invalidate_counts("notifications", user_id)
         logger.debug(f"Notification marked as read: id={notification_id}")
 
     return notification
@@ -218,6 +230,7 @@ def mark_all_as_read(db: Session, user_id: int) -> int:
     ).update({"is_read": True})
 
     db.commit()
+    invalidate_counts("notifications", user_id)
     logger.info(f"Marked {count} notifications as read for user {user_id}")
 
     return count
@@ -264,6 +277,7 @@ def write_log(
     db.add(activity_log)
     db.commit()
     db.refresh(activity_log)
+    invalidate_counts("activity_logs", user_id)
 
     # ログレベルに応じたPythonロギング
     log_message = f"[{action}] user_id={user_id}, project_id={project_id}: {message}"
@@ -287,9 +301,10 @@ def get_logs(
     action: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> list[ActivityLog]:
     """
-    アクティビティログを取得する
+    アクティビティログを取得する（作成日時・IDの降順）
 
     Args:
         db: データベースセッション
@@ -298,10 +313,14 @@ def get_logs(
         level: ログレベルでフィルタ（任意）
         action: アクション種別でフィルタ（任意）
         limit: 取得件数上限
-        offset: 取得開始位置
+        offset: 取得開始位置（cursor指定時は無視）
+        cursor: 前ページの最後の行を表すカーソル（services.pagination）
 
     Returns:
         アクティビティログのリスト
+
+    Raises:
+        ValueError: カーソルが不正な場合
     """
     query = db.query(ActivityLog).filter(ActivityLog.user_id == user_id)
 
@@ -315,7 +334,11 @@ def get_logs(
     if action is not None:
         query = query.filter(ActivityLog.action == action)
 
-    return query.order_by(ActivityLog.created_at.desc()).offset(offset).limit(limit).all()
+    if cursor:
+        query = query.filter(keyset_condition(ActivityLog.created_at, ActivityLog.id, cursor))
+        offset = 0
+
+    return query.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).offset(offset).limit(limit).all()
 
 
 # =============================================================================
@@ -0,0 +1,268 @@
+"""
+Office Reader Service
+Word (.docx) / PowerPoint (.pptx) ファイルからテキストを抽出するサービス
+
+python-docx / python-pptx のオブジェクトモデルは構築せず、
+ZIP内のXMLをiterparseで直接読み込む。文字数の上限に達した時点で読み込みを打ち切る。
+"""
+
+import io
+import logging
+import posixpath
+import zipfile
+from typing import Iterator, Tuple
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# テキスト抽出の最大文字数（トークン節約のため）
+MAX_CONTENT_LENGTH = 50000
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+
+# 段落テキストの収集時に中へ入らない要素（テキストボックスなど本文外の内容）
+_DOCX_SKIP_TAGS = frozenset([_W + "drawing", _W + "pict", _MC + "AlternateContent", _W + "pPr", _W + "rPr"])
+
+
+# =============================================================================
+# Word (.docx)
+# =============================================================================
+
+def _load_docx_style_names(archive: zipfile.ZipFile) -> dict[str, str]:
+    """styles.xml から styleId → スタイル名 の対応を読み込む"""
+    try:
+        stream = archive.open("word/styles.xml")
+    except KeyError:
+        return {}
+
+    names = {}
+    with stream:
+        for _, style in etree.iterparse(stream, events=("end",), tag=_W + "style"):
+            name = style.find(_W + "name")
+            if name is not None:
+                names[style.get(_W + "styleId")] = name.get(_W + "val", "")
+            style.clear()
+    return names
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    """段落のテキストを取得する（python-docxのParagraph.textに相当）"""
+    parts = []
+
+    def walk(element):
+        for child in element:
+            tag = child.tag
+            if tag == _W + "t":
+                parts.append(child.text or "")
+            elif tag == _W + "tab":
+                parts.append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                parts.append("\n")
+            elif tag == _W + "noBreakHyphen":
+                parts.append("-")
+            elif tag not in _DOCX_SKIP_TAGS:
+                walk(child)
+
+    walk(paragraph)
+    return "".join(parts)
+
+
+def _docx_heading_prefix(paragraph, style_names: dict[str, str]) -> str | None:
+    """見出しスタイルの段落ならMarkdownの見出し記号を返す"""
+    style = paragraph.find(f"{_W}pPr/{_W}pStyle")
+    if style is None:
+        return None
+
+    name = style_names.get(style.get(_W + "val"), "")
+    if not name.lower().startswith("heading"):
+        return None
+
+    try:
+        return "#" * (int(name.split()[-1]) + 1)
+    except ValueError:
+        return "###"
+
+
+def _docx_table_lines(table) -> list[str]:
+    """表を '| セル | セル |' 形式の行に変換する（結合セルは同じ内容を繰り返す）"""
+    lines = []
+    previous_row: list[str] = []
+    for row in table.iterchildren(_W + "tr"):
+        cells = []
+        for cell in row.iterchildren(_W + "tc"):
+            properties = cell.find(_W + "tcPr")
+            span = 1
+            continues_merge = False
+            if properties is not None:
+                grid_span = properties.find(_W + "gridSpan")
+                if grid_span is not None:
+                    span = int(grid_span.get(_W + "val", "1"))
+                v_merge = properties.find(_W + "vMerge")
+                continues_merge = v_merge is not None and v_merge.get(_W + "val") != "restart"
+
+            if continues_merge and len(previous_row) > len(cells):
+                text = previous_row[len(cells)]
+            else:
+                text = "\n".join(
+                    _docx_paragraph_text(paragraph) for paragraph in cell.iterchildren(_W + "p")
+                ).strip()
+            cells.extend([text] * span)
+
+        lines.append("| " + " | ".join(cells) + " |")
+        previous_row = cells
+    return lines
+
+
+def extract_docx_lines(content: bytes, max_chars: int = MAX_CONTENT_LENGTH) -> list[str]:
+    """
+    Word文書の本文を文書順に行のリストとして抽出する
+
+    見出しはMarkdownの見出し、表は '| セル | セル |' 形式の行（前後に空行）になる
+
+    Args:
+        content: .docxファイルのバイトデータ
+        max_chars: 最大文字数（超えた時点で読み込みを打ち切る）
+
+    Returns:
+        list[str]: 抽出された行
+    """
+    lines = []
+    total = 0
+
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        style_names = _load_docx_style_names(archive)
+
+        with archive.open("word/document.xml") as stream:
+            for _, element in etree.iterparse(stream, events=("end",), tag=(_W + "p", _W + "tbl")):
+                parent = element.getparent()
+                if parent is None or parent.tag != _W + "body":
+                    # 表の中の段落は表としてまとめて処理する
+                    continue
+
+                if element.tag == _W + "p":
+                    text = _docx_paragraph_text(element)
+                    if text.strip():
+                        prefix = _docx_heading_prefix(element, style_names)
+                        line = f"{prefix} {text}" if prefix else text
+                        lines.append(line)
+                        total += len(line) + 1
+                else:
+                    table_lines = ["", *_docx_table_lines(element), ""]
+                    lines.extend(table_lines)
+                    total += sum(len(line) + 1 for line in table_lines)
+
+                # 処理済みの要素を解放してメモリ使用量を抑える
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+                if total > max_chars:
+                    logger.info(f"Word document truncated at {max_chars} characters")
+                    break
+
+    return lines
+
+
+# =============================================================================
+# PowerPoint (.pptx)
+# =============================================================================
+
+def _pptx_slide_paths(archive: zipfile.ZipFile) -> list[str]:
+    """presentation.xml のスライド順にスライドXMLのパスを返す"""
+    targets = {}
+    with archive.open("ppt/_rels/presentation.xml.rels") as stream:
+        for _, rel in etree.iterparse(stream, events=("end",), tag=_PKG_REL + "Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                path = target.lstrip("/")
+            else:
+                path = posixpath.normpath(posixpath.join("ppt", target))
+            targets[rel.get("Id")] = path
+
+    paths = []
+    with archive.open("ppt/presentation.xml") as stream:
+        for _, slide_id in etree.iterparse(stream, events=("end",), tag=_P + "sldId"):
+            path = targets.get(slide_id.get(_R + "id"))
+            if path:
+                paths.append(path)
+    return paths
+
+
+def _pptx_text_body_text(text_body) -> str:
+    """テキストボディの段落を改行で結合したテキストを返す"""
+    paragraphs = []
+    for paragraph in text_body.iterchildren(_A + "p"):
+        parts = []
+        for child in paragraph:
+            if child.tag in (_A + "r", _A + "fld"):
+                text = child.find(_A + "t")
+                if text is not None and text.text:
+                    parts.append(text.text)
+            elif child.tag == _A + "br":
+                parts.append("\n")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def _iter_pptx_slide_texts(stream) -> Iterator[str]:
+    """スライド内の図形テキストと表を出現順に返す"""
+    for _, element in etree.iterparse(stream, events=("end",), tag=(_P + "sp", _A + "tbl")):
+        if element.tag == _P + "sp":
+            text_body = element.find(_P + "txBody")
+            if text_body is not None:
+                text = _pptx_text_body_text(text_body)
+                if text.strip():
+                    yield text
+        else:
+            rows = []
+            for row in element.iterchildren(_A + "tr"):
+                cells = []
+                for cell in row.iterchildren(_A + "tc"):
+                    text_body = cell.find(_A + "txBody")
+                    cells.append(_pptx_text_body_text(text_body).strip() if text_body is not None else "")
+                rows.append("| " + " | ".join(cells) + " |")
+            if rows:
+                yield "\n".join(rows)
+        element.clear()
+
+
+def extract_pptx_slides(content: bytes, max_chars: int = MAX_CONTENT_LENGTH) -> Tuple[int, list[list[str]]]:
+    """
+    PowerPointのスライドごとのテキストを抽出する
+
+    Args:
+        content: .pptxファイルのバイトデータ
+        max_chars: 最大文字数（超えた時点で以降のスライドは読まない）
+
+    Returns:
+        Tuple[int, list[list[str]]]: (総スライド数, スライドごとの図形テキストのリスト)
+    """
+    slides = []
+    total = 0
+
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        slide_paths = _pptx_slide_paths(archive)
+
+        for path in slide_paths:
+            try:
+                stream = archive.open(path)
+            except KeyError:
+                logger.warning(f"Slide part not found: {path}")
+                continue
+
+            with stream:
+                texts = list(_iter_pptx_slide_texts(stream))
+            slides.append(texts)
+            total += sum(len(text) + 1 for text in texts)
+
+            if total > max_chars:
+                logger.info(f"PowerPoint truncated at {max_chars} characters")
+                break
+
+    return len(slide_paths), slides
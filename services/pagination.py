@@ -0,0 +1,163 @@
+"""
+ページネーションサービス
+
+一覧APIのキーセットページネーション（created_at, id の降順）と、件数（total）のキャッシュを行う。
+OFFSETは読み飛ばす行数に比例して遅くなるため、前ページ最後の行の (created_at, id) を
+カーソルとして渡し、インデックスの続きから読む。
+"""
+
+import base64
+import binascii
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_
+
+# 件数キャッシュの有効期間（秒）。期限内は件数が多少ずれる可能性がある
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+# 件数キャッシュの最大エントリ数
+COUNT_CACHE_MAX_ENTRIES = 1024
+
+# (名前空間, ユーザーID, 絞り込み条件...) → (件数, 期限)
+_count_cache: dict[tuple, tuple[int, float]] = {}
+_count_cache_lock = threading.Lock()
+
+
+# =============================================================================
+# カーソル
+# =============================================================================
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    行の (created_at, id) を不透明なカーソル文字列にする
+
+    Args:
+        created_at: 行の作成日時
+        row_id: 行のID
+
+    Returns:
+        str: URLセーフなカーソル文字列
+    """
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    カーソル文字列を (created_at, id) に戻す
+
+    Args:
+        cursor: encode_cursor で作ったカーソル文字列
+
+    Returns:
+        tuple[datetime, int]: (作成日時, ID)
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.partition("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def keyset_condition(created_at_column, id_column, cursor: str):
+    """
+    カーソルより後ろ（created_at, id の降順で次）の行を表す条件を作る
+
+    Args:
+        created_at_column: 作成日時のカラム
+        id_column: IDのカラム
+        cursor: 前ページの next_cursor
+
+    Returns:
+        条件式（filter / where に渡す）
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    created_at, row_id = decode_cursor(cursor)
+    # created_at <= ? を先に置き、(user_id, created_at) インデックスの範囲検索にする
+    return and_(
+        created_at_column <= created_at,
+        or_(created_at_column < created_at, id_column < row_id),
+    )
+
+
+def split_page(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    """
+    limit + 1 件取得した結果をページと次ページのカーソルに分ける
+
+    Args:
+        rows: created_at, id の降順で limit + 1 件まで取得した行
+        limit: ページの件数
+
+    Returns:
+        tuple[list, Optional[str]]: (ページの行, 次ページのカーソル。最後のページならNone)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1].created_at, page[-1].id)
+
+
+# =============================================================================
+# 件数キャッシュ
+# =============================================================================
+
+def get_cached_count(key: tuple[Any, ...]) -> Optional[int]:
+    """
+    キャッシュ済みの件数を取得する
+
+    Args:
+        key: (名前空間, ユーザーID, 絞り込み条件...)
+
+    Returns:
+        Optional[int]: 件数（キャッシュがない・期限切れの場合はNone）
+    """
+    with _count_cache_lock:
+        entry = _count_cache.get(key)
+        if entry is None:
+            return None
+        count, expires_at = entry
+        if expires_at < time.monotonic():
+            del _count_cache[key]
+            return None
+        return count
+
+
+def set_cached_count(key: tuple[Any, ...], count: int) -> None:
+    """
+    件数をキャッシュする
+
+    Args:
+        key: (名前空間, ユーザーID, 絞り込み条件...)
+        count: 件数
+    """
+    now = time.monotonic()
+    with _count_cache_lock:
+        if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+            for expired_key in [k for k, (_, expires_at) in _count_cache.items() if expires_at < now]:
+                del _count_cache[expired_key]
+            if len(_count_cache) >= COUNT_CACHE_MAX_ENTRIES:
+                # 最も古く登録されたエントリを捨てる
+                del _count_cache[next(iter(_count_cache))]
+        _count_cache[key] = (count, now + COUNT_CACHE_TTL)
+
+
+def invalidate_counts(namespace: str, user_id: int) -> None:
+    """
+    ユーザーの件数キャッシュを破棄する（行の追加・削除時に呼ぶ）
+
+    Args:
+        namespace: 名前空間（テーブル名）
+        user_id: ユーザーID
+    """
+    with _count_cache_lock:
+        for key in [k for k in _count_cache if k[:2] == (namespace, user_id)]:
+            del _count_cache[key]
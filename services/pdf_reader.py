@@ -3,73 +3,238 @@ PDF Reader Service
 PDFファイルからテキストを抽出するサービス
 """
 
-from typing import BinaryIO
+import asyncio
+import hashlib
+import io
 import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple, Union
 
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 
+from services.worker_pool import CPU_WORKERS, run_in_process
+
 
 logger = logging.getLogger(__name__)
 
 # テキスト抽出の最大文字数（トークン節約のため）
 MAX_CONTENT_LENGTH = 10000
 
+# このページ数を超えるPDFはプロセスプールでページ範囲ごとに並列抽出する
+PARALLEL_MIN_PAGES = 24
+
+# 1ワーカーに渡すページ数
+PAGES_PER_CHUNK = 8
+
+# 並列抽出で同時に投入するページ範囲の数
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, CPU_WORKERS))))
+
+# 抽出結果のキャッシュ件数（SHA-256をキーに保持）
+PDF_CACHE_SIZE = 128
+
+_cache: "OrderedDict[tuple, Tuple[str, int]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key: tuple) -> Optional[Tuple[str, int]]:
+    with _cache_lock:
+        result = _cache.get(key)
+        if result is not None:
+            _cache.move_to_end(key)
+        return result
+
+
+def _cache_put(key: tuple, result: Tuple[str, int]) -> None:
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > PDF_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _open_reader(content: Union[bytes, str, Path]) -> PdfReader:
+    """PdfReaderを生成し、暗号化されていないことを確認する（バイトデータまたはファイルパス）"""
+    reader = PdfReader(io.BytesIO(content) if isinstance(content, bytes) else content)
+
+    # 暗号化されているかチェック
+    if reader.is_encrypted:
+        logger.warning("PDF is encrypted and cannot be read")
+        raise ValueError("このPDFは暗号化されているため読み込めません。")
+
+    return reader
+
 
-def extract_text_from_pdf(file: BinaryIO) -> str:
+def _extract_pages(reader: PdfReader, start: int, end: int, max_chars: Optional[int]) -> list[str]:
+    """
+    指定範囲のページからテキストを抽出する
+
+    抽出済みの文字数がmax_charsに達した時点で残りのページは読まない
+    """
+    text_parts = []
+    total = 0
+    for page_num in range(start, end):
+        try:
+            page_text = reader.pages[page_num].extract_text()
+        except Exception as e:
+            logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+            continue
+
+        if page_text:
+            part = f"[ページ {page_num + 1}]\n{page_text}"
+            text_parts.append(part)
+            total += len(part) + 2
+            if max_chars is not None and total >= max_chars:
+                break
+
+    return text_parts
+
+
+def _extract_page_range(content: Union[bytes, str], start: int, end: int, max_chars: Optional[int]) -> list[str]:
+    """プロセスプールのワーカーで実行するページ範囲の抽出"""
+    return _extract_pages(_open_reader(content), start, end, max_chars)
+
+
+def _join_pages(text_parts: list[str], max_chars: int, page_count: int) -> str:
+    """ページごとのテキストを結合し、文字数制限を適用する"""
+    if not text_parts:
+        logger.warning("No text could be extracted from PDF")
+        raise ValueError("PDFからテキストを抽出できませんでした。画像のみのPDFの可能性があります。")
+
+    # テキストを結合
+    full_text = "\n\n".join(text_parts)
+
+    # 文字数制限
+    if len(full_text) > max_chars:
+        full_text = full_text[:max_chars] + "\n\n...（以下省略）"
+        logger.info(f"PDF text truncated to {max_chars} characters")
+
+    logger.info(f"Extracted {len(full_text)} characters from PDF ({page_count} pages)")
+    return full_text.strip()
+
+
+def _extract_sequential(content: bytes, max_chars: int, max_pages: Optional[int]) -> Tuple[str, int]:
+    reader = _open_reader(content)
+    page_count = len(reader.pages)
+    end = min(page_count, max_pages) if max_pages else page_count
+    text_parts = _extract_pages(reader, 0, end, max_chars)
+    return _join_pages(text_parts, max_chars, page_count), page_count
+
+
+def _wrap_errors(e: Exception) -> ValueError:
+    if isinstance(e, ValueError):
+        # 既知のエラー（暗号化など）はそのまま
+        return e
+    if isinstance(e, PdfReadError):
+        logger.error(f"PDF read error: {e}")
+        return ValueError(f"PDFファイルの読み込みに失敗しました: {str(e)}")
+    logger.error(f"Unexpected error reading PDF: {e}")
+    return ValueError(f"PDFの処理中にエラーが発生しました: {str(e)}")
+
+
+def extract_text_from_pdf(file: BinaryIO, max_chars: int = MAX_CONTENT_LENGTH) -> str:
     """
     PDFファイルからテキストを抽出する
 
+    先頭ページから順に抽出し、max_charsに達した時点で残りのページは読まない。
+    結果はファイル内容のSHA-256でキャッシュされる。
+
     Args:
         file: PDFファイルのバイナリストリーム
+        max_chars: 最大文字数
 
     Returns:
         抽出されたテキスト（最大10,000文字）
         読み込み失敗時は空文字を返す
     """
+    content = file.read()
+    key = (hashlib.sha256(content).hexdigest(), max_chars, None)
+
+    cached = _cache_get(key)
+    if cached is not None:
+        logger.info("PDF text cache hit")
+        return cached[0]
+
     try:
-        reader = PdfReader(file)
+        result = _extract_sequential(content, max_chars, None)
+    except Exception as e:
+        raise _wrap_errors(e)
 
-        # 暗号化されているかチェック
-        if reader.is_encrypted:
-            logger.warning("PDF is encrypted and cannot be read")
-            raise ValueError("このPDFは暗号化されているため読み込めません。")
-
-        # 全ページからテキストを抽出
-        text_parts = []
-        for page_num, page in enumerate(reader.pages):
-            try:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(f"[ページ {page_num + 1}]\n{page_text}")
-            except Exception as e:
-                logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                continue
-
-        if not text_parts:
-            logger.warning("No text could be extracted from PDF")
-            raise ValueError("PDFからテキストを抽出できませんでした。画像のみのPDFの可能性があります。")
-
-        # テキストを結合
-        full_text = "\n\n".join(text_parts)
-
-        # 文字数制限
-        if len(full_text) > MAX_CONTENT_LENGTH:
-            full_text = full_text[:MAX_CONTENT_LENGTH] + "\n\n...（以下省略）"
-            logger.info(f"PDF text truncated to {MAX_CONTENT_LENGTH} characters")
-
-        logger.info(f"Extracted {len(full_text)} characters from PDF ({len(reader.pages)} pages)")
-        return full_text.strip()
-
-    except ValueError:
-        # 既知のエラー（暗号化など）は再送出
-        raise
-    except PdfReadError as e:
-        logger.error(f"PDF read error: {e}")
-        raise ValueError(f"PDFファイルの読み込みに失敗しました: {str(e)}")
+    _cache_put(key, result)
+    return result[0]
+
+
+async def extract_pdf_text(
+    content: Union[bytes, Path],
+    max_chars: int = MAX_CONTENT_LENGTH,
+    max_pages: Optional[int] = None,
+) -> Tuple[str, int]:
+    """
+    PDFのバイトデータからテキストを抽出する（非同期版）
+
+    イベントループをブロックしないよう抽出はスレッド/プロセスで行う。
+    PARALLEL_MIN_PAGESを超えるPDFはPAGES_PER_CHUNKページずつプロセスプールで並列抽出し、
+    max_charsに達した時点で以降のページ範囲は投入しない。
+    ファイルパスを渡した場合は呼び出し元でファイルを読み込まず、ワーカープロセスにもバイト列ではなくパスを渡す。
+
+    Args:
+        content: PDFファイルのバイトデータ、またはファイルパス
+        max_chars: 最大文字数
+        max_pages: 先頭から読む最大ページ数（Noneの場合は全ページ）
+
+    Returns:
+        Tuple[str, int]: (抽出されたテキスト, 総ページ数)
+
+    Raises:
+        ValueError: 読み込み・抽出に失敗した場合
+    """
+    # パスの場合は呼び出し元（添付ファイルストア）が内容のハッシュで結果を保存するためキャッシュしない
+    key = None
+    if isinstance(content, bytes):
+        key = (hashlib.sha256(content).hexdigest(), max_chars, max_pages)
+        cached = _cache_get(key)
+        if cached is not None:
+            logger.info("PDF text cache hit")
+            return cached
+    else:
+        content = str(content)
+
+    try:
+        reader = await asyncio.to_thread(_open_reader, content)
+        page_count = len(reader.pages)
+        end = min(page_count, max_pages) if max_pages else page_count
+
+        if end <= PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+            text_parts = await asyncio.to_thread(_extract_pages, reader, 0, end, max_chars)
+            result = (_join_pages(text_parts, max_chars, page_count), page_count)
+        else:
+            ranges = [(start, min(start + PAGES_PER_CHUNK, end)) for start in range(0, end, PAGES_PER_CHUNK)]
+
+            text_parts = []
+            total = 0
+            # ワーカー数ずつページ範囲を投入し、文字数が足りた時点で打ち切る
+            for i in range(0, len(ranges), PDF_WORKERS):
+                wave = ranges[i:i + PDF_WORKERS]
+                results = await asyncio.gather(*[
+                    run_in_process(_extract_page_range, content, start, stop, max_chars)
+                    for start, stop in wave
+                ])
+                for parts in results:
+                    text_parts.extend(parts)
+                    total += sum(len(part) + 2 for part in parts)
+                if total >= max_chars:
+                    break
+
+            result = (_join_pages(text_parts, max_chars, page_count), page_count)
     except Exception as e:
-        logger.error(f"Unexpected error reading PDF: {e}")
-        raise ValueError(f"PDFの処理中にエラーが発生しました: {str(e)}")
+        raise _wrap_errors(e)
+
+    if key is not None:
+        _cache_put(key, result)
+    return result
 
 
 def get_pdf_info(file: BinaryIO) -> dict:
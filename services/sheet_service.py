@@ -4,12 +4,21 @@ Google Sheets読込サービス
 公開されたGoogle SheetsからCSVデータを取得する
 """
 
+import csv
 import re
 import logging
 import requests
 
+from services.download_utils import iter_response_lines
+
 logger = logging.getLogger(__name__)
 
+# ダウンロードするCSVの最大バイト数（これ以降は読み込まない）
+MAX_SHEET_BYTES = 5 * 1024 * 1024
+
+# 行数制限で打ち切った場合に末尾へ付ける目印
+TRUNCATED_MARKER = "... (以降の行は省略)"
+
 
 def extract_sheet_id(url: str) -> str | None:
     """
@@ -47,16 +56,20 @@ def is_google_sheets_url(url: str) -> bool:
     return 'docs.google.com/spreadsheets' in url
 
 
-def read_public_sheet(url: str, sheet_name: str = None) -> str:
+def read_public_sheet(url: str, sheet_name: str = None, max_rows: int = None) -> str:
     """
     公開されたGoogle SheetsからCSVデータを取得する
 
+    CSVはストリーミングで読み込み、max_rows行（ヘッダー含む）または
+    MAX_SHEET_BYTESに達した時点でダウンロードを打ち切る。
+
     Args:
         url: Google SheetsのURL
         sheet_name: 特定のシート名（オプション）
+        max_rows: 取得する最大行数（Noneの場合はバイト上限まで）
 
     Returns:
-        str: CSVテキストデータ
+        str: CSVテキストデータ（打ち切った場合は末尾にTRUNCATED_MARKERを付与）
 
     Raises:
         ValueError: URLが無効な場合
@@ -77,32 +90,36 @@ def read_public_sheet(url: str, sheet_name: str = None) -> str:
     logger.info(f"Fetching Google Sheet: {sheet_id}")
 
     try:
-        response = requests.get(
+        with requests.get(
             export_url,
             timeout=30,
             headers={
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-        )
+            },
+            stream=True
+        ) as response:
 
-        if response.status_code == 200:
-            csv_text = response.text
+            if response.status_code == 200:
+                csv_text, truncated = _read_csv_rows(response, max_rows)
 
-            # CSVが空でないことを確認
-            if not csv_text.strip():
-                raise ValueError("The spreadsheet appears to be empty")
+                # CSVが空でないことを確認
+                if not csv_text.strip():
+                    raise ValueError("The spreadsheet appears to be empty")
 
-            logger.info(f"Successfully fetched Google Sheet: {len(csv_text)} characters")
-            return csv_text
+                if truncated:
+                    csv_text = csv_text.rstrip("\r\n") + "\n" + TRUNCATED_MARKER
 
-        elif response.status_code == 404:
-            raise ValueError("Spreadsheet not found. Make sure it exists and is publicly accessible.")
+                logger.info(f"Successfully fetched Google Sheet: {len(csv_text)} characters")
+                return csv_text
 
-        elif response.status_code == 403:
-            raise ValueError("Access denied. Make sure the spreadsheet is set to 'Anyone with the link can view'.")
+            elif response.status_code == 404:
+                raise ValueError("Spreadsheet not found. Make sure it exists and is publicly accessible.")
 
-        else:
-            raise ValueError(f"Failed to fetch spreadsheet: HTTP {response.status_code}")
+            elif response.status_code == 403:
+                raise ValueError("Access denied. Make sure the spreadsheet is set to 'Anyone with the link can view'.")
+
+            else:
+                raise ValueError(f"Failed to fetch spreadsheet: HTTP {response.status_code}")
 
     except requests.exceptions.Timeout:
         raise ValueError("Request timed out. Please try again.")
@@ -111,6 +128,37 @@ def read_public_sheet(url: str, sheet_name: str = None) -> str:
         raise ValueError(f"Network error: {str(e)}")
 
 
+def _read_csv_rows(response: requests.Response, max_rows: int | None) -> tuple[str, bool]:
+    """
+    ストリーミング中のCSVを行単位でパースし、max_rows行分の元テキストを返す
+
+    セル内改行を含む行も1行として数えるため、csv.readerで行境界を判定する。
+
+    Returns:
+        tuple[str, bool]: (CSVテキスト, 途中で打ち切ったかどうか)
+    """
+    consumed = []
+    lines = iter_response_lines(response, MAX_SHEET_BYTES)
+
+    def record(line_iter):
+        for line in line_iter:
+            consumed.append(line)
+            yield line
+
+    reader = csv.reader(record(lines))
+    row_end = 0
+    row_count = 0
+    for _ in reader:
+        row_count += 1
+        row_end = len(consumed)
+        if max_rows is not None and row_count >= max_rows:
+            # 次の行が存在するかだけ確認する
+            truncated = next(lines, None) is not None
+            return "".join(consumed[:row_end]), truncated
+
+    return "".join(consumed), False
+
+
 def format_csv_for_prompt(csv_text: str, max_rows: int = 100) -> str:
     """
     CSVテキストをAIプロンプト用に整形する
@@ -122,12 +170,19 @@ def format_csv_for_prompt(csv_text: str, max_rows: int = 100) -> str:
     Returns:
         str: 整形されたテキスト
     """
-    lines = csv_text.strip().split('\n')
+    text = csv_text.strip()
 
-    if len(lines) > max_rows:
-        # 最初の行（ヘッダー）と最初のmax_rows-1行のデータを保持
-        truncated_lines = lines[:max_rows]
-        truncated_lines.append(f"... (残り {len(lines) - max_rows} 行は省略)")
-        return '\n'.join(truncated_lines)
+    if text.endswith('\n' + TRUNCATED_MARKER):
+        # 取得時点で打ち切り済み
+        return csv_text
+
+    # 全体を行分割せず、max_rows行目の末尾位置だけを探す
+    end = -1
+    for _ in range(max_rows):
+        end = text.find('\n', end + 1)
+        if end == -1:
+            return csv_text
 
-    return csv_text
+    # 最初の行（ヘッダー）と最初のmax_rows-1行のデータを保持
+    remaining = text.count('\n', end)
+    return f"{text[:end]}\n... (残り {remaining} 行は省略)"
@@ -0,0 +1,129 @@
+"""
+長文要約サービス
+
+字幕やPDFなど、プロンプトにそのまま入りきらない長文を
+チャンクに分割して並列に要約（map）し、要約をまとめる（reduce）。
+map は軽量モデル、reduce は生成用モデルで実行する。
+"""
+
+import asyncio
+import logging
+import re
+
+from services.bedrock_service import MODEL_ID, SUMMARY_MODEL_ID, invoke_claude
+
+logger = logging.getLogger(__name__)
+
+# 1チャンクあたりの目安トークン数
+CHUNK_TOKENS = 6000
+
+# チャンク数の目安（超えそうな場合はチャンクを大きくして処理時間を抑える）
+MAX_CHUNKS = 16
+
+# map処理で各チャンクから生成する要約の最大トークン数
+MAP_MAX_TOKENS = 800
+
+# reduce処理の最大トークン数
+REDUCE_MAX_TOKENS = 2500
+
+_SENTENCE_END = re.compile(r'(?<=[。．！？!?])|(?<=\. )')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する
+
+    日本語などの非ASCII文字は1文字≒1トークン、ASCII文字は4文字≒1トークンとして数える
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+def split_into_chunks(text: str, max_tokens: int = CHUNK_TOKENS) -> list[str]:
+    """
+    テキストを段落・文の区切りでmax_tokens以下のチャンクに分割する
+
+    1文がmax_tokensを超える場合のみ文の途中で分割する
+    """
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            while estimate_tokens(sentence) > max_tokens:
+                # 文字数ベースで強制的に分割（非ASCII前提の控えめな長さ）
+                pieces.append(sentence[:max_tokens])
+                sentence = sentence[max_tokens:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks = []
+    current: list[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+async def _summarize_chunk(chunk: str, index: int, total: int, source_label: str) -> str:
+    """1チャンクを軽量モデルで要約する（map）"""
+    prompt = f"""以下は{source_label}の一部（{index}/{total}）です。
+この部分に含まれる重要な事実・主張・数値・固有名詞を漏らさず、日本語の箇条書きで簡潔に要約してください。
+前置きや締めの言葉は不要です。
+
+【テキスト】
+{chunk}"""
+    summary = await invoke_claude(prompt, model_id=SUMMARY_MODEL_ID, max_tokens=MAP_MAX_TOKENS, temperature=0.3)
+    return f"【パート {index}/{total}】\n{summary}"
+
+
+async def summarize_long_text(text: str, max_chars: int, source_label: str = "資料") -> str:
+    """
+    長文をmax_chars以内に収まるよう要約する
+
+    - max_chars以内ならそのまま返す
+    - 超える場合はチャンクに分割して軽量モデルで並列に要約（map、同時実行数はBedrockの制限に従う）
+    - 要約を結合してもmax_charsを超える場合は生成用モデルで1つにまとめる（reduce）
+
+    Args:
+        text: 要約する長文
+        max_chars: 返すテキストの最大文字数
+        source_label: プロンプト内での資料の呼び方（例: 「YouTube動画の字幕」）
+
+    Returns:
+        str: 要約されたテキスト（全体の内容をカバーする）
+    """
+    if len(text) <= max_chars:
+        return text
+
+    total_tokens = estimate_tokens(text)
+    chunk_tokens = max(CHUNK_TOKENS, total_tokens // MAX_CHUNKS + 1)
+    chunks = split_into_chunks(text, chunk_tokens)
+    logger.info(f"Summarizing {len(text)} chars ({total_tokens} tokens) in {len(chunks)} chunks")
+
+    partial_summaries = await asyncio.gather(*[
+        _summarize_chunk(chunk, i, len(chunks), source_label)
+        for i, chunk in enumerate(chunks, 1)
+    ])
+    combined = "\n\n".join(partial_summaries)
+
+    if len(combined) <= max_chars:
+        return combined
+
+    prompt = f"""以下は{source_label}をパートごとに要約したものです。
+全体を通して重要なポイントを漏らさないよう、{max_chars}文字以内の日本語の箇条書きに統合してください。
+前置きや締めの言葉は不要です。
+
+{combined}"""
+    reduced = await invoke_claude(prompt, model_id=MODEL_ID, max_tokens=REDUCE_MAX_TOKENS, temperature=0.3)
+    return reduced[:max_chars]
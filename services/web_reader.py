@@ -3,10 +3,14 @@ Web Reader Service
 URLからWebページのコンテンツを取得し、主要なテキストを抽出するサービス
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import Optional
+import codecs
 import re
+from typing import Optional
+
+import requests
+from lxml import etree, html as lxml_html
+
+from services.download_utils import read_response_bytes
 
 
 # テキスト抽出の最大文字数（トークン節約のため）
@@ -21,6 +25,286 @@ USER_AGENT = (
 # リクエストのタイムアウト（秒）
 REQUEST_TIMEOUT = 15
 
+# ダウンロードする本文の最大バイト数（これ以降は読み込まない）
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+# タイトル取得時に読み込む最大バイト数（<head>が含まれていれば十分）
+TITLE_DOWNLOAD_BYTES = 64 * 1024
+
+# 本文抽出時に丸ごと読み飛ばすタグ
+BOILERPLATE_TAGS = frozenset([
+    'script', 'style', 'nav', 'footer', 'header', 'aside', 'noscript', 'iframe',
+    'form', 'button', 'input', 'select', 'textarea', 'svg', 'img',
+])
+
+# 広告・ナビゲーション系のclass/id
+# 'ad' は部分一致だと header / heading / shadow なども消えるため単語単位で判定する
+BOILERPLATE_PATTERN = re.compile(
+    r'advertisement|banner|sidebar|menu|navigation|social|share|comment|related|recommend'
+    r'|(?:^|[\s_-])ads?(?:$|[\s_-])',
+    re.IGNORECASE,
+)
+
+# 本文コンテナっぽいclass/id
+CONTENT_PATTERN = re.compile(r'(article|content|post|entry|main)', re.IGNORECASE)
+
+# テキストを抽出するブロック要素
+BLOCK_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'blockquote'])
+
+# ブロック内のリンク文字数がこの割合を超えたらナビゲーションとみなして除外
+MAX_LINK_DENSITY = 0.6
+
+# 本文コンテナの優先順位（article > main > class一致 > id一致 > body）
+_SCOPES = ('article', 'main', 'class', 'id')
+
+# 文字コード推定に使う先頭バイト数
+ENCODING_SNIFF_BYTES = 65536
+
+_META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+# Pythonのcodecsが知らないが日本語サイトでよく使われる文字コード名
+_ENCODING_ALIASES = {
+    'windows-31j': 'cp932',
+    'x-sjis': 'cp932',
+    'x-euc-jp': 'euc_jp',
+}
+
+
+def _sniff_encoding(content: bytes) -> str:
+    """
+    HTMLのバイト列から文字エンコーディングを推定する
+
+    <meta charset> → UTF-8 の順に確認し、どちらでも判定できない場合のみ
+    先頭部分を使って文字コード推定を行う
+    """
+    match = _META_CHARSET_PATTERN.search(content[:4096])
+    if match:
+        return match.group(1).decode('ascii', 'ignore')
+
+    try:
+        content.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        detected = requests.compat.chardet.detect(content[:ENCODING_SNIFF_BYTES])
+        return detected.get('encoding') or 'utf-8'
+
+
+def _detect_encoding(response: requests.Response, content: bytes) -> str:
+    """レスポンスの文字エンコーディングを判定する（Content-Typeのcharsetを優先）"""
+    content_type = response.headers.get('Content-Type', '')
+    if 'charset=' in content_type.lower() and response.encoding:
+        return response.encoding
+    return _sniff_encoding(content)
+
+
+def _normalize_encoding(encoding: str, content: bytes) -> str:
+    """
+    文字コード名をPythonのcodec名に正規化する
+
+    codecsが知らない名前（x-user-defined, none など）の場合は内容から推定し直す
+    """
+    name = _ENCODING_ALIASES.get(encoding.strip().lower(), encoding.strip())
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        detected = requests.compat.chardet.detect(content[:ENCODING_SNIFF_BYTES]).get('encoding')
+        try:
+            return codecs.lookup(detected).name if detected else 'utf-8'
+        except LookupError:
+            return 'utf-8'
+
+
+def _parse_html(content: bytes, encoding: Optional[str] = None):
+    """
+    バイト列をlxmlでパースする
+
+    libxml2が知らない文字コード名（windows-31j など）で失敗しないよう、
+    Python側でデコードしてUTF-8に揃えてから渡す
+    """
+    encoding = _normalize_encoding(encoding or _sniff_encoding(content), content)
+    if encoding != 'utf-8':
+        content = content.decode(encoding, errors='replace').encode('utf-8')
+    parser = lxml_html.HTMLParser(encoding='utf-8')
+    return lxml_html.document_fromstring(content, parser=parser)
+
+
+def _is_boilerplate(element) -> bool:
+    """読み飛ばすべき要素かどうか"""
+    if element.tag in BOILERPLATE_TAGS:
+        return True
+    if element.tag in ('html', 'body'):
+        return False
+    class_attr = element.get('class')
+    if class_attr and BOILERPLATE_PATTERN.search(class_attr):
+        return True
+    id_attr = element.get('id')
+    return bool(id_attr and BOILERPLATE_PATTERN.search(id_attr))
+
+
+def extract_content(content: bytes, encoding: Optional[str] = None) -> str:
+    """
+    HTMLから主要なテキストを抽出する
+
+    ツリーを1回だけ走査し、不要な要素の読み飛ばし・本文コンテナの判定・
+    ブロック単位のテキスト収集を同時に行う。
+    最優先の<article>が閉じた時点、またはMAX_CONTENT_LENGTHに達した時点で走査を打ち切る。
+
+    Args:
+        content: HTMLのバイト列
+        encoding: 文字エンコーディング（Noneの場合は内容から推定）
+
+    Returns:
+        抽出されたテキスト（最大8000文字）。抽出できない場合は空文字
+    """
+    try:
+        root = _parse_html(content, encoding)
+    except etree.ParserError:
+        # 空・空白のみのレスポンスなどlibxml2が文書として扱えない場合
+        return ""
+
+    title = None
+    og_description = None
+    meta_description = None
+
+    # 各スコープで最初に見つかったコンテナ要素と、その中で収集済みの文字数
+    scope_elements = {scope: None for scope in _SCOPES}
+    scope_closed = set()
+    scope_lengths = {scope: 0 for scope in _SCOPES}
+
+    blocks = []
+    open_blocks = []
+    link_depth = 0
+    skipped = None
+
+    def add_text(text):
+        if not text or not open_blocks:
+            return
+        text = text.strip()
+        if not text:
+            return
+        for block in open_blocks:
+            block['parts'].append(text)
+            if link_depth:
+                block['link_chars'] += len(text)
+
+    walker = etree.iterwalk(root, events=('start', 'end', 'comment', 'pi'))
+    for event, element in walker:
+        if event in ('comment', 'pi'):
+            add_text(element.tail)
+            continue
+
+        tag = element.tag
+
+        if event == 'start':
+            if tag == 'title':
+                if title is None and element.text:
+                    title = element.text.strip()
+                skipped = element
+                walker.skip_subtree()
+                continue
+            if tag == 'meta':
+                meta_content = element.get('content')
+                if meta_content:
+                    if og_description is None and element.get('property') == 'og:description':
+                        og_description = meta_content.strip()
+                    elif meta_description is None and element.get('name') == 'description':
+                        meta_description = meta_content.strip()
+                continue
+            if _is_boilerplate(element):
+                skipped = element
+                walker.skip_subtree()
+                continue
+
+            # 本文コンテナの判定（各スコープで文書順に最初の要素のみ）
+            if scope_elements['article'] is None and tag == 'article':
+                scope_elements['article'] = element
+            if scope_elements['main'] is None and tag == 'main':
+                scope_elements['main'] = element
+            if scope_elements['class'] is None and CONTENT_PATTERN.search(element.get('class') or ''):
+                scope_elements['class'] = element
+            if scope_elements['id'] is None and CONTENT_PATTERN.search(element.get('id') or ''):
+                scope_elements['id'] = element
+
+            if tag == 'a':
+                link_depth += 1
+            if tag in BLOCK_TAGS:
+                block = {
+                    'element': element,
+                    'tag': tag,
+                    'parts': [],
+                    'link_chars': 0,
+                    'scopes': frozenset(
+                        scope for scope in _SCOPES
+                        if scope_elements[scope] is not None and scope not in scope_closed
+                    ),
+                }
+                blocks.append(block)
+                open_blocks.append(block)
+            add_text(element.text)
+            continue
+
+        # event == 'end'
+        if element is skipped:
+            skipped = None
+            add_text(element.tail)
+            continue
+
+        if open_blocks and open_blocks[-1]['element'] is element:
+            block = open_blocks.pop()
+            text = ''.join(block['parts'])
+            block['text'] = text
+            if len(text) > 10 and block['link_chars'] <= len(text) * MAX_LINK_DENSITY:
+                for scope in block['scopes']:
+                    scope_lengths[scope] += len(text) + 2
+            else:
+                block['text'] = ''
+        if tag == 'a':
+            link_depth -= 1
+        add_text(element.tail)
+
+        for scope in _SCOPES:
+            if element is scope_elements[scope]:
+                scope_closed.add(scope)
+
+        # 最優先の<article>が確定したら、それ以降は読む必要がない
+        if 'article' in scope_closed or scope_lengths['article'] >= MAX_CONTENT_LENGTH:
+            break
+
+    content_texts = []
+
+    if title:
+        content_texts.append(f"【タイトル】{title}")
+
+    description = og_description or meta_description
+    if description:
+        content_texts.append(f"【概要】{description}")
+
+    selected_scope = next((scope for scope in _SCOPES if scope_elements[scope] is not None), None)
+    for block in blocks:
+        text = block.get('text')
+        if not text:
+            continue
+        if selected_scope and selected_scope not in block['scopes']:
+            continue
+        if block['tag'].startswith('h'):
+            level = int(block['tag'][1])
+            content_texts.append('#' * level + ' ' + text)
+        else:
+            content_texts.append(text)
+
+    # テキストを結合
+    full_text = '\n\n'.join(content_texts)
+
+    # 連続する空白・改行を正規化
+    full_text = re.sub(r'\n{3,}', '\n\n', full_text)
+    full_text = re.sub(r' {2,}', ' ', full_text)
+
+    # 文字数制限
+    if len(full_text) > MAX_CONTENT_LENGTH:
+        full_text = full_text[:MAX_CONTENT_LENGTH] + "\n\n...（以下省略）"
+
+    return full_text.strip()
+
 
 def fetch_web_content(url: str) -> str:
     """
@@ -52,13 +336,17 @@ def fetch_web_content(url: str) -> str:
     }
 
     try:
-        response = requests.get(
+        with requests.get(
             url,
             headers=headers,
             timeout=REQUEST_TIMEOUT,
-            allow_redirects=True
-        )
-        response.raise_for_status()
+            allow_redirects=True,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            # 大きなページでも先頭MAX_DOWNLOAD_BYTESまでしか読み込まない
+            content, _ = read_response_bytes(response, MAX_DOWNLOAD_BYTES)
+            encoding = _detect_encoding(response, content)
     except requests.exceptions.Timeout:
         raise ValueError("リクエストがタイムアウトしました。URLを確認してください。")
     except requests.exceptions.TooManyRedirects:
@@ -66,81 +354,12 @@ def fetch_web_content(url: str) -> str:
     except requests.exceptions.RequestException as e:
         raise ValueError(f"ページの取得に失敗しました: {str(e)}")
 
-    # 文字エンコーディングの検出
-    response.encoding = response.apparent_encoding or 'utf-8'
-
-    # HTMLをパース
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    # 不要な要素を削除
-    for element in soup.find_all(['script', 'style', 'nav', 'footer', 'header',
-                                   'aside', 'noscript', 'iframe', 'form', 'button',
-                                   'input', 'select', 'textarea', 'svg', 'img']):
-        element.decompose()
-
-    # 広告・ナビゲーション系のクラスを持つ要素も削除
-    ad_patterns = ['ad', 'advertisement', 'banner', 'sidebar', 'menu', 'navigation',
-                   'social', 'share', 'comment', 'related', 'recommend']
-    for pattern in ad_patterns:
-        for element in soup.find_all(class_=re.compile(pattern, re.IGNORECASE)):
-            element.decompose()
-        for element in soup.find_all(id=re.compile(pattern, re.IGNORECASE)):
-            element.decompose()
-
-    # メインコンテンツを探す
-    content_texts = []
-
-    # タイトルを取得
-    title = soup.find('title')
-    if title and title.string:
-        content_texts.append(f"【タイトル】{title.string.strip()}")
-
-    # OGP descriptionを取得
-    og_description = soup.find('meta', property='og:description')
-    if og_description and og_description.get('content'):
-        content_texts.append(f"【概要】{og_description['content'].strip()}")
-    else:
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        if meta_description and meta_description.get('content'):
-            content_texts.append(f"【概要】{meta_description['content'].strip()}")
-
-    # article, main, または本文っぽい部分を優先的に探す
-    main_content = (
-        soup.find('article') or
-        soup.find('main') or
-        soup.find(class_=re.compile('(article|content|post|entry|main)', re.IGNORECASE)) or
-        soup.find(id=re.compile('(article|content|post|entry|main)', re.IGNORECASE)) or
-        soup.body
-    )
-
-    if main_content:
-        # 見出しと段落を抽出
-        for tag in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'blockquote']):
-            text = tag.get_text(strip=True)
-            if text and len(text) > 10:  # 短すぎるテキストは除外
-                # 見出しタグにはマーカーを付ける
-                if tag.name.startswith('h'):
-                    level = int(tag.name[1])
-                    prefix = '#' * level + ' '
-                    content_texts.append(prefix + text)
-                else:
-                    content_texts.append(text)
-
-    # テキストを結合
-    full_text = '\n\n'.join(content_texts)
-
-    # 連続する空白・改行を正規化
-    full_text = re.sub(r'\n{3,}', '\n\n', full_text)
-    full_text = re.sub(r' {2,}', ' ', full_text)
-
-    # 文字数制限
-    if len(full_text) > MAX_CONTENT_LENGTH:
-        full_text = full_text[:MAX_CONTENT_LENGTH] + "\n\n...（以下省略）"
+    full_text = extract_content(content, encoding)
 
-    if not full_text.strip():
+    if not full_text:
         raise ValueError("ページからテキストを抽出できませんでした。")
 
-    return full_text.strip()
+    return full_text
 
 
 def get_page_title(url: str) -> Optional[str]:
@@ -155,15 +374,16 @@ def get_page_title(url: str) -> Optional[str]:
     """
     try:
         headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        response.encoding = response.apparent_encoding or 'utf-8'
+        with requests.get(url, headers=headers, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            content, _ = read_response_bytes(response, TITLE_DOWNLOAD_BYTES)
+            encoding = _detect_encoding(response, content)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        title = soup.find('title')
+        root = _parse_html(content, encoding)
+        title = root.find('.//title')
 
-        if title and title.string:
-            return title.string.strip()
+        if title is not None and title.text:
+            return title.text.strip()
         return None
     except Exception:
         return None
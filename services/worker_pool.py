@@ -0,0 +1,55 @@
+"""
+ワーカープールサービス
+
+CPU負荷の高い処理（ファイル解析・PDF抽出など）をイベントループから切り離して
+実行するための共有プロセスプール
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# プロセスプールのワーカー数（同時に使うCPUコア数の上限）
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """共有プロセスプールを取得する（初回呼び出し時に生成）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Starting process pool with {CPU_WORKERS} workers")
+            _pool = ProcessPoolExecutor(max_workers=CPU_WORKERS)
+        return _pool
+
+
+async def run_in_process(func: Callable, *args: Any) -> Any:
+    """
+    関数を共有プロセスプールで実行し、結果を待つ
+
+    Args:
+        func: 実行する関数（pickle可能なモジュールレベル関数）
+        *args: 関数に渡す引数
+
+    Returns:
+        関数の戻り値
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+def shutdown_process_pool() -> None:
+    """共有プロセスプールを停止する（サーバー終了時）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
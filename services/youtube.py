@@ -2,8 +2,8 @@
 YouTube字幕取得サービス
 
 YouTubeの動画URLから字幕（Transcript）を取得する機能を提供。
-複数の方法でフォールバック:
-1. 外部API (Supadata - AWS環境でも動作)
+複数の方法を優先順にずらしながら並行実行し、最初に取得できたものを使う:
+1. 外部API (Supadata / RapidAPI - AWS環境でも動作)
 2. pytubefix
 3. InnerTube API
 4. ページスクレイピング (ytInitialPlayerResponseから取得)
@@ -16,6 +16,11 @@ import re
 import subprocess
 import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import requests
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
@@ -951,11 +956,395 @@ def _parse_srt(srt_content: str) -> str:
     return ' '.join(text_lines)
 
 
-def get_video_transcript(video_id: str) -> str | None:
+def _fetch_with_data_api_or_timedtext(video_id: str) -> list[dict] | None:
+    """YouTube Data API で取得し、失敗したら timedtext API を直接試す"""
+    transcript_data = _fetch_with_youtube_data_api(video_id)
+    if transcript_data:
+        return transcript_data
+    return _fetch_captions_via_timedtext(video_id)
+
+
+def _fetch_with_transcript_api(video_id: str) -> list[dict] | None:
+    """youtube-transcript-api で 日本語 → 英語 → 自動 の順に試す"""
+    languages_to_try = [['ja'], ['en'], None]
+
+    for lang in languages_to_try:
+        try:
+            transcript_data = _fetch_with_new_api(video_id, lang)
+            if transcript_data is None:
+                transcript_data = _fetch_with_old_api(video_id, lang)
+
+            if transcript_data:
+                print(f"[YouTube] transcript-api succeeded with lang={lang[0] if lang else 'auto'}")
+                return transcript_data
+        except (TranscriptsDisabled, NoTranscriptFound) as e:
+            print(f"[YouTube] transcript-api failed with lang={lang}: {type(e).__name__}")
+            continue
+        except Exception as e:
+            print(f"[YouTube] transcript-api error with lang={lang}: {type(e).__name__}: {e}")
+            continue
+
+    return None
+
+
+# 字幕取得プロバイダー: (名前, 取得関数, タイムアウト秒)
+# 優先順位の高い順に並べる
+TRANSCRIPT_PROVIDERS = [
+    ("Supadata API", _fetch_with_supadata, 35),  # 外部API - AWS環境でも動作
+    ("RapidAPI", _fetch_with_rapidapi, 20),  # 外部API - AWS環境でも動作
+    ("pytubefix", _fetch_with_pytubefix, 20),
+    ("InnerTube API", _fetch_with_innertube, 30),  # Android clientでAWS環境でも動作する可能性
+    ("page scraping", _fetch_captions_from_page, 30),  # ytInitialPlayerResponseから直接URL取得
+    ("YouTube Data API / timedtext", _fetch_with_data_api_or_timedtext, 30),
+    ("transcript-api", _fetch_with_transcript_api, 30),
+    ("yt-dlp", _fetch_with_ytdlp, 70),
+]
+
+# 既定の優先順位（統計がない場合の並び順）
+_PROVIDER_RANKS = {name: rank for rank, (name, _, _) in enumerate(TRANSCRIPT_PROVIDERS)}
+
+# 同時に実行するプロバイダーの最大数
+RACE_WIDTH = int(os.environ.get("YOUTUBE_RACE_WIDTH", "3"))
+
+# 先行プロバイダーの結果を待たずに次のプロバイダーを開始するまでの間隔（秒）
+RACE_STAGGER_SECONDS = float(os.environ.get("YOUTUBE_RACE_STAGGER_SECONDS", "1.5"))
+
+
+# =============================================================================
+# プロバイダーの成功率・応答時間の記録と並び替え
+# =============================================================================
+
+# 字幕キャッシュの保存先（プロバイダーの統計も既定ではここに保存する）
+TRANSCRIPT_CACHE_DIR = os.environ.get("YOUTUBE_TRANSCRIPT_CACHE_DIR", "./transcript_cache")
+
+# 統計の保存先（サーバー再起動後も引き継ぐ）
+PROVIDER_STATS_PATH = os.environ.get(
+    "YOUTUBE_PROVIDER_STATS_PATH", os.path.join(TRANSCRIPT_CACHE_DIR, "provider_stats.json")
+)
+
+# 指数移動平均の重み（新しい結果をどれだけ反映するか）
+STATS_ALPHA = 0.2
+
+# 応答時間の初期値（秒）
+DEFAULT_LATENCY = 5.0
+
+# この回数以上試して成功率がSKIP_SUCCESS_RATE未満のプロバイダーは通常スキップする
+SKIP_MIN_ATTEMPTS = 5
+SKIP_SUCCESS_RATE = 0.1
+
+# スキップ対象のプロバイダーをあえて試す確率（復旧したプロバイダーを再評価するため）
+EXPLORATION_RATE = float(os.environ.get("YOUTUBE_EXPLORATION_RATE", "0.1"))
+
+_provider_stats: dict[str, dict] | None = None
+_provider_stats_lock = threading.Lock()
+
+
+def _load_provider_stats() -> dict[str, dict]:
+    """統計を読み込む（初回のみファイルから）。呼び出し側でロックを取ること"""
+    global _provider_stats
+    if _provider_stats is None:
+        try:
+            with open(PROVIDER_STATS_PATH, "r", encoding="utf-8") as f:
+                _provider_stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _provider_stats = {}
+    return _provider_stats
+
+
+def _initial_success_rate(rank: int) -> float:
+    """統計がない場合の成功率。既定の優先順位が保たれるよう順位が高いほど大きくする"""
+    return max(0.9 - 0.1 * rank, 0.2)
+
+
+def _record_provider_result(name: str, rank: int, success: bool, elapsed: float) -> None:
+    """プロバイダーの実行結果を統計に反映して保存する"""
+    with _provider_stats_lock:
+        stats = _load_provider_stats()
+        entry = stats.setdefault(name, {
+            "attempts": 0,
+            "successes": 0,
+            "success_rate": _initial_success_rate(rank),
+            "latency": DEFAULT_LATENCY,
+        })
+        entry["attempts"] += 1
+        entry["successes"] += 1 if success else 0
+        entry["success_rate"] += STATS_ALPHA * ((1.0 if success else 0.0) - entry["success_rate"])
+        entry["latency"] += STATS_ALPHA * (elapsed - entry["latency"])
+
+        try:
+            os.makedirs(os.path.dirname(PROVIDER_STATS_PATH) or ".", exist_ok=True)
+            tmp_path = f"{PROVIDER_STATS_PATH}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, PROVIDER_STATS_PATH)
+        except OSError as e:
+            print(f"[YouTube] Failed to save provider stats: {e}")
+
+
+def _ordered_providers() -> list[tuple]:
+    """
+    成功率と応答時間から今回試すプロバイダーの順番を決める
+
+    - 成功率 / 応答時間 が大きい順（短時間で成功しやすいものを先に）
+    - ほとんど成功しないプロバイダーはスキップ（EXPLORATION_RATEの確率で同時実行の枠内に入れて再評価）
+    """
+    with _provider_stats_lock:
+        stats = dict(_load_provider_stats())
+
+    scored = []
+    skipped = []
+    for rank, provider in enumerate(TRANSCRIPT_PROVIDERS):
+        entry = stats.get(provider[0])
+        if entry is None:
+            scored.append((_initial_success_rate(rank) / DEFAULT_LATENCY, rank, provider))
+            continue
+
+        if entry["attempts"] >= SKIP_MIN_ATTEMPTS and entry["success_rate"] < SKIP_SUCCESS_RATE:
+            skipped.append(provider)
+            continue
+        scored.append((entry["success_rate"] / max(entry["latency"], 0.5), rank, provider))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    ordered = [provider for _, _, provider in scored]
+
+    if not ordered:
+        # 全プロバイダーがスキップ対象の場合はすべて試す
+        return skipped or list(TRANSCRIPT_PROVIDERS)
+
+    # 再評価するプロバイダーは同時実行の枠内（最後の枠）に入れる。
+    # 末尾に置くと上位のプロバイダーが成功している限り実行されず、復旧しても統計が更新されない
+    for provider in skipped:
+        if random.random() < EXPLORATION_RATE:
+            print(f"[YouTube] Exploring low-success provider: {provider[0]}")
+            ordered.insert(min(RACE_WIDTH, len(ordered) + 1) - 1, provider)
+            break  # 1リクエストで再評価するのは1つまで
+
+    return ordered
+
+
+def _new_race() -> dict:
+    """1回のレース（1動画分）の状態を作る"""
+    return {
+        "lock": threading.Lock(),
+        "started_at": {},  # name -> 実際に開始した時刻（タイムアウトはこの時刻から数える）
+        "succeeded": False,  # いずれかのプロバイダーが字幕を取得できたか
+        "failures": [],  # 成功が出るまで記録を保留している失敗 (name, rank, elapsed)
+    }
+
+
+def _record_race_result(race: dict, name: str, rank: int, success: bool, elapsed: float) -> None:
+    """
+    レース中のプロバイダーの結果を統計に反映する
+
+    失敗は同じ動画で他のプロバイダーが成功した場合だけ記録する。
+    全プロバイダーが失敗した場合は字幕のない動画とみなし、統計を更新しない。
+    """
+    with race["lock"]:
+        if success:
+            race["succeeded"] = True
+            results = [(failed_name, failed_rank, False, failed_elapsed)
+                       for failed_name, failed_rank, failed_elapsed in race["failures"]]
+            race["failures"] = []
+            results.append((name, rank, True, elapsed))
+        elif race["succeeded"]:
+            results = [(name, rank, False, elapsed)]
+        else:
+            race["failures"].append((name, rank, elapsed))
+            results = []
+
+    for result in results:
+        _record_provider_result(*result)
+
+
+def _run_provider(name: str, rank: int, fetch, video_id: str, race: dict) -> list[dict] | None:
+    """プロバイダーを実行し、成否と所要時間をレースに記録する（レース終了後に完了した場合も記録）"""
+    start = time.monotonic()
+    race["started_at"][name] = start
+    try:
+        transcript_data = fetch(video_id)
+    except Exception:
+        _record_race_result(race, name, rank, False, time.monotonic() - start)
+        raise
+    _record_race_result(race, name, rank, bool(transcript_data), time.monotonic() - start)
+    return transcript_data
+
+
+def _race_providers(video_id: str, providers: list[tuple]) -> tuple[list[dict] | None, str | None]:
+    """
+    プロバイダーを少しずつずらして並行実行し、最初に取得できた字幕を返す
+
+    - 先頭から順にRACE_STAGGER_SECONDSごとに開始（同時実行はRACE_WIDTHまで）
+    - 実行中のプロバイダーが失敗・タイムアウトした場合は待たずに次を開始
+    - 勝者が決まったら残りのプロバイダーは取り消し、結果は破棄する
+      （実行中のスレッドは強制終了できないため、各プロバイダー自身のHTTPタイムアウトで終了する）
+
+    Returns:
+        tuple: (字幕データ or None, 取得に成功したプロバイダー名 or None)
+    """
+    queue = list(providers)
+    pending: dict = {}  # future -> (name, timeout)
+    race = _new_race()
+    started_at = race["started_at"]
+    next_start = 0.0
+
+    # リクエストごとにスレッドプールを作る（タイムアウト後も動き続けるスレッドに、
+    # 他のリクエストや後続のプロバイダーの枠を取られないように）
+    executor = ThreadPoolExecutor(max_workers=max(1, len(queue)), thread_name_prefix="yt-transcript")
+
+    def deadline(name: str, timeout: float) -> float:
+        # 開始前（スレッドの空き待ち）のプロバイダーはタイムアウトしない
+        start = started_at.get(name)
+        return start + timeout if start is not None else float("inf")
+
+    try:
+        while queue or pending:
+            now = time.monotonic()
+
+            # 次のプロバイダーを開始
+            while queue and len(pending) < RACE_WIDTH and (not pending or now >= next_start):
+                name, fetch, timeout = queue.pop(0)
+                print(f"[YouTube] Trying {name}...")
+                future = executor.submit(_run_provider, name, _PROVIDER_RANKS[name], fetch, video_id, race)
+                pending[future] = (name, timeout)
+                next_start = now + RACE_STAGGER_SECONDS
+
+            # 完了・タイムアウト・次の開始時刻のいずれか早い方まで待つ
+            wake_times = [deadline(name, timeout) for name, timeout in pending.values()]
+            if queue and len(pending) < RACE_WIDTH:
+                wake_times.append(next_start)
+            # 開始待ちのプロバイダーしかない場合も、開始時刻を反映するため定期的に見直す
+            wait_seconds = min(max(0.0, min(wake_times) - now), RACE_STAGGER_SECONDS)
+            done, _ = wait(list(pending), timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, _ = pending.pop(future)
+                try:
+                    transcript_data = future.result()
+                except Exception as e:
+                    print(f"[YouTube] {name} error: {type(e).__name__}: {e}")
+                    # 失敗したら待たずに次のプロバイダーを開始する
+                    next_start = 0.0
+                    continue
+                if transcript_data:
+                    return transcript_data, name
+                print(f"[YouTube] {name} returned no transcript")
+                next_start = 0.0
+
+            # タイムアウトしたプロバイダーは結果を待たず、次のプロバイダーを開始する
+            now = time.monotonic()
+            for future, (name, timeout) in list(pending.items()):
+                if now >= deadline(name, timeout):
+                    print(f"[YouTube] {name} timed out")
+                    future.cancel()
+                    del pending[future]
+                    next_start = 0.0
+    finally:
+        # 勝者が決まった・全滅した時点で未開始のものは取り消し、実行中のスレッドの終了は待たない
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return None, None
+
+
+# =============================================================================
+# 字幕キャッシュ（video_idをキーにディスクへ保存）
+# =============================================================================
+
+# キャッシュの有効期限（秒）
+TRANSCRIPT_CACHE_TTL = int(os.environ.get("YOUTUBE_TRANSCRIPT_CACHE_TTL", str(30 * 24 * 60 * 60)))
+
+# キャッシュ全体の最大サイズ（超えたら最終利用が古いものから削除）
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.environ.get("YOUTUBE_TRANSCRIPT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# 字幕の既定の文字数上限（トークン制限対策）
+DEFAULT_TRANSCRIPT_MAX_CHARS = 5000
+
+
+def _transcript_cache_path(video_id: str) -> str:
+    # プロバイダーは日本語→英語の順で字幕を探すため、キャッシュは動画ごとに1つ
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{video_id}.json")
+
+
+def _load_cached_transcript(video_id: str) -> str | None:
+    """キャッシュから字幕全文を読み込む（期限切れ・未保存ならNone）"""
+    path = _transcript_cache_path(video_id)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if time.time() - entry.get("fetched_at", 0) > TRANSCRIPT_CACHE_TTL:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    # 最終利用時刻を更新（サイズ超過時の削除順に使う）
+    os.utime(path)
+    print(f"[YouTube] Transcript cache hit: {video_id} (method: {entry.get('method')})")
+    return entry.get("text")
+
+
+def _save_cached_transcript(video_id: str, text: str, method: str | None) -> None:
+    """字幕全文をキャッシュに保存する"""
+    try:
+        os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+        path = _transcript_cache_path(video_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "video_id": video_id,
+                "method": method,
+                "fetched_at": time.time(),
+                "text": text,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        _prune_transcript_cache()
+    except OSError as e:
+        print(f"[YouTube] Failed to save transcript cache: {e}")
+
+
+def _prune_transcript_cache() -> None:
+    """キャッシュの合計サイズがTRANSCRIPT_CACHE_MAX_BYTESを超えたら古いものから削除する"""
+    entries = []
+    total = 0
+    for name in os.listdir(TRANSCRIPT_CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(TRANSCRIPT_CACHE_DIR, name)
+        # 同じディレクトリに置いたプロバイダーの統計は削除しない
+        if os.path.abspath(path) == os.path.abspath(PROVIDER_STATS_PATH):
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= TRANSCRIPT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def get_video_transcript(
+    video_id: str,
+    max_chars: int | None = DEFAULT_TRANSCRIPT_MAX_CHARS,
+) -> str | None:
     """
     動画IDから字幕テキストを取得する
 
-    優先順位:
+    字幕は日本語→英語の順で探す。取得した字幕は切り詰めずに video_id をキーにディスクへキャッシュし、
+    max_charsでの切り詰めは返す直前に行う。
+
+    キャッシュがない場合はプロバイダーをずらしながら並行実行し、最初に取得できた字幕を使う。
+    順番は過去の成功率・応答時間から決める（統計がない場合は以下の既定順）:
     1. Supadata API (外部API - AWS環境でも動作)
     2. RapidAPI (外部API - AWS環境でも動作)
     3. pytubefix
@@ -967,6 +1356,7 @@ def get_video_transcript(video_id: str) -> str | None:
 
     Args:
         video_id: YouTube動画ID
+        max_chars: 返す最大文字数（Noneの場合は全文）
 
     Returns:
         字幕テキスト（取得できない場合はNone）
@@ -974,96 +1364,25 @@ def get_video_transcript(video_id: str) -> str | None:
     try:
         print(f"[YouTube] Fetching transcript for video_id: {video_id}")
 
-        transcript_data = None
-        used_method = None
-
-        # 1. まず外部API（Supadata）を試す - AWS環境でも確実に動作
-        print(f"[YouTube] Trying Supadata API...")
-        transcript_data = _fetch_with_supadata(video_id)
-        if transcript_data:
-            used_method = "Supadata API"
-
-        # 2. RapidAPIを試す - AWS環境でも確実に動作
-        if not transcript_data:
-            print(f"[YouTube] Trying RapidAPI...")
-            transcript_data = _fetch_with_rapidapi(video_id)
-            if transcript_data:
-                used_method = "RapidAPI"
-
-        # 3. pytubefixを試す
-        if not transcript_data:
-            print(f"[YouTube] Trying pytubefix...")
-            transcript_data = _fetch_with_pytubefix(video_id)
-            if transcript_data:
-                used_method = "pytubefix"
-
-        # 4. InnerTube APIを試す（AWS環境でも動作する可能性が高い）
-        if not transcript_data:
-            print(f"[YouTube] Trying InnerTube API (Android client)...")
-            transcript_data = _fetch_with_innertube(video_id)
-            if transcript_data:
-                used_method = "InnerTube API"
-
-        # 5. ページスクレイピングを試す
-        if not transcript_data:
-            print(f"[YouTube] Trying page scraping (ytInitialPlayerResponse)...")
-            transcript_data = _fetch_captions_from_page(video_id)
-            if transcript_data:
-                used_method = "page scraping"
-
-        # 6. YouTube Data API / timedtext APIを試す
-        if not transcript_data:
-            print(f"[YouTube] Trying YouTube Data API / timedtext...")
-            transcript_data = _fetch_with_youtube_data_api(video_id)
-            if transcript_data:
-                used_method = "YouTube Data API"
-            else:
-                # timedtext APIを直接試す
-                transcript_data = _fetch_captions_via_timedtext(video_id)
-                if transcript_data:
-                    used_method = "timedtext API"
-
-        # 7. youtube-transcript-api を試す
-        if not transcript_data:
-            print(f"[YouTube] Trying youtube-transcript-api...")
-            languages_to_try = [['ja'], ['en'], None]
+        full_text = _load_cached_transcript(video_id)
 
-            for lang in languages_to_try:
-                try:
-                    transcript_data = _fetch_with_new_api(video_id, lang)
-                    if transcript_data is None:
-                        transcript_data = _fetch_with_old_api(video_id, lang)
+        if full_text is None:
+            transcript_data, used_method = _race_providers(video_id, _ordered_providers())
 
-                    if transcript_data:
-                        used_method = f"transcript-api ({lang[0] if lang else 'auto'})"
-                        break
-                except (TranscriptsDisabled, NoTranscriptFound) as e:
-                    print(f"[YouTube] transcript-api failed with lang={lang}: {type(e).__name__}")
-                    continue
-                except Exception as e:
-                    print(f"[YouTube] transcript-api error with lang={lang}: {type(e).__name__}: {e}")
-                    continue
-
-        # 8. yt-dlp フォールバック
-        if not transcript_data:
-            print(f"[YouTube] Trying yt-dlp fallback...")
-            transcript_data = _fetch_with_ytdlp(video_id)
-            if transcript_data:
-                used_method = "yt-dlp"
-
-        if not transcript_data:
-            print(f"[YouTube] No transcript available for video_id: {video_id}")
-            return None
+            if not transcript_data:
+                print(f"[YouTube] No transcript available for video_id: {video_id}")
+                return None
 
-        # 字幕データを連結（辞書のリスト形式）
-        full_text = " ".join([snippet['text'] for snippet in transcript_data])
+            # 字幕データを連結（辞書のリスト形式）
+            full_text = " ".join([snippet['text'] for snippet in transcript_data])
+            _save_cached_transcript(video_id, full_text, used_method)
+            print(f"[YouTube] Successfully fetched transcript ({len(full_text)} chars, method: {used_method})")
 
-        # トークン制限対策: 長すぎる場合は先頭5000文字でカット
-        if len(full_text) > 5000:
-            print(f"[YouTube] Transcript truncated from {len(full_text)} to 5000 chars")
-            full_text = full_text[:5000]
+        # トークン制限対策: 長すぎる場合は先頭max_chars文字でカット
+        if max_chars is not None and len(full_text) > max_chars:
+            print(f"[YouTube] Transcript truncated from {len(full_text)} to {max_chars} chars")
+            full_text = full_text[:max_chars]
 
-        print(f"[YouTube] Successfully fetched transcript ({len(full_text)} chars, method: {used_method})")
         return full_text
 
     except Exception as e:
@@ -1071,12 +1390,16 @@ def get_video_transcript(video_id: str) -> str | None:
         return None
 
 
-def get_transcript_from_url(url: str) -> tuple[str | None, str]:
+def get_transcript_from_url(
+    url: str,
+    max_chars: int | None = DEFAULT_TRANSCRIPT_MAX_CHARS,
+) -> tuple[str | None, str]:
     """
     URLから字幕を取得する便利関数
 
     Args:
         url: YouTubeのURL
+        max_chars: 返す最大文字数（Noneの場合は全文）
 
     Returns:
         tuple: (字幕テキスト or None, ステータスメッセージ)
@@ -1086,7 +1409,7 @@ def get_transcript_from_url(url: str) -> tuple[str | None, str]:
     if not video_id:
         return None, "Invalid YouTube URL - could not extract video ID"
 
-    transcript = get_video_transcript(video_id)
+    transcript = get_video_transcript(video_id, max_chars=max_chars)
 
     if transcript:
         return transcript, f"Successfully fetched transcript for video {video_id}"